@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the Enterprise AI Gateway
+
+Drives /query, /batch/resilience, /batch/security and /check-toxicity at a
+fixed concurrency (closed loop) or arrival rate (open loop, Poisson) and
+reports throughput, latency percentiles, gateway-added overhead, event-loop
+lag and memory. By default it spawns the local provider simulator and a
+gateway wired to it, so no provider quota is used.
+
+    python scripts/load_benchmark.py --scenarios query,check-toxicity --concurrency 32 --duration 20
+    python scripts/load_benchmark.py --rate 50 --compare bench_results/baseline.json
+
+Results are written as JSON (one file per run) for comparison across commits;
+--compare exits non-zero when throughput or p95 latency regress past
+--threshold.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BENCH_API_KEY = "bench-key"
+SCENARIOS = ("query", "batch-resilience", "batch-security", "check-toxicity")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[rank], 2)
+
+
+def summarize(values):
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": round(sum(values) / len(values), 2) if values else 0.0,
+        "max": round(max(values), 2) if values else 0.0,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# --- Scenario requests: each returns (status_code, overhead samples in ms) ---
+#
+# Overhead is client-observed time minus the provider time the gateway reports,
+# summed over every cascade step (failed attempts included). Endpoints that do
+# not report per-step provider time return no samples.
+
+BATCH_MAX_CONCURRENCY = 64  # gateway default; larger batches queue items, so no overhead is reported
+
+
+def cascade_ms(result: dict) -> float:
+    return sum(step.get("latency_ms") or 0 for step in result.get("cascade_path") or ())
+
+
+async def run_query(client, i, args):
+    started = time.perf_counter()
+    response = await client.post(
+        "/query",
+        json={"prompt": f"Benchmark prompt {i}: summarize the benefits of caching.", "max_tokens": args.max_tokens},
+        headers={"X-API-Key": BENCH_API_KEY, "X-Cache-Mode": args.cache_mode} if args.cache_mode != "use"
+        else {"X-API-Key": BENCH_API_KEY}
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    overheads = []
+    if response.status_code == 200:
+        body = response.json()
+        if not body.get("cached") and body.get("cascade_path"):
+            overheads.append(max(0.0, elapsed_ms - cascade_ms(body)))
+    return response.status_code, overheads
+
+
+async def run_batch_resilience(client, i, args):
+    """Every item is started with the request (concurrency = batch size), so an
+    item's overhead is its arrival time on the stream minus its cascade time"""
+    prompts = [f"Batch {i} prompt {j}" for j in range(args.batch_size)]
+    measurable = args.batch_size <= BATCH_MAX_CONCURRENCY
+    params = {"concurrency": args.batch_size} if measurable else None
+    overheads = []
+    started = time.perf_counter()
+    async with client.stream(
+        "POST", "/batch/resilience", json={"prompts": prompts}, params=params, headers={"X-API-Key": BENCH_API_KEY}
+    ) as response:
+        async for line in response.aiter_lines():
+            if line:
+                record = json.loads(line)
+                if measurable and record.get("type") == "result" and record.get("cascade_path"):
+                    arrived_ms = (time.perf_counter() - started) * 1000
+                    overheads.append(max(0.0, arrived_ms - cascade_ms(record)))
+    return response.status_code, overheads
+
+
+async def run_batch_security(client, i, args):
+    prompts = [f"Batch {i} prompt {j}: contact me at user{j}@example.com" for j in range(args.batch_size)]
+    response = await client.post("/batch/security", json={"prompts": prompts})
+    return response.status_code, []
+
+
+async def run_check_toxicity(client, i, args):
+    response = await client.post("/check-toxicity", json={"text": f"Benchmark text {i} about the weather."})
+    return response.status_code, []
+
+
+RUNNERS = {
+    "query": run_query,
+    "batch-resilience": run_batch_resilience,
+    "batch-security": run_batch_security,
+    "check-toxicity": run_check_toxicity,
+}
+
+
+async def drive(client, scenario, args):
+    """Run one scenario for --duration seconds (or --requests requests)"""
+    runner = RUNNERS[scenario]
+    latencies, overheads, statuses = [], [], {}
+    counter = iter(range(sys.maxsize))
+    deadline = time.perf_counter() + args.duration
+
+    def more():
+        return time.perf_counter() < deadline if not args.requests else sent < args.requests
+
+    async def one(i):
+        started = time.perf_counter()
+        try:
+            code, samples = await runner(client, i, args)
+        except httpx.HTTPError as e:
+            code, samples = type(e).__name__, []
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        statuses[str(code)] = statuses.get(str(code), 0) + 1
+        if code == 200:
+            latencies.append(elapsed_ms)
+            overheads.extend(samples)
+
+    sent = 0
+    started = time.perf_counter()
+    if args.rate:
+        # Open loop: Poisson arrivals, in-flight capped by --concurrency
+        limit = asyncio.Semaphore(args.concurrency)
+        tasks = set()
+
+        async def limited(i):
+            async with limit:
+                await one(i)
+
+        rng = random.Random(args.seed)
+        while more():
+            task = asyncio.create_task(limited(next(counter)))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            sent += 1
+            await asyncio.sleep(rng.expovariate(args.rate))
+        await asyncio.gather(*tasks)
+    else:
+        # Closed loop: --concurrency workers issue requests back to back
+        async def worker():
+            nonlocal sent
+            while more():
+                sent += 1
+                await one(next(counter))
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall_s = time.perf_counter() - started
+
+    return {
+        "requests": sent,
+        "ok": len(latencies),
+        "statuses": statuses,
+        "duration_s": round(wall_s, 3),
+        "rps": round(len(latencies) / wall_s, 2) if wall_s else 0.0,
+        "latency_ms": summarize(latencies),
+        "overhead_ms": summarize(overheads) if overheads else None,
+    }
+
+
+class Stack:
+    """Simulator + gateway subprocesses wired together for an offline run"""
+
+    def __init__(self, simulator_config: str = None):
+        self.simulator_config = simulator_config
+        self.processes = []
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def start(self) -> str:
+        sim_port, gateway_port = free_port(), free_port()
+        sim_cmd = [sys.executable, "-m", "src.simulator", "--port", str(sim_port)]
+        if self.simulator_config:
+            sim_cmd += ["--config", self.simulator_config]
+        sim_url = f"http://127.0.0.1:{sim_port}"
+        env = {
+            **os.environ,
+            "SERVICE_API_KEY": BENCH_API_KEY,
+            "RATE_LIMIT": "1000000/minute",
+            "GEMINI_API_KEY": "sim", "GROQ_API_KEY": "sim", "OPENROUTER_API_KEY": "sim", "LAKERA_API_KEY": "sim",
+            "GEMINI_BASE_URL": f"{sim_url}/v1beta",
+            "GROQ_BASE_URL": f"{sim_url}/openai/v1",
+            "OPENROUTER_BASE_URL": f"{sim_url}/api/v1",
+            "LAKERA_API_URL": f"{sim_url}/v2/guard",
+            "BATCH_JOBS_DB": os.path.join(self.tmp.name, "jobs.sqlite3"),
+        }
+        self.processes.append(subprocess.Popen(sim_cmd, cwd=REPO_ROOT, env=env))
+        self.processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(gateway_port), "--log-level", "warning"],
+            cwd=REPO_ROOT, env=env
+        ))
+        gateway_url = f"http://127.0.0.1:{gateway_port}"
+        for url in (f"{sim_url}/_sim/stats", f"{gateway_url}/health"):
+            wait_until_up(url)
+        return gateway_url
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.wait(timeout=10)
+        self.tmp.cleanup()
+
+
+def wait_until_up(url: str, timeout_s: float = 20.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout_s}s")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def benchmark(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        results = {}
+        for scenario in args.scenarios:
+            if args.warmup:
+                warm = argparse.Namespace(**{**vars(args), "duration": args.warmup, "requests": 0, "rate": 0})
+                await drive(client, scenario, warm)
+            results[scenario] = await drive(client, scenario, args)
+            results[scenario]["runtime"] = (await client.get("/metrics")).json().get("runtime")
+            print_scenario(scenario, results[scenario])
+        return results
+
+
+def print_scenario(name: str, result: dict):
+    latency = result["latency_ms"]
+    line = (f"{name:<17} {result['rps']:>9.1f} rps  p50 {latency['p50']:>8.1f}  p95 {latency['p95']:>8.1f}  "
+            f"p99 {latency['p99']:>8.1f} ms  ok {result['ok']}/{result['requests']}")
+    if result["overhead_ms"]:
+        line += f"  overhead p50 {result['overhead_ms']['p50']:.1f} ms"
+    runtime = result.get("runtime")
+    if runtime:
+        line += (f"  loop lag p99 {runtime['event_loop_lag_ms']['p99']:.1f} ms"
+                 f"  rss {runtime['rss_bytes'] / 2 ** 20:.0f} MiB")
+    print(line)
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Regressions of throughput or p95 latency beyond threshold (fractional)"""
+    regressions = []
+    for scenario, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base:
+            continue
+        if base["rps"] and result["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{scenario}: rps {base['rps']} -> {result['rps']}")
+        base_p95, p95 = base["latency_ms"]["p95"], result["latency_ms"]["p95"]
+        if base_p95 and p95 > base_p95 * (1 + threshold):
+            regressions.append(f"{scenario}: p95 {base_p95} ms -> {p95} ms")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Gateway load benchmark")
+    parser.add_argument("--url", help="Benchmark an already running gateway instead of spawning one "
+                                      "(needs SERVICE_API_KEY=%s and a high RATE_LIMIT)" % BENCH_API_KEY)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        type=lambda value: [s.strip() for s in value.split(",") if s.strip()])
+    parser.add_argument("--concurrency", type=int, default=16, help="Workers (closed loop) or in-flight cap")
+    parser.add_argument("--rate", type=float, default=0, help="Arrival rate in req/s (open loop); 0 = closed loop")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario")
+    parser.add_argument("--requests", type=int, default=0, help="Requests per scenario (overrides --duration)")
+    parser.add_argument("--warmup", type=float, default=1, help="Warm-up seconds per scenario (not recorded)")
+    parser.add_argument("--batch-size", type=int, default=10, help="Prompts per /batch/* request")
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--cache-mode", choices=("bypass", "refresh", "use"), default="bypass")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--simulator-config", help="Profiles JSON for the spawned simulator")
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, "bench_results"),
+                        help="Directory (or .json path) for the results file")
+    parser.add_argument("--compare", help="Baseline results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed regression (fraction)")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    stack = None if args.url else Stack(args.simulator_config)
+    base_url = args.url or stack.start()
+    try:
+        scenarios = asyncio.run(benchmark(base_url, args))
+    finally:
+        if stack:
+            stack.stop()
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    report = {
+        "commit": git_commit(),
+        "timestamp": now.isoformat(),
+        "target": args.url or "spawned",
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": scenarios,
+    }
+    path = args.output
+    if not path.endswith(".json"):
+        os.makedirs(path, exist_ok=True)
+        path = os.path.join(path, f"{now.strftime('%Y%m%dT%H%M%SZ')}-{report['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
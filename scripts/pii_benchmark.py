@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+PII scanner throughput benchmark
+
+Builds a synthetic multi-megabyte corpus (prose with emails, card numbers,
+SSNs, tax IDs and API keys sprinkled in) and times the single-pass scanner's
+scan, has_any and redact modes against the former one-findall-per-pattern
+detector. Reports MB/s per mode and checks that both find the same PII counts.
+
+    python scripts/pii_benchmark.py --size-mb 4 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+from src.security import PII_PATTERNS, pii_scanner  # noqa: E402
+
+WORDS = (
+    "the customer asked about an invoice for the quarterly service renewal and wants "
+    "a summary of account activity including payment dates shipping address notes"
+).split()
+PII_SAMPLES = (
+    lambda r: f"user{r.randrange(10**6)}@example.com",
+    lambda r: "-".join(f"{r.randrange(10**4):04d}" for _ in range(4)),
+    lambda r: f"{r.randrange(1000):03d}-{r.randrange(100):02d}-{r.randrange(10**4):04d}",
+    lambda r: f"{r.randrange(100):02d}-{r.randrange(10**7):07d}",
+    lambda r: "sk_" + "".join(r.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(24)),
+)
+
+
+def build_corpus(size_mb: float, pii_every: int, seed: int) -> str:
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts, length, i = [], 0, 0
+    while length < target:
+        word = rng.choice(PII_SAMPLES)(rng) if i % pii_every == 0 else rng.choice(WORDS)
+        parts.append(word)
+        length += len(word) + 1
+        i += 1
+    return " ".join(parts)
+
+
+def legacy_counts(text: str) -> dict:
+    """Former detector: one findall pass per pattern"""
+    counts = {}
+    for pii_type, pattern in PII_PATTERNS.items():
+        found = re.findall(pattern, text, re.IGNORECASE)
+        if found:
+            counts[pii_type] = len(found)
+    return counts
+
+
+def scan_counts(text: str) -> dict:
+    counts = {}
+    for span in pii_scanner.scan(text):
+        counts[span.type] = counts.get(span.type, 0) + 1
+    return counts
+
+
+def best_of(fn, text: str, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    parser.add_argument("--pii-every", type=int, default=400, help="one PII token per this many words")
+    parser.add_argument("--repeat", type=int, default=3, help="report the best of this many runs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    text = build_corpus(args.size_mb, args.pii_every, args.seed)
+    size_mb = len(text) / (1024 * 1024)
+    clean = " ".join(random.Random(args.seed).choice(WORDS) for _ in range(len(text) // 6))
+    modes = [
+        ("legacy findall x%d" % len(PII_PATTERNS), legacy_counts, text),
+        ("scan", scan_counts, text),
+        ("redact", lambda t: pii_scanner.redact(t)[1], text),
+        ("has_any (PII present)", pii_scanner.has_any, text),
+        ("has_any (clean text)", pii_scanner.has_any, clean),
+    ]
+
+    print(f"corpus: {size_mb:.2f} MB, best of {args.repeat}")
+    results = {}
+    for name, fn, corpus in modes:
+        elapsed, results[name] = best_of(fn, corpus, args.repeat)
+        mb = len(corpus) / (1024 * 1024)
+        print(f"  {name:<24} {elapsed * 1000:9.1f} ms  {mb / elapsed:8.1f} MB/s")
+
+    legacy, single = results[modes[0][0]], results["scan"]
+    print(f"counts: {single}")
+    if legacy != single:
+        print(f"MISMATCH with legacy counts: {legacy}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
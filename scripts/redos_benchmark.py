@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Adversarial (ReDoS) benchmark for the security rule sets
+
+Scans a corpus of inputs crafted to make backtracking regexes blow up (long
+runs of local-part characters, dotted domains that never end in a TLD, digit
+runs, keyword prefixes followed by long whitespace) at several sizes, through
+both the PII scanner and the injection matcher. Scan time per KB must stay flat
+as the input grows: the run fails if the per-KB time at the largest size is more
+than --max-growth times the per-KB time at the smallest size, or exceeds
+--budget-us-per-kb.
+
+    python scripts/redos_benchmark.py --sizes-kb 4,64,512
+    python scripts/redos_benchmark.py --legacy   # also time the former unbounded patterns (slow)
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+from src.security import injection_matcher, pii_scanner  # noqa: E402
+
+# Each case repeats a unit up to the target size
+ADVERSARIAL_CORPUS = {
+    "local-part run": "a.",
+    "dotted domain, no TLD": "x@" + "1." * 64,
+    "email-like chain": "a." * 31 + "a@" + "1." * 120,
+    "at-sign chain": ".a@",
+    "api key prefixes": "sk-",
+    "long api key": "sk_" + "a" * 997,
+    "digit runs": "1-",
+    "card-like groups": "1234 ",
+    "keyword + whitespace": "ignore " + " " * 500 + "system" + " " * 500,
+    "keyword soup": "ignore all you are system disregard prior ",
+}
+
+# Patterns before bounds were added, for comparison with --legacy
+LEGACY_PII_PATTERNS = {
+    "email": r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+    "credit_card": r"\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b",
+    "ssn": r"\b\d{3}-\d{2}-\d{4}\b",
+    "tax_id": r"\b\d{2}-\d{7}\b",
+    "api_key": r"(sk|pk|api|bearer)[_-]?[a-zA-Z0-9]{20,}",
+}
+
+
+def build(unit: str, size_kb: int) -> str:
+    size = size_kb * 1024
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def scan(text: str):
+    pii_scanner.scan(text)
+    injection_matcher.search(text)
+
+
+def legacy_scan(text: str):
+    for pattern in LEGACY_PII_PATTERNS.values():
+        re.findall(pattern, text, re.IGNORECASE)
+
+
+def us_per_kb(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6 / (len(text) / 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-kb", default="4,64,512")
+    parser.add_argument("--repeat", type=int, default=3, help="report the best of this many runs")
+    parser.add_argument("--max-growth", type=float, default=3.0,
+                        help="max ratio of per-KB time at the largest size to the smallest")
+    parser.add_argument("--budget-us-per-kb", type=float, default=5000.0)
+    parser.add_argument("--legacy", action="store_true", help="also time the former patterns at the smallest size")
+    args = parser.parse_args()
+    sizes = sorted(int(s) for s in args.sizes_kb.split(","))
+
+    print(f"{'case':<24}" + "".join(f"{f'{s} KB':>12}" for s in sizes) + "   (us per KB)")
+    failures = []
+    for name, unit in ADVERSARIAL_CORPUS.items():
+        timings = [us_per_kb(scan, build(unit, size), args.repeat) for size in sizes]
+        print(f"{name:<24}" + "".join(f"{t:12.1f}" for t in timings))
+        if timings[-1] > args.max_growth * timings[0]:
+            failures.append(f"{name}: per-KB time grew {timings[-1] / timings[0]:.1f}x")
+        if max(timings) > args.budget_us_per_kb:
+            failures.append(f"{name}: {max(timings):.0f} us/KB over budget")
+
+    if args.legacy:
+        print(f"\nformer patterns at {sizes[0]} KB (us per KB):")
+        for name, unit in ADVERSARIAL_CORPUS.items():
+            print(f"{name:<24}{us_per_kb(legacy_scan, build(unit, sizes[0]), 1):12.1f}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Semantic cache lookup latency benchmark
+
+Fills a SemanticCache with --entries synthetic prompts spread over
+--partitions partitions (1 is the worst case: every lookup scans all rows),
+then times lookups that hit and lookups that miss. Reports p50/p99 per kind;
+the run fails if either p99 exceeds --budget-us.
+
+    python scripts/semantic_cache_benchmark.py --entries 100000
+    python scripts/semantic_cache_benchmark.py --entries 100000 --dim 64   # compare dimensions
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+from src.cache.semantic import SemanticCache  # noqa: E402
+from src.config import SEMANTIC_CACHE_DIM  # noqa: E402
+
+WORDS = (
+    "explain summarize compare write translate list describe why how what when the a of for "
+    "database network compiler invoice payment account model training cache latency protocol "
+    "photosynthesis history poem story recipe function error deployment cluster budget policy"
+).split()
+
+
+def prompt(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 16))) + f" #{rng.randrange(10**6)}"
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def time_lookups(cache: SemanticCache, prompts: list, partitions: int) -> list:
+    timings = []
+    for index, text in enumerate(prompts):
+        started = time.perf_counter()
+        cache.lookup(text, index % partitions)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--partitions", type=int, default=1)
+    parser.add_argument("--dim", type=int, default=SEMANTIC_CACHE_DIM)
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--budget-us", type=float, default=1000.0, help="max p99 lookup latency")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cache = SemanticCache(capacity=args.entries, dim=args.dim, ttl_s=3600)
+    stored = [prompt(rng) for _ in range(args.entries)]
+    for index, text in enumerate(stored):
+        cache.add(text, index % args.partitions, index)
+
+    # Hits reuse stored prompts in their own partition; misses are fresh prompts
+    hit_indexes = rng.sample(range(args.entries), min(args.lookups, args.entries))
+    hits = []
+    for index in hit_indexes:
+        started = time.perf_counter()
+        cache.lookup(stored[index], index % args.partitions)
+        hits.append((time.perf_counter() - started) * 1e6)
+    misses = time_lookups(cache, [prompt(rng) for _ in range(args.lookups)], args.partitions)
+
+    print(f"{args.entries} entries, {args.partitions} partition(s), dim {args.dim}")
+    print(f"{'lookup':<8}{'p50 us':>10}{'p99 us':>10}")
+    failures = []
+    for name, timings in (("hit", hits), ("miss", misses)):
+        p50, p99 = percentile(timings, 50), percentile(timings, 99)
+        print(f"{name:<8}{p50:10.1f}{p99:10.1f}")
+        if p99 > args.budget_us:
+            failures.append(f"{name}: p99 {p99:.0f} us over the {args.budget_us:.0f} us budget")
+    print(cache.to_dict())
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
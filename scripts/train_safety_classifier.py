@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Train the local first-tier safety classifier
+
+Reads labeled texts (JSONL lines of {"text": ..., "label": ...}, label 1/true/
+"toxic" for harmful and 0/false/"safe" otherwise), fits the hashed-trigram
+logistic model, and writes the .npz that TOXICITY_LOCAL_MODEL points at. A
+held-out split reports how many texts the local tier would answer at the given
+thresholds and how accurate those answers are, i.e. the expected escalation
+rate and tier agreement.
+
+    python scripts/train_safety_classifier.py labeled.jsonl --out models/safety_linear.npz
+    python scripts/train_safety_classifier.py labeled.jsonl --safe-below 0.05 --toxic-above 0.98
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+from src.security.local_classifier import LinearSafetyModel  # noqa: E402
+
+TOXIC_LABELS = {"1", "true", "toxic", "harmful", "unsafe"}
+
+
+def read_examples(path: str):
+    texts, labels = [], []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            texts.append(record["text"])
+            labels.append(1 if str(record["label"]).strip().lower() in TOXIC_LABELS else 0)
+    return texts, labels
+
+
+def evaluate(model, texts, labels, safe_below: float, toxic_above: float) -> dict:
+    local = correct_local = correct = 0
+    for text, label in zip(texts, labels):
+        score = model.score(text)
+        correct += int((score >= 0.5) == bool(label))
+        if score <= safe_below or score >= toxic_above:
+            local += 1
+            correct_local += int((score >= toxic_above) == bool(label))
+    n = len(texts) or 1
+    return {
+        "accuracy": round(correct / n, 4),
+        "answered_locally": round(local / n, 4),
+        "escalation_rate": round(1 - local / n, 4),
+        "local_accuracy": round(correct_local / local, 4) if local else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data", help="JSONL of {text, label}")
+    parser.add_argument("--out", default="models/safety_linear.npz")
+    parser.add_argument("--dim", type=int, default=4096, help="number of hashed features")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=4.0)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--safe-below", type=float, default=0.05)
+    parser.add_argument("--toxic-above", type=float, default=0.98)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts, labels = read_examples(args.data)
+    order = list(range(len(texts)))
+    random.Random(args.seed).shuffle(order)
+    split = int(len(order) * (1 - args.holdout))
+    train, test = order[:split], order[split:]
+    print(f"{len(train)} training / {len(test)} held-out texts, {sum(labels)} labeled toxic")
+
+    started = time.perf_counter()
+    model = LinearSafetyModel.fit(
+        [texts[i] for i in train], [labels[i] for i in train],
+        dim=args.dim, epochs=args.epochs, learning_rate=args.learning_rate
+    )
+    print(f"trained in {time.perf_counter() - started:.1f}s")
+
+    for name, rows in (("train", train), ("held-out", test)):
+        if rows:
+            report = evaluate(model, [texts[i] for i in rows], [labels[i] for i in rows],
+                              args.safe_below, args.toxic_above)
+            print(f"{name}: {report}")
+
+    started = time.perf_counter()
+    for i in test[:1000] or train[:1000]:
+        model.score(texts[i])
+    scored = len(test[:1000] or train[:1000]) or 1
+    print(f"scoring: {(time.perf_counter() - started) / scored * 1e6:.1f} us per text")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    model.save(args.out)
+    print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,40 @@
 API routes for the Enterprise AI Gateway
 """
 
+import asyncio
+import json
 import time
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, Request, status
-from fastapi.responses import HTMLResponse
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response, status
+from fastapi.responses import HTMLResponse, StreamingResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
-from pydantic import BaseModel
-
-from ..models import QueryRequest, QueryResponse, HealthResponse
-from ..security import validate_api_key, detect_pii, detect_prompt_injection, detect_toxicity
-from ..llm.client import llm_client
-from ..config import RATE_LIMIT, SERVICE_API_KEY
+from pydantic import BaseModel, Field, ValidationError
+
+from ..models import QueryRequest, QueryResponse, HealthResponse, MAX_TOKENS_LIMIT
+from ..security import (
+    validate_api_key, detect_pii, find_prompt_injection, detect_toxicity, detect_toxicity_batch,
+)
+from ..security.pipeline import safety_pipeline, run_guarded, guard_stream, PROMPT_BLOCKED_ERROR
+from ..security.toxicity import toxicity_service
+from ..llm.client import (
+    llm_client, DEADLINE_EXCEEDED_ERROR, PROVIDERS_SATURATED_ERROR, CONTEXT_WINDOW_ERROR,
+    POLICY_UNSATISFIABLE_ERROR,
+)
+from ..llm.policy import RoutingPolicy
+from ..llm.tokens import estimate_model_tokens
+from ..config import (
+    RATE_LIMIT, SERVICE_API_KEY, ROUTING_STRATEGY, REQUEST_TIMEOUT_MS, REQUEST_TIMEOUT_MAX_MS,
+    RESPONSE_CACHE_ENABLED, LLM_SATURATED_RETRY_AFTER_S,
+    BATCH_MAX_PROMPTS, BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY, BATCH_JOB_MAX_PROMPTS,
+    SECURITY_MAX_INPUT_CHARS, TOXICITY_BATCH_MAX_TEXTS,
+)
+from ..batch import fan_out, ResilienceSummary
+from ..batch.jobs import job_manager, parse_prompt_file, ACTIVE_STATUSES
+from ..cache import response_cache, make_cache_key
+from ..cache.semantic import semantic_cache
 from ..metrics import metrics
+from ..metrics.runtime import runtime_monitor
 from ..providers import PROVIDER_CONFIG, estimate_cost
 
 
@@ -22,6 +43,65 @@ from ..providers import PROVIDER_CONFIG, estimate_cost
 class BatchRequest(BaseModel):
     prompts: List[str]
 
+class BatchJobRequest(BaseModel):
+    prompts: List[str]
+    max_tokens: int = Field(256, ge=1, le=MAX_TOKENS_LIMIT)
+    temperature: float = Field(0.7, ge=0.0, le=2.0)
+
+def request_timeout_ms(x_request_timeout_ms: Optional[int] = Header(None, ge=1)) -> int:
+    """Per-request deadline from X-Request-Timeout-Ms, capped at REQUEST_TIMEOUT_MAX_MS"""
+    if x_request_timeout_ms is None:
+        return REQUEST_TIMEOUT_MS
+    return min(x_request_timeout_ms, REQUEST_TIMEOUT_MAX_MS)
+
+def query_policy(query: QueryRequest) -> Optional[RoutingPolicy]:
+    """Routing policy for a request that sets a latency target or cost ceiling"""
+    if query.max_latency_ms is None and query.max_cost_usd is None:
+        return None
+    return RoutingPolicy(query.max_latency_ms, query.max_cost_usd, query.prefer)
+
+def answer_cost(prompt: str, output: str, provider_name: str, model: str, usage: dict = None) -> float:
+    """Cost from provider-reported usage, else from local token estimates"""
+    if usage:
+        input_tokens, output_tokens = usage["input_tokens"], usage["output_tokens"]
+    else:
+        input_tokens = estimate_model_tokens(prompt, model)
+        output_tokens = estimate_model_tokens(output, model) if output else 0
+    return estimate_cost(provider_name, model, input_tokens, output_tokens)
+
+def prompt_blocked() -> HTTPException:
+    """Record a prompt the toxicity check blocked; returns the 422 to raise"""
+    metrics.record_request(blocked=True, toxicity_detected=True)
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=PROMPT_BLOCKED_ERROR)
+
+def blocked_spend(query: QueryRequest, policy: Optional[RoutingPolicy], provider_name: str = None,
+                  model: str = None, output: str = "", usage: dict = None) -> float:
+    """Provider spend thrown away on a blocked prompt. Without the serving provider
+    (call cancelled in flight) the prompt is charged at the primary route's price."""
+    if provider_name is None:
+        ordered = llm_client.route_providers(query.prompt, query.max_tokens, query.routing_strategy, policy)
+        if not ordered:
+            return 0.0
+        provider_name, model = ordered[0]["name"], ordered[0]["model"]
+    return answer_cost(query.prompt, output, provider_name, model, usage)
+
+def validate_job_prompts(prompts: List[str], max_tokens: int, temperature: float) -> List[str]:
+    """Validate job prompts exactly as /query would (length, injection, PII).
+    Returns the prompts to run (redacted under PII_MODE=redact); raises a 422
+    listing every rejected prompt by index."""
+    validated, errors = [], []
+    for index, prompt in enumerate(prompts):
+        try:
+            validated.append(QueryRequest(prompt=prompt, max_tokens=max_tokens, temperature=temperature).prompt)
+        except ValidationError as e:
+            errors.extend(
+                {"loc": ["prompts", index], "msg": error["msg"], "type": error["type"]}
+                for error in e.errors(include_url=False)
+            )
+    if errors:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errors)
+    return validated
+
 # --- Router Setup ---
 router = APIRouter()
 limiter = Limiter(key_func=get_remote_address, default_limits=[RATE_LIMIT])
@@ -57,31 +137,105 @@ async def health_check(request: Request):
 
 @router.post("/query", response_model=QueryResponse)
 @limiter.limit(RATE_LIMIT)
-async def query_llm(request: Request, query: QueryRequest, api_key: str = Depends(validate_api_key)):
-    """Query LLM with security and fallback protocols"""
+async def query_llm(
+    request: Request,
+    response: Response,
+    query: QueryRequest,
+    api_key: str = Depends(validate_api_key),
+    timeout_ms: int = Depends(request_timeout_ms),
+    x_cache_mode: Optional[str] = Header(None, pattern="^(use|bypass|refresh)$")
+):
+    """Query LLM with security and fallback protocols
+
+    X-Cache-Mode: "bypass" skips the response cache, "refresh" recomputes and stores.
+    Only temperature 0 requests are cached by default, since a sampled answer
+    replayed from the cache is no longer a sample; "use" opts a sampled request in.
+    """
 
     # 1. Input Validation is handled by Pydantic models automatically before this line
 
-    # 2. Execute Logic
-    response_content, provider_used, latency_ms, error_message, cascade_path = await llm_client.query_llm_cascade(
-        prompt=query.prompt,
-        max_tokens=query.max_tokens,
-        temperature=query.temperature
+    # 2. Response caches (exact, then semantic), keyed on the resolved primary model.
+    # The cache is shared across keys and routes, so with the safety pipeline on a
+    # hit is released only after the prompt itself passes the toxicity check.
+    pipeline_mode = safety_pipeline.mode("/query", api_key)
+    policy = query_policy(query)
+    cache_key = None
+    semantic_partition = None
+    cacheable = query.temperature == 0 or x_cache_mode in ("use", "refresh")
+    if RESPONSE_CACHE_ENABLED and cacheable and x_cache_mode != "bypass":
+        ordered = llm_client.route_providers(query.prompt, query.max_tokens, query.routing_strategy, policy)
+        if ordered:
+            primary = ordered[0]
+            cache_key = make_cache_key(
+                query.prompt, query.max_tokens, query.temperature, primary["name"], primary["model"]
+            )
+            if semantic_cache is not None:
+                semantic_partition = semantic_cache.partition_key(
+                    query.max_tokens, round(query.temperature, 3), primary["name"], primary["model"]
+                )
+    if cache_key and x_cache_mode != "refresh":
+        cache_tier = "HIT"
+        cached = response_cache.get(cache_key)
+        if cached is None and semantic_partition is not None:
+            cached, _ = semantic_cache.lookup(query.prompt, semantic_partition)
+            cache_tier = "HIT-SEMANTIC"
+        if cached:
+            if pipeline_mode != "off" and (await detect_toxicity(query.prompt))["is_toxic"]:
+                raise prompt_blocked()
+            response.headers["X-Cache"] = cache_tier
+            metrics.record_request(provider=cached["provider"], latency_ms=0, blocked=False)
+            return QueryResponse(
+                response=cached["response"],
+                provider=cached["provider"],
+                latency_ms=0,
+                status="success",
+                error=None,
+                cascade_path=[{
+                    "provider": cached["provider"],
+                    "model": cached["model"],
+                    "status": "cached",
+                    "reason": None,
+                    "latency_ms": 0
+                }],
+                cost_estimate_usd=0.0,
+                cached=True
+            )
+    response.headers["X-Cache"] = "MISS" if cache_key else "BYPASS"
+
+    # 3. Execute Logic, behind the toxicity check when the safety pipeline is on
+    guarded = await run_guarded(
+        pipeline_mode,
+        lambda: detect_toxicity(query.prompt),
+        lambda: llm_client.query_llm_cascade(
+            prompt=query.prompt,
+            max_tokens=query.max_tokens,
+            temperature=query.temperature,
+            strategy=query.routing_strategy,
+            timeout_ms=timeout_ms,
+            # A coalesced call is shared with other requests, so it could not be cancelled on a block
+            coalesce=False if pipeline_mode == "speculative" else None,
+            policy=policy
+        )
     )
+    if guarded.blocked:
+        if pipeline_mode == "speculative":
+            wasted_usd = 0.0
+            if guarded.wasted is not None and guarded.wasted[0]:
+                content, provider_name, _, _, path = guarded.wasted
+                step = next(step for step in path if step["status"] in ("success", "won"))
+                wasted_usd = blocked_spend(query, policy, provider_name, step["model"], content, step.get("usage"))
+            elif guarded.cancelled:
+                wasted_usd = blocked_spend(query, policy)
+            metrics.record_speculation(blocked=True, cancelled=guarded.cancelled, wasted_usd=wasted_usd)
+        raise prompt_blocked()
+    if pipeline_mode == "speculative":
+        metrics.record_speculation(saved_ms=guarded.saved_ms)
+    response_content, provider_used, latency_ms, error_message, cascade_path = guarded.result
 
     if response_content:
-        # Estimate cost (rough estimate based on max_tokens)
-        cost_estimate = None
-        if provider_used:
-            for provider in llm_client.providers:
-                if provider["name"] == provider_used:
-                    cost_estimate = estimate_cost(
-                        provider_used,
-                        provider["model"],
-                        len(query.prompt.split()) * 2,  # rough input token estimate
-                        query.max_tokens // 2  # assume half of max used
-                    )
-                    break
+        winner = next(step for step in cascade_path if step["status"] in ("success", "won"))
+        model_used = winner["model"]
+        cost_estimate = answer_cost(query.prompt, response_content, provider_used, model_used, winner.get("usage"))
 
         # Record metrics
         metrics.record_request(
@@ -90,6 +244,16 @@ async def query_llm(request: Request, query: QueryRequest, api_key: str = Depend
             blocked=False
         )
 
+        if cache_key:
+            cache_entry = {
+                "response": response_content,
+                "provider": provider_used,
+                "model": model_used
+            }
+            response_cache.set(cache_key, cache_entry)
+            if semantic_partition is not None:
+                semantic_cache.add(query.prompt, semantic_partition, cache_entry)
+
         return QueryResponse(
             response=response_content,
             provider=provider_used,
@@ -103,6 +267,33 @@ async def query_llm(request: Request, query: QueryRequest, api_key: str = Depend
         # Record failed request
         metrics.record_request(cascade_failed=True)
 
+        if error_message == DEADLINE_EXCEEDED_ERROR:
+            metrics.record_deadline_exceeded()
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=error_message
+            )
+
+        if error_message == CONTEXT_WINDOW_ERROR:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=error_message
+            )
+
+        if error_message == POLICY_UNSATISFIABLE_ERROR:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=error_message
+            )
+
+        if error_message == PROVIDERS_SATURATED_ERROR:
+            metrics.record_saturated()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=error_message,
+                headers={"Retry-After": str(LLM_SATURATED_RETRY_AFTER_S)}
+            )
+
         # Fallback failure
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -110,10 +301,80 @@ async def query_llm(request: Request, query: QueryRequest, api_key: str = Depend
         )
 
 
+@router.post("/query/stream")
+@limiter.limit(RATE_LIMIT)
+async def query_llm_stream(
+    request: Request,
+    query: QueryRequest,
+    api_key: str = Depends(validate_api_key),
+    timeout_ms: int = Depends(request_timeout_ms)
+):
+    """Stream LLM tokens as Server-Sent Events with pre-first-token failover.
+
+    With the safety pipeline on, no event is sent before the toxicity check passes;
+    a blocked prompt gets a single error event.
+    """
+    policy = query_policy(query)
+    pipeline_mode = safety_pipeline.mode("/query/stream", api_key)
+
+    def blocked_event(verdict: dict, held: list, cancelled: bool) -> dict:
+        metrics.record_request(blocked=True, toxicity_detected=True)
+        if pipeline_mode == "speculative":
+            done = next((event for event in held if event["type"] == "done"), None)
+            output = "".join(event["text"] for event in held if event["type"] == "token")
+            wasted_usd = 0.0
+            if done is not None:
+                wasted_usd = blocked_spend(query, policy, done["provider"], done["model"], output)
+            elif cancelled:
+                wasted_usd = blocked_spend(query, policy, output=output)
+            metrics.record_speculation(blocked=True, cancelled=cancelled, wasted_usd=wasted_usd)
+        return {"type": "error", "error": PROMPT_BLOCKED_ERROR, "cascade_path": []}
+
+    async def event_source():
+        events = llm_client.stream_llm_cascade(
+            prompt=query.prompt,
+            max_tokens=query.max_tokens,
+            temperature=query.temperature,
+            strategy=query.routing_strategy,
+            timeout_ms=timeout_ms,
+            policy=policy
+        )
+        async for event in guard_stream(
+            pipeline_mode, lambda: detect_toxicity(query.prompt), events, blocked_event,
+            on_released=lambda saved_ms: metrics.record_speculation(saved_ms=saved_ms)
+        ):
+            if event["type"] == "done":
+                metrics.record_request(provider=event["provider"], latency_ms=event["latency_ms"])
+                metrics.record_stream(ttft_ms=event["ttft_ms"])
+            elif event["type"] == "error" and event["error"] != PROMPT_BLOCKED_ERROR:
+                metrics.record_request(cascade_failed=True)
+                if event["error"] == DEADLINE_EXCEEDED_ERROR:
+                    metrics.record_deadline_exceeded()
+                elif event["error"] == PROVIDERS_SATURATED_ERROR:
+                    metrics.record_saturated()
+                    event["retry_after_s"] = LLM_SATURATED_RETRY_AFTER_S
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/metrics")
 async def get_metrics():
     """Return current gateway metrics"""
-    return metrics.to_dict()
+    data = metrics.to_dict()
+    data["circuit_breakers"] = llm_client.breaker_states()
+    data["bulkheads"] = llm_client.bulkhead_states()
+    data["response_cache"] = response_cache.to_dict()
+    if semantic_cache is not None:
+        data["semantic_cache"] = semantic_cache.to_dict()
+    if toxicity_service.cache is not None:
+        data["toxicity_cache"] = toxicity_service.cache.to_dict()
+    data["runtime"] = runtime_monitor.to_dict()
+    return data
 
 
 @router.get("/providers")
@@ -123,7 +384,10 @@ async def get_providers():
     return {
         "providers": PROVIDER_CONFIG,
         "active_providers": active_providers,
-        "active_models": {p["name"]: p["model"] for p in llm_client.providers}
+        "active_models": {p["name"]: p["model"] for p in llm_client.providers},
+        "circuit_breakers": llm_client.breaker_states(),
+        "routing_strategy": ROUTING_STRATEGY,
+        "live_stats": llm_client.provider_stats()
     }
 
 
@@ -131,62 +395,134 @@ async def get_providers():
 async def batch_resilience_test(
     request: Request,
     batch: BatchRequest,
-    api_key: str = Depends(validate_api_key)
+    api_key: str = Depends(validate_api_key),
+    concurrency: Optional[int] = Query(None, ge=1, le=BATCH_MAX_CONCURRENCY)
 ):
-    """Run multiple prompts through the cascade, return aggregate metrics"""
-    results = []
-    total_failures = 0
-    total_latency = 0
+    """Run prompts through the cascade with bounded concurrency.
+
+    Streams newline-delimited JSON: one {"type": "result"} record per prompt as it
+    completes, then a final {"type": "summary"} record with aggregate metrics.
+    """
+    prompts = batch.prompts[:BATCH_MAX_PROMPTS]
+
+    async def records():
+        summary = ResilienceSummary()
+        async for result in fan_out(prompts, concurrency or BATCH_CONCURRENCY):
+            summary.add(result)
+            yield json.dumps({"type": "result", **result}) + "\n"
+        yield json.dumps({"type": "summary", **summary.to_dict()}) + "\n"
+
+    return StreamingResponse(records(), media_type="application/x-ndjson")
 
-    # Limit to 10 prompts for PoC
-    prompts = batch.prompts[:10]
 
-    for prompt in prompts:
+async def get_job_or_404(job_id: str) -> dict:
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+
+@router.post("/batch/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_batch_job(
+    request: Request,
+    api_key: str = Depends(validate_api_key),
+    max_tokens: int = Query(256, ge=1, le=MAX_TOKENS_LIMIT),
+    temperature: float = Query(0.7, ge=0.0, le=2.0)
+):
+    """Queue prompts for background execution and return the job immediately.
+
+    Accepts either a JSON body ({"prompts": [...], "max_tokens", "temperature"})
+    or a prompt file as the raw body: one prompt per line, plain text or NDJSON
+    objects with a "prompt" field (max_tokens/temperature then come from the query).
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/json"):
         try:
-            response, provider, latency, error, cascade_path = await llm_client.query_llm_cascade(
-                prompt=prompt,
-                max_tokens=256,
-                temperature=0.7
-            )
+            job_request = BatchJobRequest.model_validate_json(body)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+        prompts = job_request.prompts
+        max_tokens, temperature = job_request.max_tokens, job_request.temperature
+    else:
+        prompts = parse_prompt_file(body.decode("utf-8", errors="replace"))
 
-            failures_in_cascade = sum(1 for step in cascade_path if step["status"] == "failed")
-            total_failures += failures_in_cascade
+    if not prompts:
+        raise HTTPException(status_code=400, detail="No prompts submitted")
+    if len(prompts) > BATCH_JOB_MAX_PROMPTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch job exceeds {BATCH_JOB_MAX_PROMPTS} prompts"
+        )
+    prompts = await asyncio.to_thread(validate_job_prompts, prompts, max_tokens, temperature)
+    return await job_manager.submit(prompts, max_tokens, temperature)
+
+
+@router.get("/batch/jobs/{job_id}")
+async def get_batch_job(job_id: str, api_key: str = Depends(validate_api_key)):
+    """Job status and progress counters"""
+    return await get_job_or_404(job_id)
 
-            if response:
-                total_latency += latency
-                metrics.record_request(provider=provider, latency_ms=latency)
-            else:
-                metrics.record_request(cascade_failed=True)
 
-            results.append({
-                "prompt": prompt[:50] + "..." if len(prompt) > 50 else prompt,
-                "success": response is not None,
-                "provider": provider,
-                "latency_ms": latency,
-                "cascade_path": cascade_path,
-                "failures_in_cascade": failures_in_cascade
-            })
-        except Exception as e:
-            results.append({
-                "prompt": prompt[:50] + "..." if len(prompt) > 50 else prompt,
-                "success": False,
-                "error": str(e)
-            })
-
-    successful = sum(1 for r in results if r.get("success"))
-    avg_latency = total_latency / successful if successful > 0 else 0
+@router.delete("/batch/jobs/{job_id}")
+async def cancel_batch_job(job_id: str, api_key: str = Depends(validate_api_key)):
+    """Cancel a queued or running job; results already stored are kept"""
+    await get_job_or_404(job_id)
+    await job_manager.cancel(job_id)
+    return await get_job_or_404(job_id)
 
+
+@router.get("/batch/jobs/{job_id}/results")
+async def get_batch_job_results(
+    job_id: str,
+    api_key: str = Depends(validate_api_key),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """One page of results in submission order; unfinished items show as pending"""
+    job = await get_job_or_404(job_id)
+    results = await asyncio.to_thread(job_manager.store.page_results, job_id, offset, limit)
+    next_offset = offset + limit
     return {
-        "total": len(results),
-        "successful": successful,
-        "failed": len(results) - successful,
-        "total_cascade_failures": total_failures,
-        "average_latency_ms": round(avg_latency, 2),
-        "downtime_prevented_minutes": round(total_failures * 4, 1),  # 4 min per failure
-        "results": results
+        "job": job,
+        "offset": offset,
+        "limit": limit,
+        "results": results,
+        "next_offset": next_offset if next_offset < job["total"] else None
     }
 
 
+@router.get("/batch/jobs/{job_id}/results/stream")
+async def stream_batch_job_results(job_id: str, api_key: str = Depends(validate_api_key)):
+    """Stream results as newline-delimited JSON in completion order, following
+    the job until it finishes, then emit a final {"type": "job"} record."""
+    await get_job_or_404(job_id)
+
+    async def records():
+        after_seq = 0
+        while True:
+            job = await job_manager.get(job_id)
+            page = await asyncio.to_thread(job_manager.store.results_since, job_id, after_seq, 500)
+            for after_seq, result in page:
+                yield json.dumps({"type": "result", **result}) + "\n"
+            if not page:
+                if job is None or job["status"] not in ACTIVE_STATUSES:
+                    break
+                await asyncio.sleep(0.5)
+        yield json.dumps({"type": "job", **(job or {})}) + "\n"
+
+    return StreamingResponse(records(), media_type="application/x-ndjson")
+
+
+def check_scan_size(texts):
+    """Reject texts too large to scan within the per-request CPU budget"""
+    for text in texts:
+        if len(text) > SECURITY_MAX_INPUT_CHARS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Text exceeds {SECURITY_MAX_INPUT_CHARS} characters"
+            )
+
+
 @router.post("/batch/security")
 async def batch_security_test(batch: BatchRequest):
     """Test prompts for security issues without executing LLM calls"""
@@ -195,9 +531,11 @@ async def batch_security_test(batch: BatchRequest):
     pii_leaks = 0
     injection_attempts = 0
 
+    check_scan_size(batch.prompts[:20])
     for prompt in batch.prompts[:20]:  # Limit to 20
         pii_result = detect_pii(prompt)
-        injection_detected = detect_prompt_injection(prompt)
+        injection = find_prompt_injection(prompt)
+        injection_detected = injection is not None
 
         blocked = pii_result["has_pii"] or injection_detected
 
@@ -215,7 +553,8 @@ async def batch_security_test(batch: BatchRequest):
             "blocked": blocked,
             "pii_detected": pii_result["pii_types"] if pii_result["has_pii"] else [],
             "pii_matches": pii_result["matches"] if pii_result["has_pii"] else {},
-            "injection_detected": injection_detected
+            "injection_detected": injection_detected,
+            "injection_rule": injection.rule if injection else None
         })
 
     # Calculate compliance fines avoided (GDPR ~$50K + CCPA ~$7.5K avg = $28K per violation)
@@ -242,7 +581,12 @@ async def check_toxicity(request: ToxicityRequest):
     Check text for toxic content using AI safety classification.
     Returns toxicity scores and blocked categories.
     """
-    result = detect_toxicity(request.text)
+    check_scan_size([request.text])
+    result = await detect_toxicity(request.text)
+    return public_toxicity_result(result)
+
+
+def public_toxicity_result(result: dict) -> dict:
     # Sanitize error - don't expose internal details to users
     has_error = result["error"] is not None
     return {
@@ -250,4 +594,29 @@ async def check_toxicity(request: ToxicityRequest):
         "scores": result["scores"],
         "blocked_categories": result["blocked_categories"],
         "error": "Safety check encountered an issue" if has_error else None
+    }
+
+
+class ToxicityBatchRequest(BaseModel):
+    texts: List[str]
+
+
+@router.post("/check-toxicity/batch")
+async def check_toxicity_batch(request: ToxicityBatchRequest):
+    """
+    Check many texts for toxic content, several texts per classification call.
+    Returns one result per text, in request order.
+    """
+    if len(request.texts) > TOXICITY_BATCH_MAX_TEXTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {TOXICITY_BATCH_MAX_TEXTS} texts"
+        )
+    check_scan_size(request.texts)
+    results = [public_toxicity_result(result) for result in await detect_toxicity_batch(request.texts)]
+    return {
+        "total": len(results),
+        "toxic": sum(result["is_toxic"] for result in results),
+        "errors": sum(result["error"] is not None for result in results),
+        "results": results
     }
\ No newline at end of file
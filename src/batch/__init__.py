@@ -0,0 +1,106 @@
+"""
+Batch execution helpers for the Enterprise AI Gateway
+"""
+
+import asyncio
+import time
+
+from ..llm.client import llm_client
+from ..metrics import metrics
+
+
+def truncate_prompt(prompt: str) -> str:
+    return prompt[:50] + "..." if len(prompt) > 50 else prompt
+
+
+async def run_resilience_prompt(index: int, prompt: str, max_tokens: int = 256, temperature: float = 0.7,
+                                include_response: bool = False) -> dict:
+    """Run one prompt through the cascade and return its result record"""
+    try:
+        response, provider, latency, error, cascade_path = await llm_client.query_llm_cascade(
+            prompt=prompt,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+    except Exception as e:
+        return {
+            "index": index,
+            "prompt": truncate_prompt(prompt),
+            "success": False,
+            "error": str(e)
+        }
+
+    if response:
+        metrics.record_request(provider=provider, latency_ms=latency)
+    else:
+        metrics.record_request(cascade_failed=True)
+
+    result = {
+        "index": index,
+        "prompt": truncate_prompt(prompt),
+        "success": response is not None,
+        "provider": provider,
+        "latency_ms": latency,
+        "cascade_path": cascade_path,
+        "failures_in_cascade": sum(1 for step in cascade_path if step["status"] == "failed")
+    }
+    if error:
+        result["error"] = error
+    if include_response:
+        result["response"] = response
+    return result
+
+
+async def fan_out(prompts, concurrency: int, run=run_resilience_prompt):
+    """Run prompts with at most `concurrency` in flight, yielding each result
+    record as soon as it completes (completion order, not input order)"""
+    prompt_iter = iter(enumerate(prompts))
+    pending = set()
+
+    def fill():
+        for index, prompt in prompt_iter:
+            pending.add(asyncio.ensure_future(run(index, prompt)))
+            if len(pending) >= concurrency:
+                return
+
+    fill()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                yield task.result()
+            fill()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class ResilienceSummary:
+    """Running aggregate over result records, so results need not be retained"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0
+        self.successful = 0
+        self.total_failures = 0
+        self.total_latency = 0
+
+    def add(self, result: dict):
+        self.total += 1
+        self.total_failures += result.get("failures_in_cascade", 0)
+        if result.get("success"):
+            self.successful += 1
+            self.total_latency += result.get("latency_ms", 0)
+
+    def to_dict(self) -> dict:
+        avg_latency = self.total_latency / self.successful if self.successful > 0 else 0
+        return {
+            "total": self.total,
+            "successful": self.successful,
+            "failed": self.total - self.successful,
+            "total_cascade_failures": self.total_failures,
+            "average_latency_ms": round(avg_latency, 2),
+            "downtime_prevented_minutes": round(self.total_failures * 4, 1),  # 4 min per failure
+            "elapsed_ms": int((time.perf_counter() - self.started) * 1000),
+        }
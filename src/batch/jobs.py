@@ -0,0 +1,314 @@
+"""
+Asynchronous batch jobs: SQLite-backed job store and in-process worker pool
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from ..config import (
+    BATCH_JOBS_DB, BATCH_JOB_WORKERS, BATCH_JOB_MAX_ATTEMPTS, BATCH_JOB_RETRY_BACKOFF_S,
+    LLM_SATURATED_RETRY_AFTER_S,
+)
+from ..llm.client import PROVIDERS_SATURATED_ERROR
+from . import run_resilience_prompt, truncate_prompt
+
+FEED_PAGE_SIZE = 100
+ACTIVE_STATUSES = ("queued", "running")
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    succeeded INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    max_tokens INTEGER NOT NULL,
+    temperature REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    seq INTEGER,
+    result TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS items_by_seq ON items (job_id, seq);
+"""
+
+
+def parse_prompt_file(text: str) -> list:
+    """Prompts from an uploaded file: one per line, either plain text or an
+    NDJSON object with a "prompt" field. Blank lines are skipped."""
+    prompts = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict) and isinstance(record.get("prompt"), str):
+                prompts.append(record["prompt"])
+                continue
+        prompts.append(line)
+    return prompts
+
+
+class JobStore:
+    """Thread-safe SQLite persistence for jobs and their per-prompt results"""
+
+    def __init__(self, path: str = BATCH_JOBS_DB):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _job_dict(row) -> dict:
+        job = dict(row)
+        job["progress"] = round(job["completed"] / job["total"], 4) if job["total"] else 1.0
+        return job
+
+    def create_job(self, prompts: list, max_tokens: int, temperature: float) -> dict:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        status = "queued" if prompts else "completed"
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, total, max_tokens, temperature, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, status, len(prompts), max_tokens, temperature, now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO items (job_id, idx, prompt) VALUES (?, ?, ?)",
+                ((job_id, idx, prompt) for idx, prompt in enumerate(prompts))
+            )
+            self._conn.execute("COMMIT")
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._job_dict(row) if row else None
+
+    def active_job_ids(self) -> list:
+        """Jobs that still have work, oldest first (used to resume after a restart)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", ACTIVE_STATUSES
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def set_status(self, job_id: str, status: str, only_if_active: bool = True) -> bool:
+        query = "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?"
+        params = [status, time.time(), job_id]
+        if only_if_active:
+            query += " AND status IN (?, ?)"
+            params.extend(ACTIVE_STATUSES)
+        with self._lock:
+            return self._conn.execute(query, params).rowcount > 0
+
+    def pending_items(self, job_id: str, after_idx: int, limit: int) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, prompt FROM items WHERE job_id = ? AND status = 'pending' AND idx > ? "
+                "ORDER BY idx LIMIT ?",
+                (job_id, after_idx, limit)
+            ).fetchall()
+        return [(row["idx"], row["prompt"]) for row in rows]
+
+    def complete_item(self, job_id: str, idx: int, result: dict):
+        """Store one result and advance job counters. Idempotent per item."""
+        succeeded = 1 if result.get("success") else 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            job = self._conn.execute(
+                "SELECT completed, total FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            updated = self._conn.execute(
+                "UPDATE items SET status = 'done', seq = ?, result = ? "
+                "WHERE job_id = ? AND idx = ? AND status = 'pending'",
+                (job["completed"] + 1, json.dumps(result), job_id, idx)
+            ).rowcount
+            if updated:
+                finished = job["completed"] + 1 >= job["total"]
+                self._conn.execute(
+                    "UPDATE jobs SET completed = completed + 1, succeeded = succeeded + ?, failed = failed + ?, "
+                    "status = CASE WHEN ? AND status IN ('queued', 'running') THEN 'completed' ELSE status END, "
+                    "updated_at = ? WHERE job_id = ?",
+                    (succeeded, 1 - succeeded, finished, time.time(), job_id)
+                )
+            self._conn.execute("COMMIT")
+
+    def page_results(self, job_id: str, offset: int, limit: int) -> list:
+        """Items [offset, offset + limit) in submission order, pending ones included"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, status, result FROM items WHERE job_id = ? AND idx >= ? ORDER BY idx LIMIT ?",
+                (job_id, offset, limit)
+            ).fetchall()
+        return [
+            json.loads(row["result"]) if row["result"] else {"index": row["idx"], "status": row["status"]}
+            for row in rows
+        ]
+
+    def results_since(self, job_id: str, after_seq: int, limit: int) -> list:
+        """Completed results in completion order, after a completion sequence number"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, result FROM items WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after_seq, limit)
+            ).fetchall()
+        return [(row["seq"], json.loads(row["result"])) for row in rows]
+
+
+class JobManager:
+    """Feeds pending items of active jobs into a bounded queue consumed by a
+    fixed worker pool. Every worker goes through the shared LLMClient cascade,
+    so provider bulkheads set the real throughput: a request rejected because
+    all providers are at capacity is retried after a back-off rather than
+    recorded as a failure, for as long as the job stays active. A run that
+    raises is retried up to BATCH_JOB_MAX_ATTEMPTS times with doubling
+    back-off, then recorded as a failed item so the job can still finish. If
+    the store itself fails on an item, the job is marked failed: the feeder
+    has already moved past the item, so it would otherwise never complete."""
+
+    def __init__(self, path: str = BATCH_JOBS_DB, workers: int = BATCH_JOB_WORKERS, run=run_resilience_prompt):
+        self.path = path
+        self.workers = workers
+        self._run = run
+        self.store = None
+        self._tasks = []
+
+    async def start(self):
+        """Open the store, resume unfinished jobs and start the workers"""
+        self.store = await asyncio.to_thread(JobStore, self.path)
+        self._items = asyncio.Queue(maxsize=self.workers * 2)
+        self._jobs = asyncio.Queue()
+        for job_id in await asyncio.to_thread(self.store.active_job_ids):
+            self._jobs.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._feed())]
+        self._tasks += [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop workers; unfinished items stay pending and resume on next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    async def submit(self, prompts: list, max_tokens: int, temperature: float) -> dict:
+        job = await asyncio.to_thread(self.store.create_job, prompts, max_tokens, temperature)
+        if job["status"] == "queued":
+            self._jobs.put_nowait(job["job_id"])
+        return job
+
+    async def get(self, job_id: str):
+        return await asyncio.to_thread(self.store.get_job, job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        return await asyncio.to_thread(self.store.set_status, job_id, "cancelled")
+
+    async def _feed(self):
+        while True:
+            job_id = await self._jobs.get()
+            await asyncio.to_thread(self.store.set_status, job_id, "running")
+            after_idx = -1
+            while True:
+                job = await asyncio.to_thread(self.store.get_job, job_id)
+                if job is None or job["status"] not in ACTIVE_STATUSES:
+                    break
+                items = await asyncio.to_thread(self.store.pending_items, job_id, after_idx, FEED_PAGE_SIZE)
+                if not items:
+                    break
+                for idx, prompt in items:
+                    await self._items.put((job, idx, prompt))
+                    after_idx = idx
+
+    async def _is_active(self, job_id: str) -> bool:
+        job = await asyncio.to_thread(self.store.get_job, job_id)
+        return job is not None and job["status"] in ACTIVE_STATUSES
+
+    async def _work(self):
+        while True:
+            job, idx, prompt = await self._items.get()
+            try:
+                if not await self._is_active(job["job_id"]):
+                    continue
+                result = await self._run_with_retries(job, idx, prompt)
+                if result is not None:
+                    await asyncio.to_thread(self.store.complete_item, job["job_id"], idx, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Batch job %s: storing item %d failed, marking the job failed", job["job_id"], idx)
+                try:
+                    await asyncio.to_thread(self.store.set_status, job["job_id"], "failed")
+                except Exception:
+                    logger.exception("Batch job %s: could not mark the job failed", job["job_id"])
+            finally:
+                self._items.task_done()
+
+    async def _run_with_retries(self, job: dict, idx: int, prompt: str):
+        """Result record for the item, or None if the job stopped being active
+        while the item waited for provider capacity"""
+        attempts = max(BATCH_JOB_MAX_ATTEMPTS, 1)
+        for attempt in range(1, attempts + 1):
+            try:
+                while True:
+                    result = await self._run(
+                        idx, prompt,
+                        max_tokens=job["max_tokens"],
+                        temperature=job["temperature"],
+                        include_response=True
+                    )
+                    if result.get("error") != PROVIDERS_SATURATED_ERROR:
+                        return result
+                    await asyncio.sleep(LLM_SATURATED_RETRY_AFTER_S)
+                    if not await self._is_active(job["job_id"]):
+                        return None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt < attempts:
+                    await asyncio.sleep(BATCH_JOB_RETRY_BACKOFF_S * 2 ** (attempt - 1))
+        return {
+            "index": idx,
+            "prompt": truncate_prompt(prompt),
+            "success": False,
+            "error": error,
+            "attempts": attempts
+        }
+
+
+# Singleton instance (started and stopped by the app lifespan)
+job_manager = JobManager()
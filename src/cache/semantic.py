@@ -0,0 +1,226 @@
+"""
+Local semantic cache: hashed character n-gram embeddings with a vectorized
+cosine-similarity lookup over per-partition NumPy matrices
+
+A full scan of 100k float32 rows is bound by memory bandwidth (about 0.5 ms at
+dimension 32), so a lookup reads a narrower sketch of each row first. The
+sketch holds the row's first dimensions and the norm of the rest; against the
+query laid out the same way, one matrix-vector product gives every row an upper
+bound on its similarity (Cauchy-Schwarz on the remaining dimensions). Only rows
+whose bound reaches the threshold are scored exactly, so results are the same
+as a full scan.
+"""
+
+import hashlib
+import re
+import threading
+import time
+
+import numpy as np
+
+from ..config import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_CAPACITY,
+    SEMANTIC_CACHE_DIM,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL_S,
+)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class HashedNgramEmbedder:
+    """CPU-only embedder: signed feature hashing of character trigrams, L2-normalized"""
+
+    def __init__(self, dim: int = SEMANTIC_CACHE_DIM):
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        normalized = " " + " ".join(_WORD_RE.findall(text.lower())) + " "
+        data = np.frombuffer(normalized.encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if data.size < 3:
+            return vector
+        hashed = ((data[:-2] * np.uint32(16777619)) ^ (data[1:-1] * np.uint32(40503)) ^ data[2:]) \
+            * np.uint32(2654435761)
+        index = (hashed >> np.uint32(8)) % np.uint32(self.dim)
+        sign = np.where(hashed & np.uint32(1), 1.0, -1.0)
+        vector[:] = np.bincount(index, weights=sign, minlength=self.dim)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+
+def _sketch_split(dim: int) -> int:
+    """Leading dimensions kept in the sketch; with the norm column it is half as wide as a row"""
+    return max(dim // 2 - 1, 0)
+
+
+def _sketch(vectors: np.ndarray, split: int) -> np.ndarray:
+    """First `split` dimensions of each vector followed by the norm of the rest"""
+    head = vectors[..., :split]
+    rest = np.linalg.norm(vectors[..., split:], axis=-1, keepdims=True).astype(np.float32)
+    return np.concatenate((head, rest), axis=-1)
+
+
+class _Partition:
+    """Rows of one partition, kept contiguous so a lookup scans only its own rows"""
+
+    _ARRAYS = ("sketches", "tails", "expires", "last_used", "scores")
+
+    def __init__(self, dim: int, rows: int):
+        self.split = _sketch_split(dim)
+        self.sketches = np.zeros((rows, self.split + 1), dtype=np.float32)
+        self.tails = np.zeros((rows, dim - self.split), dtype=np.float32)
+        self.expires = np.zeros(rows, dtype=np.float64)
+        self.last_used = np.zeros(rows, dtype=np.float64)
+        self.scores = np.zeros(rows, dtype=np.float32)  # lookup output buffer
+        self.values = [None] * rows
+        self.size = 0
+
+    def append(self, vector: np.ndarray, expires: float, now: float, value, max_rows: int):
+        if self.size == len(self.values):
+            self._grow(min(max(2 * self.size, 1), max_rows))
+        row = self.size
+        self.sketches[row] = _sketch(vector, self.split)
+        self.tails[row] = vector[self.split:]
+        self.expires[row] = expires
+        self.last_used[row] = now
+        self.values[row] = value
+        self.size += 1
+
+    def remove(self, row: int):
+        """Drop a row by moving the last row into its place"""
+        last = self.size - 1
+        self.sketches[row] = self.sketches[last]
+        self.tails[row] = self.tails[last]
+        self.expires[row] = self.expires[last]
+        self.last_used[row] = self.last_used[last]
+        self.values[row] = self.values[last]
+        self.values[last] = None
+        self.size = last
+
+    def _grow(self, rows: int):
+        for name in self._ARRAYS:
+            old = getattr(self, name)
+            grown = np.zeros((rows,) + old.shape[1:], dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+        self.values.extend([None] * (rows - len(self.values)))
+
+
+class SemanticCache:
+    """Capacity-bounded nearest-neighbour cache.
+
+    Each entry belongs to a partition (hash of generation parameters and model),
+    and only entries of the same partition can match. Each partition keeps its
+    rows in one contiguous matrix, so a lookup is a single matrix-vector product
+    over that partition's sketches, followed by exact scores for the rows that
+    can still reach the threshold; expired rows are excluded before the best
+    match is taken. When full, the least recently used entry is dropped.
+    """
+
+    # Slack for float32 rounding in the bound, so a row exactly at the threshold is still scored
+    BOUND_SLACK = 1e-4
+
+    def __init__(
+        self,
+        capacity: int = SEMANTIC_CACHE_CAPACITY,
+        dim: int = SEMANTIC_CACHE_DIM,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl_s: float = SEMANTIC_CACHE_TTL_S,
+        clock=time.monotonic
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.embedder = HashedNgramEmbedder(dim)
+        self._clock = clock
+
+        self._partitions = {}  # partition id -> _Partition
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def partition_key(*parts) -> int:
+        """Stable 63-bit partition id for generation parameters and model"""
+        digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") & 0x7FFFFFFFFFFFFFFF
+
+    def lookup(self, text: str, partition: int):
+        """Return (value, similarity) for the nearest live entry above the threshold,
+        or (None, best_similarity) where only rows that could reach the threshold
+        are scored (0.0 if none could)"""
+        query = self.embedder.embed(text)
+        with self._lock:
+            rows = self._partitions.get(partition)
+            if rows is None:
+                self.misses += 1
+                return None, 0.0
+            now = self._clock()
+            query_sketch = _sketch(query, rows.split)
+            bounds = np.dot(rows.sketches[:rows.size], query_sketch, out=rows.scores[:rows.size])
+            candidates = np.flatnonzero(bounds >= self.threshold - self.BOUND_SLACK)
+            candidates = candidates[rows.expires[candidates] > now]
+            similarity = 0.0
+            if candidates.size:
+                # Swap each candidate's norm term in the bound for its exact remainder
+                scores = bounds[candidates] + rows.tails.take(candidates, axis=0) @ query[rows.split:] \
+                    - rows.sketches[candidates, rows.split] * query_sketch[rows.split]
+                best = int(np.argmax(scores))
+                row, similarity = int(candidates[best]), float(scores[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None, max(similarity, 0.0)
+            rows.last_used[row] = now
+            self.hits += 1
+            return rows.values[row], similarity
+
+    def add(self, text: str, partition: int, value):
+        """Insert an entry, dropping the least recently used one when full"""
+        if self.capacity <= 0:
+            return
+        vector = self.embedder.embed(text)
+        with self._lock:
+            now = self._clock()
+            if self._size >= self.capacity:
+                self._evict_lru()
+            rows = self._partitions.get(partition)
+            if rows is None:
+                rows = self._partitions[partition] = _Partition(len(vector), min(16, self.capacity))
+            rows.append(vector, now + self.ttl_s, now, value, self.capacity)
+            self._size += 1
+
+    def _evict_lru(self):
+        partition, rows = min(
+            self._partitions.items(), key=lambda item: item[1].last_used[:item[1].size].min()
+        )
+        rows.remove(int(np.argmin(rows.last_used[:rows.size])))
+        if not rows.size:
+            del self._partitions[partition]
+        self._size -= 1
+        self.evictions += 1
+
+    def to_dict(self) -> dict:
+        """Return cache counters as a dictionary"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._size,
+                "partitions": len(self._partitions),
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Singleton instance (None unless SEMANTIC_CACHE_ENABLED)
+semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
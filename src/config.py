@@ -13,3 +13,105 @@ SERVICE_API_KEY = os.getenv("SERVICE_API_KEY")
 RATE_LIMIT = os.getenv("RATE_LIMIT", "10/minute")
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 ENABLE_PROMPT_INJECTION_CHECK = os.getenv("ENABLE_PROMPT_INJECTION_CHECK", "true").lower() == "true"
+INJECTION_RULES_FILE = os.getenv("INJECTION_RULES_FILE")
+PII_MODE = os.getenv("PII_MODE", "off").lower()  # off | block | redact (applies to /query prompts)
+SECURITY_MAX_INPUT_CHARS = int(os.getenv("SECURITY_MAX_INPUT_CHARS", "100000"))  # per text on /batch/security, /check-toxicity[/batch]
+
+# --- Provider Endpoints ---
+# Override to point the gateway at a local simulator (python -m src.simulator)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1").rstrip("/")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+LAKERA_API_URL = os.getenv("LAKERA_API_URL", "https://api.lakera.ai/v2/guard")
+
+# --- Toxicity Classification ---
+TOXICITY_MODE = os.getenv("TOXICITY_MODE", "fallback").lower()  # fallback: Lakera after Gemini fails; race: both at once
+TOXICITY_GEMINI_TIMEOUT_MS = float(os.getenv("TOXICITY_GEMINI_TIMEOUT_MS", "4000"))
+TOXICITY_LAKERA_TIMEOUT_MS = float(os.getenv("TOXICITY_LAKERA_TIMEOUT_MS", "3000"))
+TOXICITY_CACHE_ENABLED = os.getenv("TOXICITY_CACHE_ENABLED", "true").lower() == "true"
+TOXICITY_CACHE_MAX_ENTRIES = int(os.getenv("TOXICITY_CACHE_MAX_ENTRIES", "10000"))
+TOXICITY_CACHE_POSITIVE_TTL_S = float(os.getenv("TOXICITY_CACHE_POSITIVE_TTL_S", "3600"))  # toxic verdicts
+TOXICITY_CACHE_NEGATIVE_TTL_S = float(os.getenv("TOXICITY_CACHE_NEGATIVE_TTL_S", "600"))  # safe verdicts
+TOXICITY_LOCAL_MODEL = os.getenv("TOXICITY_LOCAL_MODEL")  # .npz from scripts/train_safety_classifier.py; unset disables
+TOXICITY_LOCAL_SAFE_BELOW = float(os.getenv("TOXICITY_LOCAL_SAFE_BELOW", "0.05"))
+TOXICITY_LOCAL_TOXIC_ABOVE = float(os.getenv("TOXICITY_LOCAL_TOXIC_ABOVE", "0.98"))
+TOXICITY_LOCAL_AUDIT_RATE = float(os.getenv("TOXICITY_LOCAL_AUDIT_RATE", "0.01"))  # share of local verdicts re-checked remotely
+TOXICITY_BATCH_MAX_TEXTS = int(os.getenv("TOXICITY_BATCH_MAX_TEXTS", "1000"))  # per /check-toxicity/batch request
+TOXICITY_BATCH_CHUNK_TEXTS = int(os.getenv("TOXICITY_BATCH_CHUNK_TEXTS", "25"))  # texts per Gemini call
+TOXICITY_BATCH_CHUNK_CHARS = int(os.getenv("TOXICITY_BATCH_CHUNK_CHARS", "20000"))  # characters per Gemini call
+TOXICITY_BATCH_CONCURRENCY = int(os.getenv("TOXICITY_BATCH_CONCURRENCY", "4"))  # chunks classified at once
+
+# --- Query Safety Pipeline ---
+# Toxicity check on /query and /query/stream prompts: off | sequential (check, then call the provider)
+# | speculative (call the provider while checking; release the response only if the check passes)
+SAFETY_PIPELINE_MODE = os.getenv("SAFETY_PIPELINE_MODE", "off").lower()
+SAFETY_PIPELINE_ROUTES = os.getenv("SAFETY_PIPELINE_ROUTES", "")  # e.g. "/query=speculative,/query/stream=sequential"
+SAFETY_PIPELINE_KEYS = os.getenv("SAFETY_PIPELINE_KEYS", "")  # "<sha256 hex of API key>=mode,..."; overrides routes
+
+# --- LLM Transport ---
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+
+# --- Hedged Cascade ---
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_DELAY_MS = float(os.getenv("LLM_HEDGE_DELAY_MS", "1500"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "100"))
+
+# --- Circuit Breaker ---
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_WINDOW_S = float(os.getenv("LLM_BREAKER_WINDOW_S", "60"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+LLM_BREAKER_HALF_OPEN_PROBES = int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1"))
+
+# --- Adaptive Routing ---
+ROUTING_STRATEGY = os.getenv("ROUTING_STRATEGY", "static").lower()
+ROUTING_COST_WEIGHT = float(os.getenv("ROUTING_COST_WEIGHT", "0.5"))
+ROUTING_EWMA_ALPHA = float(os.getenv("ROUTING_EWMA_ALPHA", "0.2"))
+ROUTING_POLICY_REFRESH_MS = float(os.getenv("ROUTING_POLICY_REFRESH_MS", "1000"))  # policy re-rank by live latency
+
+# --- Request Deadline ---
+REQUEST_TIMEOUT_MS = int(os.getenv("REQUEST_TIMEOUT_MS", "30000"))  # 0 disables the deadline
+REQUEST_TIMEOUT_MAX_MS = int(os.getenv("REQUEST_TIMEOUT_MAX_MS", "120000"))
+DEADLINE_MIN_STEP_MS = int(os.getenv("DEADLINE_MIN_STEP_MS", "250"))
+LLM_PROVIDER_TIMEOUT_MS = int(os.getenv("LLM_PROVIDER_TIMEOUT_MS", "10000"))  # 0 leaves only the even share
+
+# --- Request Coalescing ---
+LLM_COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+
+# --- Response Cache ---
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"  # temperature 0, or X-Cache-Mode: use
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", "300"))
+
+# --- Semantic Cache ---
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_CAPACITY = int(os.getenv("SEMANTIC_CACHE_CAPACITY", "10000"))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "32"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_TTL_S = float(os.getenv("SEMANTIC_CACHE_TTL_S", "300"))
+
+# --- Provider Bulkheads ---
+LLM_MAX_CONCURRENCY_PER_PROVIDER = int(os.getenv("LLM_MAX_CONCURRENCY_PER_PROVIDER", "32"))
+LLM_MAX_QUEUE_PER_PROVIDER = int(os.getenv("LLM_MAX_QUEUE_PER_PROVIDER", "64"))
+LLM_QUEUE_TIMEOUT_MS = int(os.getenv("LLM_QUEUE_TIMEOUT_MS", "1000"))
+LLM_SATURATED_RETRY_AFTER_S = int(os.getenv("LLM_SATURATED_RETRY_AFTER_S", "1"))
+
+# --- Batch Execution ---
+BATCH_MAX_PROMPTS = int(os.getenv("BATCH_MAX_PROMPTS", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "64"))
+
+# --- Runtime Monitoring ---
+EVENT_LOOP_MONITOR_INTERVAL_MS = float(os.getenv("EVENT_LOOP_MONITOR_INTERVAL_MS", "100"))  # 0 disables
+
+# --- Batch Jobs ---
+BATCH_JOBS_DB = os.getenv("BATCH_JOBS_DB", "data/batch_jobs.sqlite3")
+BATCH_JOB_WORKERS = int(os.getenv("BATCH_JOB_WORKERS", "16"))
+BATCH_JOB_MAX_PROMPTS = int(os.getenv("BATCH_JOB_MAX_PROMPTS", "100000"))
+BATCH_JOB_MAX_ATTEMPTS = int(os.getenv("BATCH_JOB_MAX_ATTEMPTS", "3"))  # before an erroring item is recorded as failed
+BATCH_JOB_RETRY_BACKOFF_S = float(os.getenv("BATCH_JOB_RETRY_BACKOFF_S", "1"))  # doubled after each attempt
@@ -0,0 +1,161 @@
+"""
+Provider adapters: request building and response parsing per LLM provider.
+
+Each adapter precomputes its URLs, static headers and payload template once,
+so a call only fills in the prompt-dependent fields. Register new providers
+with @register_adapter.
+"""
+
+import json
+from abc import ABC, abstractmethod
+
+from ..config import GEMINI_BASE_URL, GROQ_BASE_URL, OPENROUTER_BASE_URL
+
+ADAPTERS = {}
+
+
+def register_adapter(name: str):
+    """Class decorator that makes an adapter available under a provider name"""
+    def decorator(cls):
+        cls.name = name
+        ADAPTERS[name] = cls
+        return cls
+    return decorator
+
+
+def create_adapter(provider_name: str, api_key: str, model: str):
+    """Build the adapter for a provider, or None if the provider is unknown"""
+    adapter_cls = ADAPTERS.get(provider_name)
+    if adapter_cls is None:
+        return None
+    return adapter_cls(api_key, model)
+
+
+class ProviderAdapter(ABC):
+    """Base adapter. Subclasses set label/URLs in __init__ and implement the abstract methods"""
+
+    name = None
+    label = None
+    empty_response_error = "No content found in response."
+
+    def __init__(self, api_key: str, model: str):
+        self.api_key = api_key
+        self.model = model
+        self.url = None
+        self.stream_url = None
+        self.headers = {"Content-Type": "application/json"}
+
+    @abstractmethod
+    def build_request(self, prompt: str, max_tokens: int, temperature: float, stream: bool = False):
+        """Return (url, headers, body bytes) for one call"""
+
+    @abstractmethod
+    def parse_response(self, data: dict):
+        """Return the completion text from a full response, or None"""
+
+    @abstractmethod
+    def parse_stream_chunk(self, data: dict):
+        """Return the text delta carried by one streamed chunk, or None"""
+
+    @abstractmethod
+    def parse_usage(self, data: dict):
+        """Return (input_tokens, output_tokens) reported by the provider, or None"""
+
+
+class OpenAICompatibleAdapter(ProviderAdapter):
+    """Chat-completions wire format shared by Groq and OpenRouter"""
+
+    base_url = None
+
+    def __init__(self, api_key: str, model: str):
+        super().__init__(api_key, model)
+        self.url = self.stream_url = self.base_url
+        self.headers["Authorization"] = f"Bearer {api_key}"
+        self._body_prefix = '{"model":%s,"messages":[{"role":"user","content":' % json.dumps(model)
+
+    def build_request(self, prompt: str, max_tokens: int, temperature: float, stream: bool = False):
+        body = "%s%s}],\"max_tokens\":%d,\"temperature\":%s%s}" % (
+            self._body_prefix,
+            json.dumps(prompt),
+            max_tokens,
+            json.dumps(float(temperature)),
+            ',"stream":true' if stream else ""
+        )
+        return self.url, self.headers, body.encode("utf-8")
+
+    def parse_response(self, data: dict):
+        if data and data.get("choices"):
+            return data["choices"][0]["message"]["content"]
+        return None
+
+    def parse_stream_chunk(self, data: dict):
+        for choice in data.get("choices", [])[:1]:
+            return (choice.get("delta") or {}).get("content")
+        return None
+
+    def parse_usage(self, data: dict):
+        usage = (data or {}).get("usage")
+        if not usage:
+            return None
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+@register_adapter("gemini")
+class GeminiAdapter(ProviderAdapter):
+    label = "Gemini"
+    empty_response_error = "No text content found in Gemini response."
+
+    def __init__(self, api_key: str, model: str):
+        super().__init__(api_key, model)
+        base = f"{GEMINI_BASE_URL}/models/{model}"
+        self.url = f"{base}:generateContent?key={api_key}"
+        self.stream_url = f"{base}:streamGenerateContent?alt=sse&key={api_key}"
+
+    def build_request(self, prompt: str, max_tokens: int, temperature: float, stream: bool = False):
+        body = '{"contents":[{"parts":[{"text":%s}]}],"generationConfig":{"maxOutputTokens":%d,"temperature":%s}}' % (
+            json.dumps(prompt),
+            max_tokens,
+            json.dumps(float(temperature))
+        )
+        return (self.stream_url if stream else self.url), self.headers, body.encode("utf-8")
+
+    def parse_response(self, data: dict):
+        if data and data.get("candidates"):
+            # Gemini's response structure for text is complex, often in 'parts' of 'content'
+            for part in data["candidates"][0].get("content", {}).get("parts", []):
+                if "text" in part:
+                    return part["text"]
+        return None
+
+    def parse_stream_chunk(self, data: dict):
+        text = "".join(
+            part.get("text", "")
+            for candidate in data.get("candidates", [])[:1]
+            for part in candidate.get("content", {}).get("parts", [])
+        )
+        return text or None
+
+    def parse_usage(self, data: dict):
+        usage = (data or {}).get("usageMetadata")
+        if not usage:
+            return None
+        return usage.get("promptTokenCount", 0), usage.get("candidatesTokenCount", 0)
+
+
+@register_adapter("groq")
+class GroqAdapter(OpenAICompatibleAdapter):
+    label = "Groq"
+    base_url = f"{GROQ_BASE_URL}/chat/completions"
+    empty_response_error = "No content found in Groq response."
+
+
+@register_adapter("openrouter")
+class OpenRouterAdapter(OpenAICompatibleAdapter):
+    label = "OpenRouter"
+    base_url = f"{OPENROUTER_BASE_URL}/chat/completions"
+    empty_response_error = "No content found in OpenRouter response."
+
+    def __init__(self, api_key: str, model: str):
+        super().__init__(api_key, model)
+        self.headers["HTTP-Referer"] = "http://localhost:8000"  # Replace with your app URL
+        self.headers["X-Title"] = "Secure LLM Router PoC"
@@ -0,0 +1,106 @@
+"""
+Bulkhead: bounded concurrency and bounded wait queue per LLM provider/model
+"""
+
+import asyncio
+import time
+
+from ..config import (
+    LLM_MAX_CONCURRENCY_PER_PROVIDER,
+    LLM_MAX_QUEUE_PER_PROVIDER,
+    LLM_QUEUE_TIMEOUT_MS,
+)
+
+
+class Bulkhead:
+    """Caps in-flight calls to one provider/model. Callers beyond the cap wait in a
+    bounded queue for at most max_wait_ms; anything beyond that is rejected so the
+    cascade can overflow to the next provider."""
+
+    def __init__(
+        self,
+        max_concurrent: int = LLM_MAX_CONCURRENCY_PER_PROVIDER,
+        max_queue: int = LLM_MAX_QUEUE_PER_PROVIDER,
+        max_wait_ms: int = LLM_QUEUE_TIMEOUT_MS
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_ms = max_wait_ms
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting_seen = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+
+    async def acquire(self, timeout_s: float = None) -> bool:
+        """Claim a slot. Returns False when the queue is full or the wait times out.
+
+        timeout_s further bounds the wait (e.g. the remaining request deadline).
+        """
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        wait_s = self.max_wait_ms / 1000
+        if timeout_s is not None:
+            wait_s = max(0.0, min(wait_s, timeout_s))
+
+        self.waiting += 1
+        self.queued += 1
+        self.max_waiting_seen = max(self.max_waiting_seen, self.waiting)
+        start_time = time.perf_counter()
+        # Shielded, so a permit granted as the wait times out or is cancelled is
+        # never lost inside wait_for (Python < 3.12); _abandon hands it back
+        acquiring = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquiring), timeout=wait_s)
+        except asyncio.TimeoutError:
+            self._abandon(acquiring)
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            self._abandon(acquiring)
+            raise
+        finally:
+            self.waiting -= 1
+            self.total_wait_ms += (time.perf_counter() - start_time) * 1000
+
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def _abandon(self, acquiring: asyncio.Future):
+        """Give up on a pending semaphore acquire, releasing the slot if it is granted anyway"""
+        def give_back(task):
+            if not task.cancelled() and task.exception() is None:
+                self._semaphore.release()
+
+        acquiring.add_done_callback(give_back)
+        acquiring.cancel()
+
+    def release(self):
+        """Return a slot claimed by acquire()"""
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def to_dict(self) -> dict:
+        """Return bulkhead state as a dictionary"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth_seen": self.max_waiting_seen,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "average_wait_ms": round(self.total_wait_ms / self.queued, 2) if self.queued else 0.0,
+        }
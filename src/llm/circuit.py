@@ -0,0 +1,106 @@
+"""
+Circuit breaker for LLM provider/model pairs
+"""
+
+import time
+from collections import deque
+
+from ..config import (
+    LLM_BREAKER_FAILURE_THRESHOLD,
+    LLM_BREAKER_WINDOW_S,
+    LLM_BREAKER_COOLDOWN_S,
+    LLM_BREAKER_HALF_OPEN_PROBES,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Opens after too many failures in a sliding window, then lets a
+    limited number of probe requests through once the cooldown has passed"""
+
+    def __init__(
+        self,
+        failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+        window_s: float = LLM_BREAKER_WINDOW_S,
+        cooldown_s: float = LLM_BREAKER_COOLDOWN_S,
+        half_open_probes: int = LLM_BREAKER_HALF_OPEN_PROBES,
+        clock=time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.window_s = window_s
+        self.cooldown_s = cooldown_s
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+
+        self.state = CLOSED
+        self.opened_at = None
+        self.times_opened = 0
+        self._failures = deque()
+        self._probes_in_flight = 0
+
+    def _prune(self, now: float):
+        while self._failures and now - self._failures[0] > self.window_s:
+            self._failures.popleft()
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        self._probes_in_flight = 0
+
+    def allow_request(self) -> bool:
+        """Return True if a call may go through. Claims a probe slot in half-open state"""
+        if self.state == OPEN:
+            if self._clock() - self.opened_at < self.cooldown_s:
+                return False
+            self.state = HALF_OPEN
+            self._probes_in_flight = 0
+
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                return False
+            self._probes_in_flight += 1
+
+        return True
+
+    def record_success(self):
+        """A call succeeded: a successful probe closes the circuit"""
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self.opened_at = None
+            self._probes_in_flight = 0
+            self._failures.clear()
+
+    def record_failure(self):
+        """A call failed or timed out: a failed probe re-opens the circuit"""
+        now = self._clock()
+        if self.state == HALF_OPEN:
+            self._open(now)
+            return
+        self._failures.append(now)
+        self._prune(now)
+        if self.state == CLOSED and len(self._failures) >= self.failure_threshold:
+            self._failures.clear()
+            self._open(now)
+
+    def release(self):
+        """A call was abandoned (e.g. cancelled hedge) without a verdict"""
+        if self.state == HALF_OPEN and self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+
+    def to_dict(self) -> dict:
+        """Return breaker state as a dictionary"""
+        now = self._clock()
+        self._prune(now)
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.cooldown_s - (now - self.opened_at)), 1)
+        return {
+            "state": self.state,
+            "recent_failures": len(self._failures),
+            "times_opened": self.times_opened,
+            "retry_in_s": retry_in,
+        }
@@ -3,12 +3,50 @@ LLM Client for the Secure Gateway with multi-provider fallback
 """
 
 import os
-import requests
 import json
 import time
+import asyncio
+import httpx
+
+from .transport import ProviderTransport
+from .adapters import create_adapter
+from .circuit import CircuitBreaker
+from .bulkhead import Bulkhead
+from .stats import ProviderStats
+from .tokens import estimate_family_tokens, estimate_model_tokens
+from .policy import RoutingPolicy, RoutingPolicyEngine
+from ..config import (
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_DELAY_MS,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    ROUTING_STRATEGY,
+    ROUTING_COST_WEIGHT,
+    ROUTING_POLICY_REFRESH_MS,
+    REQUEST_TIMEOUT_MS,
+    DEADLINE_MIN_STEP_MS,
+    LLM_PROVIDER_TIMEOUT_MS,
+    LLM_COALESCE_ENABLED,
+)
+from ..metrics import metrics
+from ..providers import get_model_pricing, get_context_window
+
+ROUTING_STRATEGIES = ("static", "fastest", "cheapest", "weighted")
+
+ALL_PROVIDERS_FAILED_ERROR = "All LLM providers failed."
+DEADLINE_EXCEEDED_ERROR = "Request deadline exceeded"
+PROVIDER_TIMEOUT_ERROR = "Provider timed out"
+PROVIDER_SATURATED_ERROR = "Provider concurrency limit reached"
+PROVIDERS_SATURATED_ERROR = "All LLM providers are at capacity"
+CONTEXT_WINDOW_ERROR = "Prompt and max_tokens exceed every provider's context window"
+POLICY_UNSATISFIABLE_ERROR = "No model satisfies the routing policy"
+
+
+class ProviderStreamError(Exception):
+    """A streaming provider call failed"""
 
 class LLMClient:
-    def __init__(self):
+    def __init__(self, http_transport: httpx.AsyncBaseTransport = None):
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
         self.groq_api_key = os.getenv("GROQ_API_KEY")
         self.openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
@@ -25,90 +63,491 @@ class LLMClient:
         if self.openrouter_api_key:
             self.providers.append({"name": "openrouter", "key": self.openrouter_api_key, "model": self.openrouter_model})
 
+        # Every catalog model of a configured provider is a policy-routing candidate
+        self.policy = RoutingPolicyEngine.from_catalog({
+            "gemini": self.gemini_api_key,
+            "groq": self.groq_api_key,
+            "openrouter": self.openrouter_api_key,
+        })
+        self._policy_refreshed_at = None
+
+        self.transport = ProviderTransport(transport=http_transport)
+        # Adapters precompute URLs, headers and payload templates once at startup
+        self._adapters = {}
+        for provider in self.providers:
+            self.adapter(provider["name"], provider["key"], provider["model"])
+        self._stats = {}
+        self._breakers = {}
+        self._bulkheads = {}
+        self._inflight = {}
+
+    async def aclose(self):
+        """Close pooled provider connections (called on app shutdown)"""
+        await self.transport.aclose()
+
+    def adapter(self, provider_name: str, api_key: str, model: str):
+        """Return the prebuilt adapter for a provider/model/key, or None if unknown"""
+        key = (provider_name, model, api_key)
+        if key not in self._adapters:
+            self._adapters[key] = create_adapter(provider_name, api_key, model)
+        return self._adapters[key]
+
     async def call_llm_provider(self, provider_name: str, api_key: str, model: str, prompt: str, max_tokens: int, temperature: float):
         """Call a specific LLM provider"""
-        headers = {"Content-Type": "application/json"}
-        payload = {
-            "model": model,
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-        }
+        text, error, _ = await self.request_llm_provider(provider_name, api_key, model, prompt, max_tokens, temperature)
+        return text, error
 
-        if provider_name == "gemini":
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
-            # Gemini API expects 'contents' not 'messages'
-            payload["contents"] = payload.pop("messages")
-            # Gemini content structure is slightly different
-            payload["contents"] = [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }]
-            try:
-                response = requests.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                data = response.json()
-                if data and "candidates" in data and data["candidates"]:
-                    # Gemini's response structure for text is complex, often in 'parts' of 'content'
-                    first_candidate = data["candidates"][0]
-                    if "content" in first_candidate and "parts" in first_candidate["content"]:
-                        for part in first_candidate["content"]["parts"]:
-                            if "text" in part:
-                                return part["text"], None
-                return None, "No text content found in Gemini response."
-            except requests.exceptions.RequestException:
-                return None, "Gemini API request failed"
-
-        elif provider_name == "groq":
-            url = "https://api.groq.com/openai/v1/chat/completions"
-            headers["Authorization"] = f"Bearer {api_key}"
-            try:
-                response = requests.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                data = response.json()
-                if data and "choices" in data and data["choices"]:
-                    return data["choices"][0]["message"]["content"], None
-                return None, "No content found in Groq response."
-            except requests.exceptions.RequestException:
-                return None, "Groq API request failed"
-
-        elif provider_name == "openrouter":
-            url = "https://openrouter.ai/api/v1/chat/completions"
-            headers["Authorization"] = f"Bearer {api_key}"
-            headers["HTTP-Referer"] = "http://localhost:8000"  # Replace with your app URL
-            headers["X-Title"] = "Secure LLM Router PoC"
-            try:
-                response = requests.post(url, headers=headers, json=payload)
+    async def request_llm_provider(self, provider_name: str, api_key: str, model: str, prompt: str, max_tokens: int, temperature: float):
+        """Call a specific LLM provider. Returns: (text, error, usage)
+
+        usage is the provider-reported (input_tokens, output_tokens), or None.
+        """
+        adapter = self.adapter(provider_name, api_key, model)
+        if adapter is None:
+            return None, f"Unknown LLM provider: {provider_name}", None
+
+        url, headers, body = adapter.build_request(prompt, max_tokens, temperature)
+        try:
+            response = await self.transport.get_client(provider_name).post(url, headers=headers, content=body)
+            response.raise_for_status()
+            data = response.json()
+            text = adapter.parse_response(data)
+            if text:
+                return text, None, adapter.parse_usage(data)
+            return None, adapter.empty_response_error, None
+        except httpx.TimeoutException:
+            return None, f"{adapter.label} API request timed out", None
+        except (httpx.HTTPError, ValueError, LookupError, TypeError, AttributeError):
+            return None, f"{adapter.label} API request failed", None
+
+    async def stream_llm_provider(self, provider_name: str, api_key: str, model: str, prompt: str, max_tokens: int, temperature: float):
+        """Stream text chunks from a specific LLM provider over SSE.
+
+        Raises ProviderStreamError when the request or the stream fails.
+        """
+        adapter = self.adapter(provider_name, api_key, model)
+        if adapter is None:
+            raise ProviderStreamError(f"Unknown LLM provider: {provider_name}")
+
+        url, headers, body = adapter.build_request(prompt, max_tokens, temperature, stream=True)
+        client = self.transport.get_client(provider_name)
+        try:
+            async with client.stream("POST", url, headers=headers, content=body) as response:
                 response.raise_for_status()
-                data = response.json()
-                if data and "choices" in data and data["choices"]:
-                    return data["choices"][0]["message"]["content"], None
-                return None, "No content found in OpenRouter response."
-            except requests.exceptions.RequestException:
-                return None, "OpenRouter API request failed"
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    text = adapter.parse_stream_chunk(json.loads(data))
+                    if text:
+                        yield text
+        except httpx.TimeoutException:
+            raise ProviderStreamError(f"{adapter.label} API stream timed out")
+        except (httpx.HTTPError, ValueError, LookupError, TypeError, AttributeError):
+            raise ProviderStreamError(f"{adapter.label} API stream failed")
+
+    def breaker(self, provider: dict) -> CircuitBreaker:
+        """Return the circuit breaker for a provider/model, creating it on first use"""
+        key = (provider["name"], provider["model"])
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker()
+        return breaker
+
+    def models(self) -> list:
+        """Configured providers plus every policy-routing candidate, once per provider/model"""
+        models = {}
+        for provider in self.providers + [c.as_provider() for c in self.policy.candidates]:
+            models.setdefault((provider["name"], provider["model"]), provider)
+        return list(models.values())
+
+    def breaker_states(self) -> dict:
+        """Circuit breaker state per provider and model"""
+        states = {}
+        for provider in self.models():
+            states.setdefault(provider["name"], {})[provider["model"]] = self.breaker(provider).to_dict()
+        return states
+
+    def bulkhead(self, provider: dict) -> Bulkhead:
+        """Return the bulkhead for a provider/model, creating it on first use"""
+        key = (provider["name"], provider["model"])
+        bulkhead = self._bulkheads.get(key)
+        if bulkhead is None:
+            bulkhead = self._bulkheads[key] = Bulkhead()
+        return bulkhead
+
+    def bulkhead_states(self) -> dict:
+        """Concurrency, queue depth and wait time per provider and model"""
+        states = {}
+        for provider in self.models():
+            states.setdefault(provider["name"], {})[provider["model"]] = self.bulkhead(provider).to_dict()
+        return states
+
+    @staticmethod
+    def _deadline(timeout_ms: int = None):
+        """Absolute perf_counter deadline for a request, or None when unlimited"""
+        if timeout_ms is None:
+            timeout_ms = REQUEST_TIMEOUT_MS
+        if not timeout_ms or timeout_ms <= 0:
+            return None
+        return time.perf_counter() + timeout_ms / 1000
+
+    @staticmethod
+    def _remaining_s(deadline):
+        """Seconds left before the deadline, or None when unlimited"""
+        if deadline is None:
+            return None
+        return deadline - time.perf_counter()
+
+    @staticmethod
+    def _budget_exhausted(remaining_s) -> bool:
+        return remaining_s is not None and remaining_s * 1000 < DEADLINE_MIN_STEP_MS
+
+    @staticmethod
+    def _step_timeout_s(remaining_s, providers_left: int):
+        """Budget for one cascade step: LLM_PROVIDER_TIMEOUT_MS, capped at an even
+        share of the remaining budget (at least DEADLINE_MIN_STEP_MS) so a hung
+        provider cannot spend the time its fallbacks need. None when unlimited."""
+        step_s = LLM_PROVIDER_TIMEOUT_MS / 1000 if LLM_PROVIDER_TIMEOUT_MS > 0 else None
+        if remaining_s is not None:
+            share_s = min(remaining_s, max(remaining_s / max(providers_left, 1), DEADLINE_MIN_STEP_MS / 1000))
+            step_s = share_s if step_s is None else min(step_s, share_s)
+        return step_s
+
+    @staticmethod
+    def _skipped_step(provider: dict) -> dict:
+        return {
+            "provider": provider["name"],
+            "model": provider["model"],
+            "status": "skipped",
+            "reason": "Deadline budget exhausted",
+            "latency_ms": 0
+        }
+
+    @staticmethod
+    def _circuit_open_step(provider: dict) -> dict:
+        return {
+            "provider": provider["name"],
+            "model": provider["model"],
+            "status": "circuit_open",
+            "reason": "Circuit breaker open",
+            "latency_ms": 0
+        }
+
+    @staticmethod
+    def _context_window_step(provider: dict, needed_tokens: int, window: int) -> dict:
+        return {
+            "provider": provider["name"],
+            "model": provider["model"],
+            "status": "skipped",
+            "reason": f"Context window exceeded ({needed_tokens} > {window} tokens)",
+            "latency_ms": 0
+        }
+
+    @classmethod
+    def _preflight(cls, providers: list, prompt: str, max_tokens: int):
+        """Drop providers whose context window cannot hold the estimated prompt
+        tokens plus max_tokens. Returns: (providers that fit, skipped steps)"""
+        fitting, skipped = [], []
+        for provider in providers:
+            window = get_context_window(provider["name"], provider["model"])
+            if window is not None:
+                needed = estimate_model_tokens(prompt, provider["model"]) + max_tokens
+                if needed > window:
+                    skipped.append(cls._context_window_step(provider, needed, window))
+                    continue
+            fitting.append(provider)
+        return fitting, skipped
+
+    @staticmethod
+    def _usage(usage) -> dict:
+        if usage is None:
+            return None
+        return {"input_tokens": usage[0], "output_tokens": usage[1]}
+
+    def stats(self, provider: dict) -> ProviderStats:
+        """Return live statistics for a provider/model, seeding them on first use"""
+        key = (provider["name"], provider["model"])
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = ProviderStats(provider["name"], provider["model"])
+        return stats
+
+    def provider_stats(self) -> dict:
+        """Live statistics per provider and model"""
+        result = {}
+        for provider in self.models():
+            result.setdefault(provider["name"], {})[provider["model"]] = self.stats(provider).to_dict()
+        return result
+
+    @staticmethod
+    def _blended_price(provider: dict) -> float:
+        pricing = get_model_pricing(provider["name"], provider["model"])
+        if not pricing:
+            return float("inf")
+        return pricing.get("price_per_1m_input", 0) + pricing.get("price_per_1m_output", 0)
+
+    def order_providers(self, strategy: str = None) -> list:
+        """Order the cascade for one request.
+
+        static: configuration order; fastest: lowest expected latency;
+        cheapest: lowest blended price; weighted: ROUTING_COST_WEIGHT blend of both
+        """
+        strategy = strategy or ROUTING_STRATEGY
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        if strategy == "static" or len(self.providers) < 2:
+            return list(self.providers)
+
+        latency = {id(p): self.stats(p).expected_latency_ms for p in self.providers}
+        price = {id(p): self._blended_price(p) for p in self.providers}
+
+        if strategy == "fastest":
+            return sorted(self.providers, key=lambda p: latency[id(p)])
+        if strategy == "cheapest":
+            return sorted(self.providers, key=lambda p: (price[id(p)], latency[id(p)]))
+
+        max_latency = max(latency.values()) or 1.0
+        known_prices = [v for v in price.values() if v != float("inf")]
+        max_price = max(known_prices, default=0.0) or 1.0
+
+        def score(p):
+            p_price = price[id(p)] if price[id(p)] != float("inf") else max_price
+            return ((1 - ROUTING_COST_WEIGHT) * latency[id(p)] / max_latency
+                    + ROUTING_COST_WEIGHT * p_price / max_price)
+
+        return sorted(self.providers, key=score)
+
+    def route_providers(self, prompt: str, max_tokens: int, strategy: str = None,
+                        policy: RoutingPolicy = None) -> list:
+        """Cascade for one request: the policy's chain of catalog models when a
+        policy is given (may be empty), otherwise the configured providers in
+        `strategy` order"""
+        if policy is None:
+            return self.order_providers(strategy)
+        self._refresh_policy()
+        candidates = self.policy.select(
+            estimate_family_tokens(prompt, self.policy.families), max_tokens,
+            max_latency_ms=policy.max_latency_ms,
+            max_cost_usd=policy.max_cost_usd,
+            prefer=policy.prefer
+        )
+        return [candidate.as_provider() for candidate in candidates]
+
+    def _refresh_policy(self):
+        """Re-rank policy candidates by live EWMA latency, at most every ROUTING_POLICY_REFRESH_MS"""
+        now = time.perf_counter()
+        last = self._policy_refreshed_at
+        if last is not None and now - last < ROUTING_POLICY_REFRESH_MS / 1000:
+            return
+        self._policy_refreshed_at = now
+        self.policy.refresh({
+            (c.provider, c.model): self.stats(c.as_provider()).ewma_latency_ms for c in self.policy.candidates
+        })
+
+    def hedge_delay_ms(self, provider: dict) -> float:
+        """Delay before hedging past a provider: its observed percentile latency,
+        or the configured fixed delay until enough samples exist"""
+        stats = self.stats(provider)
+        if stats.recent_count < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DELAY_MS
+        return stats.percentile(LLM_HEDGE_PERCENTILE)
+
+    async def _call_provider_timed(self, provider: dict, prompt: str, max_tokens: int, temperature: float,
+                                   timeout_s: float = None, step_timeout_s: float = None):
+        """Call one provider and time it. Returns: (response, error, latency_ms, usage)
+
+        The caller must have been admitted by the provider's circuit breaker.
+        The call then waits for a bulkhead slot; a full provider returns
+        PROVIDER_SATURATED_ERROR so the cascade can overflow, unless the wait
+        used up the request budget (DEADLINE_EXCEEDED_ERROR). timeout_s is the
+        remaining request budget and step_timeout_s this provider's share of it
+        (see _step_timeout_s). Overrunning its own share is a provider failure
+        (PROVIDER_TIMEOUT_ERROR, the cascade moves on); running out of the
+        request budget (or finding the provider saturated) is not held against
+        the provider.
+        """
+        breaker = self.breaker(provider)
+        bulkhead = self.bulkhead(provider)
+        budget_s = timeout_s
+        own_share = step_timeout_s is not None and (timeout_s is None or step_timeout_s < timeout_s)
+        if own_share:
+            timeout_s = step_timeout_s
+        queued_at = time.perf_counter()
+        try:
+            admitted = await bulkhead.acquire(timeout_s)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        if not admitted:
+            breaker.release()
+            waited_s = time.perf_counter() - queued_at
+            error = PROVIDER_SATURATED_ERROR
+            if budget_s is not None and self._budget_exhausted(budget_s - waited_s):
+                error = DEADLINE_EXCEEDED_ERROR
+            return None, error, int(waited_s * 1000), None
+
+        start_time = time.perf_counter()
+        if timeout_s is not None:
+            timeout_s -= start_time - queued_at
+        try:
+            response_content, error, usage = await asyncio.wait_for(
+                self.request_llm_provider(
+                    provider_name=provider["name"],
+                    api_key=provider["key"],
+                    model=provider["model"],
+                    prompt=prompt,
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                ),
+                timeout=timeout_s
+            )
+        except asyncio.TimeoutError:
+            latency_ms = int((time.perf_counter() - start_time) * 1000)
+            if not own_share:
+                breaker.release()
+                return None, DEADLINE_EXCEEDED_ERROR, latency_ms, None
+            breaker.record_failure()
+            self.stats(provider).record_failure()
+            return None, PROVIDER_TIMEOUT_ERROR, latency_ms, None
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        finally:
+            bulkhead.release()
+        latency_ms = int((time.perf_counter() - start_time) * 1000)
+        if response_content:
+            breaker.record_success()
+            self.stats(provider).record_success(latency_ms)
         else:
-            return None, f"Unknown LLM provider: {provider_name}"
+            breaker.record_failure()
+            self.stats(provider).record_failure()
+        return response_content, error, latency_ms, usage
+
+    @staticmethod
+    def _failure_status(error: str) -> str:
+        if error in (DEADLINE_EXCEEDED_ERROR, PROVIDER_TIMEOUT_ERROR):
+            return "timeout"
+        if error == PROVIDER_SATURATED_ERROR:
+            return "saturated"
+        return "failed"
+
+    @staticmethod
+    def _exhausted_error(cascade_path: list) -> str:
+        """Final error once every provider was tried: saturated when no provider
+        was actually reached because all were full (or circuit-open)"""
+        statuses = {step["status"] for step in cascade_path}
+        if "saturated" in statuses and statuses <= {"saturated", "circuit_open"}:
+            return PROVIDERS_SATURATED_ERROR
+        return ALL_PROVIDERS_FAILED_ERROR
 
-    async def query_llm_cascade(self, prompt: str, max_tokens: int, temperature: float):
+    async def query_llm_cascade(self, prompt: str, max_tokens: int, temperature: float,
+                                hedge: bool = None, strategy: str = None, timeout_ms: int = None,
+                                coalesce: bool = None, policy: RoutingPolicy = None):
         """Query LLM with cascade fallback across providers
 
+        hedge: race the next provider when one is slow (defaults to LLM_HEDGE_ENABLED)
+        strategy: provider ordering, see order_providers (defaults to ROUTING_STRATEGY)
+        policy: latency target / cost ceiling; selects models from the catalog
+            and takes precedence over strategy, see route_providers
+        timeout_ms: end-to-end budget shared by all steps (defaults to REQUEST_TIMEOUT_MS)
+        coalesce: share one in-flight cascade between identical concurrent
+            requests whose deadline it covers (defaults to LLM_COALESCE_ENABLED)
+
         Returns: (response, provider_name, latency_ms, error, cascade_path)
+        error is DEADLINE_EXCEEDED_ERROR when the budget ran out, and
+        CONTEXT_WINDOW_ERROR when no provider can fit the request, and
+        POLICY_UNSATISFIABLE_ERROR when no model meets the policy. The winning
+        step carries the provider-reported "usage" when available.
         """
+        deadline = self._deadline(timeout_ms)
+        providers = self.route_providers(prompt, max_tokens, strategy, policy)
+        if policy is not None and not providers:
+            return None, None, 0, POLICY_UNSATISFIABLE_ERROR, []
+        if hedge is None:
+            hedge = LLM_HEDGE_ENABLED
+        if coalesce is None:
+            coalesce = LLM_COALESCE_ENABLED
+
+        if not coalesce:
+            return await self._run_cascade(providers, prompt, max_tokens, temperature, hedge, deadline)
+
+        key = (prompt, max_tokens, temperature, tuple((p["name"], p["model"]) for p in providers), hedge)
+        leader = self._inflight.get(key)
+        # The shared call runs on the leader's budget, so only join one that lasts at least as long
+        if leader is None or not self._deadline_covers(leader[1], deadline):
+            task = asyncio.ensure_future(
+                self._run_cascade(providers, prompt, max_tokens, temperature, hedge, deadline)
+            )
+            self._inflight[key] = (task, deadline)
+            task.add_done_callback(lambda t: self._forget_inflight(key, t))
+            joined = False
+        else:
+            task = leader[0]
+            metrics.record_coalesced()
+            joined = True
+
+        # shield: one waiter going away must not cancel the shared call
+        if not joined:
+            return await asyncio.shield(task)
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), timeout=self._remaining_s(deadline))
+        except asyncio.TimeoutError:
+            return None, None, 0, DEADLINE_EXCEEDED_ERROR, []
+        response_content, provider_name, latency_ms, error, cascade_path = result
+        return response_content, provider_name, latency_ms, error, [dict(step) for step in cascade_path]
+
+    @staticmethod
+    def _deadline_covers(leader_deadline, deadline) -> bool:
+        """Whether a call running to leader_deadline can serve a request due at
+        deadline; identical budgets started DEADLINE_MIN_STEP_MS apart still share"""
+        if leader_deadline is None:
+            return True
+        return deadline is not None and leader_deadline + DEADLINE_MIN_STEP_MS / 1000 >= deadline
+
+    def _forget_inflight(self, key, task):
+        if self._inflight.get(key, (None,))[0] is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every waiter has gone away
+
+    async def _run_cascade(self, providers: list, prompt: str, max_tokens: int, temperature: float,
+                           hedge: bool, deadline: float = None):
+        providers, skipped = self._preflight(providers, prompt, max_tokens)
+        if not providers:
+            return None, None, 0, CONTEXT_WINDOW_ERROR, skipped
+        if hedge:
+            result = await self._query_hedged(providers, prompt, max_tokens, temperature, deadline)
+        else:
+            result = await self._query_sequential(providers, prompt, max_tokens, temperature, deadline)
+        if skipped:
+            response_content, provider_name, latency_ms, error, cascade_path = result
+            result = response_content, provider_name, latency_ms, error, skipped + cascade_path
+        return result
+
+    async def _query_sequential(self, providers: list, prompt: str, max_tokens: int, temperature: float,
+                                deadline: float = None):
+        """Try providers one after another within the deadline budget"""
         cascade_path = []
 
-        for provider in self.providers:
+        for index, provider in enumerate(providers):
             provider_name = provider["name"]
-            start_time = time.perf_counter()
-            response_content, error = await self.call_llm_provider(
-                provider_name=provider["name"],
-                api_key=provider["key"],
-                model=provider["model"],
-                prompt=prompt,
-                max_tokens=max_tokens,
-                temperature=temperature
+            remaining_s = self._remaining_s(deadline)
+            if self._budget_exhausted(remaining_s):
+                cascade_path.extend(self._skipped_step(p) for p in providers[index:])
+                return None, None, 0, DEADLINE_EXCEEDED_ERROR, cascade_path
+
+            if not self.breaker(provider).allow_request():
+                cascade_path.append(self._circuit_open_step(provider))
+                continue
+
+            response_content, error, latency_ms, usage = await self._call_provider_timed(
+                provider, prompt, max_tokens, temperature, timeout_s=remaining_s,
+                step_timeout_s=self._step_timeout_s(remaining_s, len(providers) - index)
             )
-            latency_ms = int((time.perf_counter() - start_time) * 1000)
 
             if response_content:
                 cascade_path.append({
@@ -116,19 +555,279 @@ class LLMClient:
                     "model": provider["model"],
                     "status": "success",
                     "reason": None,
-                    "latency_ms": latency_ms
+                    "latency_ms": latency_ms,
+                    "usage": self._usage(usage)
                 })
                 return response_content, provider_name, latency_ms, None, cascade_path
             else:
                 cascade_path.append({
                     "provider": provider_name,
                     "model": provider["model"],
-                    "status": "failed",
+                    "status": self._failure_status(error),
                     "reason": error,
                     "latency_ms": latency_ms
                 })
+                if error == DEADLINE_EXCEEDED_ERROR:
+                    cascade_path.extend(self._skipped_step(p) for p in providers[index + 1:])
+                    return None, None, 0, DEADLINE_EXCEEDED_ERROR, cascade_path
+
+        return None, None, 0, self._exhausted_error(cascade_path), cascade_path
+
+    async def stream_llm_cascade(self, prompt: str, max_tokens: int, temperature: float, strategy: str = None,
+                                 timeout_ms: int = None, policy: RoutingPolicy = None):
+        """Stream a completion through the cascade.
+
+        Failover happens only before the first token; once text has been sent
+        a provider failure ends the stream with an error event. The whole stream
+        shares one deadline budget (timeout_ms, defaults to REQUEST_TIMEOUT_MS).
+
+        Yields events: {"type": "token", "text"}, then one of
+        {"type": "done", "provider", "model", "ttft_ms", "latency_ms", "cascade_path"} or
+        {"type": "error", "error", "cascade_path"}
+        """
+        deadline = self._deadline(timeout_ms)
+        routed = self.route_providers(prompt, max_tokens, strategy, policy)
+        if policy is not None and not routed:
+            yield {"type": "error", "error": POLICY_UNSATISFIABLE_ERROR, "cascade_path": []}
+            return
+        providers, cascade_path = self._preflight(routed, prompt, max_tokens)
+        if not providers:
+            yield {"type": "error", "error": CONTEXT_WINDOW_ERROR, "cascade_path": cascade_path}
+            return
+
+        for index, provider in enumerate(providers):
+            remaining_s = self._remaining_s(deadline)
+            if self._budget_exhausted(remaining_s):
+                cascade_path.extend(self._skipped_step(p) for p in providers[index:])
+                yield {"type": "error", "error": DEADLINE_EXCEEDED_ERROR, "cascade_path": cascade_path}
+                return
+            # Until its first token a provider only gets its share of the budget
+            step_timeout_s = self._step_timeout_s(remaining_s, len(providers) - index)
+            own_share = step_timeout_s is not None and (remaining_s is None or step_timeout_s < remaining_s)
+
+            breaker = self.breaker(provider)
+            if not breaker.allow_request():
+                cascade_path.append(self._circuit_open_step(provider))
+                continue
+
+            bulkhead = self.bulkhead(provider)
+            queued_at = time.perf_counter()
+            try:
+                admitted = await bulkhead.acquire(step_timeout_s if own_share else remaining_s)
+            except (asyncio.CancelledError, GeneratorExit):
+                breaker.release()
+                raise
+            if not admitted:
+                breaker.release()
+                # The wait may have been cut short by the deadline rather than the queue limit
+                deadline_hit = self._budget_exhausted(self._remaining_s(deadline))
+                cascade_path.append({
+                    "provider": provider["name"],
+                    "model": provider["model"],
+                    "status": "timeout" if deadline_hit else "saturated",
+                    "reason": DEADLINE_EXCEEDED_ERROR if deadline_hit else PROVIDER_SATURATED_ERROR,
+                    "latency_ms": int((time.perf_counter() - queued_at) * 1000)
+                })
+                if deadline_hit:
+                    cascade_path.extend(self._skipped_step(p) for p in providers[index + 1:])
+                    yield {"type": "error", "error": DEADLINE_EXCEEDED_ERROR, "cascade_path": cascade_path}
+                    return
+                continue
+
+            start_time = time.perf_counter()
+            ttft_ms = None
+            stream = self.stream_llm_provider(
+                provider_name=provider["name"],
+                api_key=provider["key"],
+                model=provider["model"],
+                prompt=prompt,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+            try:
+                while True:
+                    timeout_s = self._remaining_s(deadline)
+                    if ttft_ms is None and own_share:
+                        timeout_s = queued_at + step_timeout_s - time.perf_counter()
+                    try:
+                        text = await asyncio.wait_for(stream.__anext__(), timeout=timeout_s)
+                    except StopAsyncIteration:
+                        break
+                    if ttft_ms is None:
+                        ttft_ms = int((time.perf_counter() - start_time) * 1000)
+                    yield {"type": "token", "text": text}
+            except ProviderStreamError as e:
+                error = str(e)
+            except asyncio.TimeoutError:
+                error = PROVIDER_TIMEOUT_ERROR if ttft_ms is None and own_share else DEADLINE_EXCEEDED_ERROR
+            except (asyncio.CancelledError, GeneratorExit):
+                breaker.release()
+                raise
+            else:
+                error = None if ttft_ms is not None else "No content in stream"
+            finally:
+                await stream.aclose()
+                bulkhead.release()
+
+            latency_ms = int((time.perf_counter() - start_time) * 1000)
+            if error == DEADLINE_EXCEEDED_ERROR:
+                breaker.release()
+                cascade_path.append({
+                    "provider": provider["name"],
+                    "model": provider["model"],
+                    "status": "timeout",
+                    "reason": error,
+                    "latency_ms": latency_ms,
+                    "ttft_ms": ttft_ms
+                })
+                cascade_path.extend(self._skipped_step(p) for p in providers[index + 1:])
+                yield {"type": "error", "error": DEADLINE_EXCEEDED_ERROR, "cascade_path": cascade_path}
+                return
+
+            step = {
+                "provider": provider["name"],
+                "model": provider["model"],
+                "status": "success" if error is None else self._failure_status(error),
+                "reason": error,
+                "latency_ms": latency_ms,
+                "ttft_ms": ttft_ms
+            }
+            cascade_path.append(step)
+
+            if error is None:
+                breaker.record_success()
+                self.stats(provider).record_success(latency_ms)
+                yield {
+                    "type": "done",
+                    "provider": provider["name"],
+                    "model": provider["model"],
+                    "ttft_ms": ttft_ms,
+                    "latency_ms": latency_ms,
+                    "cascade_path": cascade_path
+                }
+                return
+
+            breaker.record_failure()
+            self.stats(provider).record_failure()
+            if ttft_ms is not None:
+                # Tokens already reached the client, so it is too late to fail over
+                yield {"type": "error", "error": "Stream interrupted", "cascade_path": cascade_path}
+                return
+
+        yield {"type": "error", "error": self._exhausted_error(cascade_path), "cascade_path": cascade_path}
+
+    async def _query_hedged(self, providers: list, prompt: str, max_tokens: int, temperature: float,
+                            deadline: float = None):
+        """Cascade that fires the next provider in parallel once the newest
+        in-flight call exceeds its hedge delay. First good answer wins and
+        the remaining calls are cancelled.
+
+        Steps launched speculatively carry "hedged": True. When any hedge fired,
+        the winner is recorded as "won" and the losers as "cancelled".
+        """
+        cascade_path = []
+        pending = {}  # task -> (provider, hedged, start_time)
+        next_index = 0
+        hedges_fired = 0
+        deadline_hit = False
+
+        newest, newest_started = None, None
+
+        def launch(hedged: bool) -> bool:
+            """Start the next provider whose circuit admits a call"""
+            nonlocal next_index, newest, newest_started, deadline_hit
+            while next_index < len(providers):
+                remaining_s = self._remaining_s(deadline)
+                if self._budget_exhausted(remaining_s):
+                    cascade_path.extend(self._skipped_step(p) for p in providers[next_index:])
+                    next_index = len(providers)
+                    deadline_hit = True
+                    return False
+                provider = providers[next_index]
+                step_timeout_s = self._step_timeout_s(remaining_s, len(providers) - next_index)
+                next_index += 1
+                if not self.breaker(provider).allow_request():
+                    cascade_path.append(self._circuit_open_step(provider))
+                    continue
+                task = asyncio.create_task(
+                    self._call_provider_timed(provider, prompt, max_tokens, temperature,
+                                              timeout_s=remaining_s, step_timeout_s=step_timeout_s)
+                )
+                newest, newest_started = provider, time.perf_counter()
+                pending[task] = (provider, hedged, newest_started)
+                return True
+            return False
+
+        launch(hedged=False)
+        try:
+            while pending:
+                timeout = None
+                if next_index < len(providers):
+                    elapsed_ms = (time.perf_counter() - newest_started) * 1000
+                    timeout = max(0.0, (self.hedge_delay_ms(newest) - elapsed_ms) / 1000)
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if launch(hedged=True):
+                        hedges_fired += 1
+                    continue
+
+                for task in done:
+                    provider, hedged, _ = pending.pop(task)
+                    response_content, error, latency_ms, usage = task.result()
+                    if response_content:
+                        cascade_path.append({
+                            "provider": provider["name"],
+                            "model": provider["model"],
+                            "status": "won" if hedges_fired else "success",
+                            "reason": None,
+                            "latency_ms": latency_ms,
+                            "hedged": hedged,
+                            "usage": self._usage(usage)
+                        })
+                        cancelled = self._cancel_pending(pending, cascade_path)
+                        metrics.record_hedge(fired=hedges_fired, won=hedged, cancelled=cancelled)
+                        return response_content, provider["name"], latency_ms, None, cascade_path
+                    if error == DEADLINE_EXCEEDED_ERROR:
+                        deadline_hit = True
+                    cascade_path.append({
+                        "provider": provider["name"],
+                        "model": provider["model"],
+                        "status": self._failure_status(error),
+                        "reason": error,
+                        "latency_ms": latency_ms,
+                        "hedged": hedged
+                    })
+
+                # Plain fallback once nothing is left in flight
+                if not pending:
+                    launch(hedged=False)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        metrics.record_hedge(fired=hedges_fired, won=False, cancelled=0)
+        error = DEADLINE_EXCEEDED_ERROR if deadline_hit else self._exhausted_error(cascade_path)
+        return None, None, 0, error, cascade_path
 
-        return None, None, 0, "All LLM providers failed.", cascade_path
+    @staticmethod
+    def _cancel_pending(pending: dict, cascade_path: list) -> int:
+        """Cancel losing calls and record them in the cascade path"""
+        now = time.perf_counter()
+        for task, (provider, hedged, started) in pending.items():
+            task.cancel()
+            cascade_path.append({
+                "provider": provider["name"],
+                "model": provider["model"],
+                "status": "cancelled",
+                "reason": "Lost hedge race",
+                "latency_ms": int((now - started) * 1000),
+                "hedged": hedged
+            })
+        cancelled = len(pending)
+        pending.clear()
+        return cancelled
 
 # Instantiate the client (can be imported and used in app.py)
 llm_client = LLMClient()
\ No newline at end of file
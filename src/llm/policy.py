@@ -0,0 +1,123 @@
+"""
+Policy routing: pick provider/model per request by latency SLO and cost ceiling.
+
+Every catalog model of a configured provider is a candidate. The engine keeps
+candidates ranked by latency (catalog figures until refresh() supplies live
+EWMA latencies) and, for every prefix of that ranking, the same models
+cheapest first. A request bisects its latency target and slices the
+precomputed orderings, so selection never sorts; only a cost ceiling prices
+the chain exactly.
+"""
+
+from bisect import bisect_right
+from typing import NamedTuple, Optional
+
+from ..providers import PROVIDER_CONFIG
+from .tokens import model_family
+
+POLICY_PREFERENCES = ("cost", "latency")
+
+
+class RoutingPolicy(NamedTuple):
+    """Per-request routing constraints"""
+    max_latency_ms: Optional[float] = None
+    max_cost_usd: Optional[float] = None
+    prefer: str = "cost"
+
+
+class ModelCandidate(NamedTuple):
+    provider: str
+    model: str
+    key: str
+    latency_ms: float
+    price_per_1m_input: float
+    price_per_1m_output: float
+    family: str = "default"  # tokenizer family, for per-model input token estimates
+
+    def cost_usd(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.price_per_1m_input + output_tokens * self.price_per_1m_output) / 1_000_000
+
+    def as_provider(self) -> dict:
+        """Provider dict in the shape the cascade uses"""
+        return {"name": self.provider, "key": self.key, "model": self.model}
+
+
+class RoutingPolicyEngine:
+    """Precomputed orderings over the model catalog for per-request selection"""
+
+    def __init__(self, candidates: list):
+        self.candidates = list(candidates)
+        self.families = tuple(sorted({c.family for c in self.candidates}))
+        self.refresh({})
+
+    @staticmethod
+    def _price(candidate: ModelCandidate) -> float:
+        return candidate.price_per_1m_input + candidate.price_per_1m_output
+
+    def refresh(self, latencies: dict):
+        """Re-rank from {(provider, model): latency_ms}; models missing from
+        latencies keep their catalog latency. O(n^2) for the prefix orderings,
+        so callers refresh periodically rather than per request."""
+        latency = {c: latencies.get((c.provider, c.model), c.latency_ms) for c in self.candidates}
+        by_latency = tuple(sorted(self.candidates, key=lambda c: (latency[c], c.provider, c.model)))
+
+        # cheapest_first[r]: the r fastest candidates, cheapest first (ties fastest first)
+        order, prices = [], []
+        cheapest_first = [()]
+        for candidate in by_latency:
+            index = bisect_right(prices, self._price(candidate))
+            prices.insert(index, self._price(candidate))
+            order.insert(index, candidate)
+            cheapest_first.append(tuple(order))
+
+        # Swapped in one assignment, so a concurrent select sees a consistent snapshot
+        self._index = (by_latency, [latency[c] for c in by_latency], cheapest_first)
+
+    @classmethod
+    def from_catalog(cls, api_keys: dict, catalog: dict = PROVIDER_CONFIG):
+        """Candidates for every catalog model of a provider with an API key"""
+        candidates = []
+        for provider, key in api_keys.items():
+            if not key:
+                continue
+            for model, info in catalog.get(provider, {}).get("models", {}).items():
+                candidates.append(ModelCandidate(
+                    provider=provider,
+                    model=model,
+                    key=key,
+                    latency_ms=info.get("avg_latency_ms", float("inf")),
+                    price_per_1m_input=info.get("price_per_1m_input", 0.0),
+                    price_per_1m_output=info.get("price_per_1m_output", 0.0),
+                    family=model_family(model),
+                ))
+        return cls(candidates)
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def select(self, input_tokens, max_tokens: int, max_latency_ms: Optional[float] = None,
+               max_cost_usd: Optional[float] = None, prefer: str = "cost") -> list:
+        """Ordered fallback chain of candidates for one request.
+
+        input_tokens is a prompt token count, or {family: count} (see
+        `families`) so each candidate is priced with its own tokenizer's
+        estimate. The cost ceiling is hard: a candidate whose worst-case cost (max_tokens
+        of output) exceeds it is never returned. The latency target is soft:
+        candidates meeting it come first in `prefer` order (lowest blended
+        token price, or fastest), then candidates that miss it, fastest first.
+        """
+        if prefer not in POLICY_PREFERENCES:
+            raise ValueError(f"Unknown policy preference: {prefer}")
+
+        by_latency, latencies, cheapest_first = self._index
+        # O(log n): everything past slo_rank misses the latency target
+        slo_rank = len(by_latency)
+        if max_latency_ms is not None:
+            slo_rank = bisect_right(latencies, max_latency_ms)
+
+        meeting = cheapest_first[slo_rank] if prefer == "cost" else by_latency[:slo_rank]
+        chain = list(meeting + by_latency[slo_rank:])
+        if max_cost_usd is not None:
+            tokens = input_tokens.get if isinstance(input_tokens, dict) else lambda family: input_tokens
+            chain = [c for c in chain if c.cost_usd(tokens(c.family), max_tokens) <= max_cost_usd]
+        return chain
@@ -0,0 +1,73 @@
+"""
+Live latency and error statistics per LLM provider/model
+"""
+
+from collections import deque
+
+from ..config import ROUTING_EWMA_ALPHA, LLM_LATENCY_WINDOW
+from ..providers import get_model_pricing
+
+DEFAULT_SEED_LATENCY_MS = 1000.0
+
+
+class ProviderStats:
+    """Exponentially weighted latency, deviation and error rate, seeded from PROVIDER_CONFIG.
+
+    The tail estimate follows the TCP RTO recipe: mean + 4 * mean deviation.
+    """
+
+    def __init__(self, provider: str, model: str, alpha: float = ROUTING_EWMA_ALPHA, window: int = LLM_LATENCY_WINDOW):
+        pricing = get_model_pricing(provider, model) or {}
+        seed = float(pricing.get("avg_latency_ms", DEFAULT_SEED_LATENCY_MS))
+
+        self.alpha = alpha
+        self.ewma_latency_ms = seed
+        self.ewma_deviation_ms = seed / 2
+        self.error_rate = 0.0
+        self.samples = 0
+        self.failures = 0
+        self._recent = deque(maxlen=window)
+
+    def record_success(self, latency_ms: float):
+        """Fold a successful call's latency into the averages"""
+        deviation = abs(latency_ms - self.ewma_latency_ms)
+        self.ewma_deviation_ms += self.alpha * (deviation - self.ewma_deviation_ms)
+        self.ewma_latency_ms += self.alpha * (latency_ms - self.ewma_latency_ms)
+        self.error_rate += self.alpha * (0.0 - self.error_rate)
+        self.samples += 1
+        self._recent.append(latency_ms)
+
+    def record_failure(self):
+        """Fold a failed or timed-out call into the error rate"""
+        self.error_rate += self.alpha * (1.0 - self.error_rate)
+        self.failures += 1
+
+    @property
+    def tail_latency_ms(self) -> float:
+        return self.ewma_latency_ms + 4 * self.ewma_deviation_ms
+
+    @property
+    def expected_latency_ms(self) -> float:
+        """Mean latency inflated by the chance of having to fail over"""
+        return self.ewma_latency_ms / max(1.0 - self.error_rate, 0.05)
+
+    def percentile(self, pct: float):
+        """Percentile of recent successful latencies, or None without samples"""
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    @property
+    def recent_count(self) -> int:
+        return len(self._recent)
+
+    def to_dict(self) -> dict:
+        """Return statistics as a dictionary"""
+        return {
+            "ewma_latency_ms": round(self.ewma_latency_ms, 1),
+            "tail_latency_ms": round(self.tail_latency_ms, 1),
+            "error_rate": round(self.error_rate, 4),
+            "samples": self.samples,
+            "failures": self.failures,
+        }
@@ -0,0 +1,69 @@
+"""
+Local token estimation for pre-flight context-window checks and cost fallback.
+
+Provider tokenizers differ, but all of them keep common words whole and split
+rarer long words into pieces of a few characters, so counting regex pieces and
+charging long words by a per-family characters-per-token ratio lands close
+enough to route on without shipping any tokenizer. Only per-model lookups are
+memoized; a text is scanned once however many families it is estimated for.
+"""
+
+import re
+from functools import lru_cache
+
+CHARS_PER_TOKEN = {
+    "gemini": 4.0,
+    "gpt": 4.0,
+    "llama": 3.8,
+    "mixtral": 3.6,
+    "claude": 3.5,
+    "default": 3.5,
+}
+WHOLE_WORD_CHARS = 6  # BPE vocabularies hold most words up to this length as one token
+MESSAGE_OVERHEAD_TOKENS = 4  # role markers / chat template around a single user message
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=256)
+def model_family(model: str) -> str:
+    """Tokenizer family for a model name, e.g. "google/gemini-2.0-flash-exp:free" -> "gemini" """
+    name = (model or "").lower().rsplit("/", 1)[-1]
+    for family in CHARS_PER_TOKEN:
+        if family in name:
+            return family
+    return "default"
+
+
+def _scan(text: str) -> tuple:
+    """(family-independent token count, excess characters of each long word)"""
+    pieces = _PIECE.findall(text)
+    tokens = len(pieces)
+    if not text.isascii():
+        # Non-Latin scripts are roughly one token per character
+        tokens += sum(len(piece) - 1 for piece in pieces if not piece.isascii())
+    excess = [len(piece) - WHOLE_WORD_CHARS for piece in pieces if len(piece) > WHOLE_WORD_CHARS]
+    return tokens, excess
+
+
+def _count(scan: tuple, family: str) -> int:
+    tokens, excess = scan
+    chars_per_token = CHARS_PER_TOKEN.get(family, CHARS_PER_TOKEN["default"])
+    # One token per piece, plus the extra tokens long words split into
+    tokens += sum(-(-chars // chars_per_token) for chars in excess)
+    return int(tokens) + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_tokens(text: str, family: str = "default") -> int:
+    """Approximate token count of text for a tokenizer family"""
+    return _count(_scan(text), family)
+
+
+def estimate_family_tokens(text: str, families) -> dict:
+    """{family: approximate token count} for several tokenizer families, scanning text once"""
+    scan = _scan(text)
+    return {family: _count(scan, family) for family in families}
+
+
+def estimate_model_tokens(text: str, model: str) -> int:
+    return estimate_tokens(text, model_family(model))
@@ -0,0 +1,60 @@
+"""
+Pooled async HTTP transport for LLM provider calls
+"""
+
+import httpx
+
+from ..config import (
+    LLM_CONNECT_TIMEOUT,
+    LLM_READ_TIMEOUT,
+    LLM_POOL_MAX_CONNECTIONS,
+    LLM_POOL_MAX_KEEPALIVE,
+    LLM_KEEPALIVE_EXPIRY,
+)
+
+
+class ProviderTransport:
+    """Keeps one keep-alive connection pool per provider"""
+
+    def __init__(
+        self,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+        max_connections: int = LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive: int = LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY,
+        transport: httpx.AsyncBaseTransport = None
+    ):
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=read_timeout,
+            pool=connect_timeout
+        )
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        # Optional low-level transport, used by tests and the local simulator
+        self._transport = transport
+        self._clients = {}
+
+    def get_client(self, provider_name: str) -> httpx.AsyncClient:
+        """Return the shared client for a provider, creating it on first use"""
+        client = self._clients.get(provider_name)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self._transport
+            )
+            self._clients[provider_name] = client
+        return client
+
+    async def aclose(self):
+        """Close every provider pool"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
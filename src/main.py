@@ -4,6 +4,7 @@ Main application entry point for the Enterprise AI Gateway
 
 import os
 import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,17 +14,34 @@ from slowapi.errors import RateLimitExceeded
 
 from .config import SERVICE_API_KEY, RATE_LIMIT, ALLOWED_ORIGINS
 from .api.routes import router
+from .llm.client import llm_client
+from .batch.jobs import job_manager
+from .metrics.runtime import runtime_monitor
+from .security.toxicity import toxicity_service
 
 # Load environment variables
 load_dotenv()
 
+# --- Lifespan ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the batch job workers and loop monitor; release pooled provider and safety connections on shutdown"""
+    runtime_monitor.start()
+    await job_manager.start()
+    yield
+    await job_manager.stop()
+    await runtime_monitor.stop()
+    await llm_client.aclose()
+    await toxicity_service.aclose()
+
 # --- FastAPI App Setup ---
 app = FastAPI(
     title="Enterprise AI Gateway",
     description="Enterprise-grade AI Gateway with security and fallback protocols.",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # --- CORS & Rate Limiting ---
@@ -20,6 +20,31 @@ class MetricsStore:
     pii_detections: int = 0
     injection_detections: int = 0
     latency_history: List[int] = field(default_factory=list)
+    hedges_fired: int = 0
+    hedge_wins: int = 0
+    hedge_cancelled_calls: int = 0
+    deadline_exceeded: int = 0
+    coalesced_requests: int = 0
+    saturated_rejections: int = 0
+    streaming_requests: int = 0
+    total_ttft_ms: int = 0
+    ttft_history: List[int] = field(default_factory=list)
+    toxicity_local_safe: int = 0
+    toxicity_local_toxic: int = 0
+    toxicity_escalated: int = 0
+    toxicity_audited: int = 0
+    toxicity_audit_agreements: int = 0
+    toxicity_band_agreements: int = 0
+    toxicity_band_compared: int = 0
+    toxicity_batch_calls: int = 0
+    toxicity_batch_items: int = 0
+    toxicity_batch_fallbacks: int = 0
+    toxicity_detections: int = 0
+    speculative_requests: int = 0
+    speculative_blocked: int = 0
+    speculative_cancelled_calls: int = 0
+    speculative_wasted_usd: float = 0.0
+    speculative_saved_ms: int = 0
     _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
     def record_request(
@@ -29,6 +54,7 @@ class MetricsStore:
         blocked: bool = False,
         pii_detected: bool = False,
         injection_detected: bool = False,
+        toxicity_detected: bool = False,
         cascade_failed: bool = False
     ):
         """Record a request with its metrics"""
@@ -54,9 +80,86 @@ class MetricsStore:
             if injection_detected:
                 self.injection_detections += 1
 
+            if toxicity_detected:
+                self.toxicity_detections += 1
+
             if cascade_failed:
                 self.cascade_failures += 1
 
+    def record_hedge(self, fired: int = 0, won: bool = False, cancelled: int = 0):
+        """Record speculative provider calls made by a hedged cascade"""
+        with self._lock:
+            self.hedges_fired += fired
+            if won:
+                self.hedge_wins += 1
+            self.hedge_cancelled_calls += cancelled
+
+    def record_speculation(self, blocked: bool = False, cancelled: bool = False, wasted_usd: float = 0.0,
+                           saved_ms: int = 0):
+        """Record a provider call started alongside the safety check: whether the
+        prompt was blocked, the call cancelled in flight, the spend thrown away and
+        the latency saved over checking first"""
+        with self._lock:
+            self.speculative_requests += 1
+            self.speculative_blocked += int(blocked)
+            self.speculative_cancelled_calls += int(cancelled)
+            self.speculative_wasted_usd += wasted_usd
+            self.speculative_saved_ms += saved_ms
+
+    def record_deadline_exceeded(self):
+        """Record a request that ran out of its deadline budget"""
+        with self._lock:
+            self.deadline_exceeded += 1
+
+    def record_saturated(self):
+        """Record a request rejected because every provider was at capacity"""
+        with self._lock:
+            self.saturated_rejections += 1
+
+    def record_coalesced(self):
+        """Record a request served by joining an identical in-flight call"""
+        with self._lock:
+            self.coalesced_requests += 1
+
+    def record_toxicity_tier(self, tier: str):
+        """Record where a toxicity check was answered: "local_safe", "local_toxic" or "escalated" """
+        with self._lock:
+            if tier == "local_safe":
+                self.toxicity_local_safe += 1
+            elif tier == "local_toxic":
+                self.toxicity_local_toxic += 1
+            else:
+                self.toxicity_escalated += 1
+
+    def record_toxicity_agreement(self, agreed: bool, audit: bool):
+        """Record whether the local tier agreed with the remote verdict, for an
+        audited local answer or for an escalated (uncertain band) text"""
+        with self._lock:
+            if audit:
+                self.toxicity_audited += 1
+                self.toxicity_audit_agreements += int(agreed)
+            else:
+                self.toxicity_band_compared += 1
+                self.toxicity_band_agreements += int(agreed)
+
+    def record_toxicity_batch(self, items: int, fallbacks: int):
+        """Record one multi-text Gemini classification call and how many of its
+        items had to be re-checked singly"""
+        with self._lock:
+            self.toxicity_batch_calls += 1
+            self.toxicity_batch_items += items
+            self.toxicity_batch_fallbacks += fallbacks
+
+    def record_stream(self, ttft_ms: int):
+        """Record time-to-first-token of a completed streaming request"""
+        with self._lock:
+            self.streaming_requests += 1
+            self.total_ttft_ms += ttft_ms
+            self.ttft_history.append(ttft_ms)
+            # Keep only last 100 TTFT measurements
+            if len(self.ttft_history) > 100:
+                self.ttft_history.pop(0)
+
     def to_dict(self) -> dict:
         """Return metrics as a dictionary"""
         with self._lock:
@@ -65,6 +168,12 @@ class MetricsStore:
                 if self.successful_requests > 0
                 else 0
             )
+            avg_ttft = (
+                self.total_ttft_ms / self.streaming_requests
+                if self.streaming_requests > 0
+                else 0
+            )
+            toxicity_checks = self.toxicity_local_safe + self.toxicity_local_toxic + self.toxicity_escalated
             return {
                 "total_requests": self.total_requests,
                 "successful_requests": self.successful_requests,
@@ -74,7 +183,55 @@ class MetricsStore:
                 "cascade_failures": self.cascade_failures,
                 "pii_detections": self.pii_detections,
                 "injection_detections": self.injection_detections,
+                "toxicity_detections": self.toxicity_detections,
                 "latency_history": list(self.latency_history[-20:]),
+                "deadline_exceeded": self.deadline_exceeded,
+                "coalesced_requests": self.coalesced_requests,
+                "saturated_rejections": self.saturated_rejections,
+                "streaming": {
+                    "streaming_requests": self.streaming_requests,
+                    "average_ttft_ms": round(avg_ttft, 2),
+                    "ttft_history": list(self.ttft_history[-20:]),
+                },
+                "hedging": {
+                    "hedges_fired": self.hedges_fired,
+                    "hedge_wins": self.hedge_wins,
+                    "cancelled_calls": self.hedge_cancelled_calls,
+                },
+                "toxicity_tiers": {
+                    "local_safe": self.toxicity_local_safe,
+                    "local_toxic": self.toxicity_local_toxic,
+                    "escalated": self.toxicity_escalated,
+                    "escalation_rate": round(self.toxicity_escalated / toxicity_checks, 4) if toxicity_checks else 0.0,
+                    "audited": self.toxicity_audited,
+                    "audit_agreement_rate": (
+                        round(self.toxicity_audit_agreements / self.toxicity_audited, 4)
+                        if self.toxicity_audited else None
+                    ),
+                    "band_agreement_rate": (
+                        round(self.toxicity_band_agreements / self.toxicity_band_compared, 4)
+                        if self.toxicity_band_compared else None
+                    ),
+                },
+                "toxicity_batch": {
+                    "calls": self.toxicity_batch_calls,
+                    "items": self.toxicity_batch_items,
+                    "items_per_call": (
+                        round(self.toxicity_batch_items / self.toxicity_batch_calls, 2)
+                        if self.toxicity_batch_calls else 0.0
+                    ),
+                    "item_fallbacks": self.toxicity_batch_fallbacks,
+                },
+                "speculative_safety": {
+                    "requests": self.speculative_requests,
+                    "blocked": self.speculative_blocked,
+                    "cancelled_calls": self.speculative_cancelled_calls,
+                    "wasted_spend_usd": round(self.speculative_wasted_usd, 6),
+                    "average_saved_ms": (
+                        round(self.speculative_saved_ms / (self.speculative_requests - self.speculative_blocked), 2)
+                        if self.speculative_requests > self.speculative_blocked else 0.0
+                    ),
+                },
             }
 
     def reset(self):
@@ -89,6 +246,31 @@ class MetricsStore:
             self.pii_detections = 0
             self.injection_detections = 0
             self.latency_history = []
+            self.hedges_fired = 0
+            self.hedge_wins = 0
+            self.hedge_cancelled_calls = 0
+            self.deadline_exceeded = 0
+            self.coalesced_requests = 0
+            self.saturated_rejections = 0
+            self.streaming_requests = 0
+            self.total_ttft_ms = 0
+            self.ttft_history = []
+            self.toxicity_local_safe = 0
+            self.toxicity_local_toxic = 0
+            self.toxicity_escalated = 0
+            self.toxicity_audited = 0
+            self.toxicity_audit_agreements = 0
+            self.toxicity_band_agreements = 0
+            self.toxicity_band_compared = 0
+            self.toxicity_batch_calls = 0
+            self.toxicity_batch_items = 0
+            self.toxicity_batch_fallbacks = 0
+            self.toxicity_detections = 0
+            self.speculative_requests = 0
+            self.speculative_blocked = 0
+            self.speculative_cancelled_calls = 0
+            self.speculative_wasted_usd = 0.0
+            self.speculative_saved_ms = 0
 
 
 # Singleton instance
@@ -0,0 +1,89 @@
+"""
+Runtime health of the gateway process: event-loop lag and memory
+"""
+
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+
+from ..config import EVENT_LOOP_MONITOR_INTERVAL_MS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def rss_bytes() -> int:
+    """Current resident set size, or 0 where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def peak_rss_bytes() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class EventLoopMonitor:
+    """Samples how late a periodic sleep wakes up. Anything that blocks the
+    loop (sync I/O, CPU-heavy work) shows up directly as lag."""
+
+    def __init__(self, interval_ms: float = EVENT_LOOP_MONITOR_INTERVAL_MS, window: int = 600):
+        self.interval_s = interval_ms / 1000
+        self.samples = deque(maxlen=window)
+        self.max_lag_ms = 0.0
+        self._task = None
+
+    def start(self):
+        if self.interval_s > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval_s)
+            lag_ms = max(0.0, (time.perf_counter() - started - self.interval_s) * 1000)
+            self.samples.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    def reset(self):
+        self.samples.clear()
+        self.max_lag_ms = 0.0
+
+    def to_dict(self) -> dict:
+        ordered = sorted(self.samples)
+
+        def pct(p):
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 2)
+
+        return {
+            "event_loop_lag_ms": {
+                "p50": pct(50),
+                "p99": pct(99),
+                "max": round(self.max_lag_ms, 2),
+                "samples": len(ordered),
+            },
+            "rss_bytes": rss_bytes(),
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+
+# Singleton instance (started and stopped by the app lifespan)
+runtime_monitor = EventLoopMonitor()
@@ -5,10 +5,17 @@ Pydantic models for the Enterprise AI Gateway
 from pydantic import BaseModel, Field, validator
 from typing import Optional
 
+MAX_PROMPT_CHARS = 4000
+MAX_TOKENS_LIMIT = 2048  # shared by /query, /query/stream and batch jobs
+
 class QueryRequest(BaseModel):
-    prompt: str = Field(..., min_length=1, max_length=4000)
-    max_tokens: int = Field(256, ge=1, le=2048)
+    prompt: str = Field(..., min_length=1, max_length=MAX_PROMPT_CHARS)
+    max_tokens: int = Field(256, ge=1, le=MAX_TOKENS_LIMIT)
     temperature: float = Field(0.7, ge=0.0, le=2.0)
+    routing_strategy: Optional[str] = Field(None, pattern="^(static|fastest|cheapest|weighted)$")
+    max_latency_ms: Optional[int] = Field(None, ge=1)  # latency target for policy routing
+    max_cost_usd: Optional[float] = Field(None, ge=0.0)  # cost ceiling for policy routing
+    prefer: str = Field("cost", pattern="^(cost|latency)$")  # policy tie-break among models meeting the target
 
     @validator('prompt')
     def check_prompt_injection(cls, v):
@@ -17,12 +24,25 @@ class QueryRequest(BaseModel):
             raise ValueError("Security Alert: Prompt injection pattern detected.")
         return v
 
+    @validator('prompt')
+    def check_pii(cls, v):
+        from ..config import PII_MODE
+        from ..security import has_pii, redact_pii
+        if PII_MODE == "block" and has_pii(v):
+            raise ValueError("Security Alert: PII detected in prompt.")
+        if PII_MODE == "redact":
+            return redact_pii(v)
+        return v
+
 class CascadeStep(BaseModel):
     provider: str
     model: Optional[str] = None
-    status: str  # "success", "failed", "timeout"
+    status: str  # "success", "failed", "timeout", "won", "cancelled", "circuit_open", "skipped", "cached", "saturated"
     reason: Optional[str] = None
     latency_ms: int
+    hedged: Optional[bool] = None  # launched speculatively by a hedged cascade
+    ttft_ms: Optional[int] = None  # time to first token, streaming only
+    usage: Optional[dict] = None  # provider-reported {"input_tokens", "output_tokens"}
 
 class QueryResponse(BaseModel):
     response: Optional[str]
@@ -32,6 +52,7 @@ class QueryResponse(BaseModel):
     error: Optional[str]
     cascade_path: Optional[list] = None
     cost_estimate_usd: Optional[float] = None
+    cached: bool = False
 
 class HealthResponse(BaseModel):
     status: str
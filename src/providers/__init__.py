@@ -90,6 +90,12 @@ def get_model_pricing(provider: str, model: str) -> dict:
     return None
 
 
+def get_context_window(provider: str, model: str):
+    """Context window in tokens for a provider/model, or None if unknown"""
+    pricing = get_model_pricing(provider, model)
+    return pricing.get("context_window") if pricing else None
+
+
 def estimate_cost(provider: str, model: str, input_tokens: int, output_tokens: int) -> float:
     """Estimate cost for a request in USD"""
     pricing = get_model_pricing(provider, model)
@@ -0,0 +1,175 @@
+"""
+Compiled prompt-injection matcher.
+
+Each rule's longest mandatory literal becomes a prefilter keyword, looked up in
+the lower-cased prompt: by substring checks for small rule sets, and through one
+trie-shaped regex over all keywords beyond SUBSTRING_PREFILTER_MAX, so the scan
+grows with prompt length rather than rule count. Only rules whose keyword occurs
+are then run, as one combined alternation (compiled once per candidate set and
+cached) that reports the leftmost match and the rule that fired. Rules without a
+usable literal are always run. The prefilter only applies to ASCII prompts:
+re.IGNORECASE also matches Unicode case variants that str.lower() does not
+fold to the keyword (long s U+017F for s, dotless i U+0131 for i), so any
+other prompt is matched against every rule. Every rule must pass check_linear (bounded or fenced
+repeats, no nested repeats or backreferences), so matching stays linear in prompt
+length however the prompt is crafted.
+"""
+
+import json
+import re
+from typing import NamedTuple, Optional
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+    import re._constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+from .linear import _REPEATS, UnsafePatternError, check_linear
+
+MIN_KEYWORD_LENGTH = 3
+SUBSTRING_PREFILTER_MAX = 64  # above this many keywords the trie scan is cheaper
+CANDIDATE_CACHE_SIZE = 256
+
+
+class InjectionRule(NamedTuple):
+    name: str
+    pattern: str
+    keyword: Optional[str] = None  # extracted from the pattern when omitted
+
+
+class InjectionMatch(NamedTuple):
+    rule: str
+    start: int
+    end: int
+    text: str
+
+
+def extract_keyword(pattern: str) -> Optional[str]:
+    """Longest literal run every match of pattern must contain (lower-cased),
+    or None when there is no run of at least MIN_KEYWORD_LENGTH characters"""
+    best = ""
+
+    def walk(items):
+        nonlocal best
+        run = []
+        for op, av in items:
+            if op is sre_constants.LITERAL:
+                run.append(chr(av))
+                continue
+            candidate = "".join(run)
+            if len(candidate) > len(best):
+                best = candidate
+            run = []
+            if op is sre_constants.SUBPATTERN:
+                walk(av[-1])  # a plain group is mandatory; its contents count
+            elif op in _REPEATS and av[0] >= 1:
+                walk(av[2])
+        candidate = "".join(run)
+        if len(candidate) > len(best):
+            best = candidate
+
+    walk(sre_parse.parse(pattern))
+    best = best.strip().lower()
+    return best if len(best) >= MIN_KEYWORD_LENGTH else None
+
+
+def trie_regex(words) -> str:
+    """Regex source matching any of words, factored as a prefix trie so the
+    engine walks shared prefixes once instead of trying every word"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+class InjectionMatcher:
+    """Keyword-prefiltered, combined matcher over a list of InjectionRule"""
+
+    def __init__(self, rules):
+        self.rules = [
+            rule if rule.keyword else rule._replace(keyword=extract_keyword(rule.pattern))
+            for rule in (r if isinstance(r, InjectionRule) else InjectionRule(*r) for r in rules)
+        ]
+        for rule in self.rules:
+            try:
+                check_linear(rule.pattern)
+            except UnsafePatternError as e:
+                raise UnsafePatternError(f"Injection rule {rule.name!r}: {e}") from None
+        self._all = tuple(range(len(self.rules)))
+        self._always = tuple(i for i, rule in enumerate(self.rules) if not rule.keyword)
+        self._rules_by_keyword = {}
+        for i, rule in enumerate(self.rules):
+            if rule.keyword:
+                self._rules_by_keyword.setdefault(rule.keyword, []).append(i)
+        # Zero-width lookahead finds overlapping keyword hits; the trie regex
+        # reports the longest keyword at each position, so prefixes of it that
+        # are keywords themselves are credited too.
+        self._prefix_rules = {
+            keyword: tuple(sorted({
+                i for end in range(1, len(keyword) + 1) for i in self._rules_by_keyword.get(keyword[:end], ())
+            }))
+            for keyword in self._rules_by_keyword
+        }
+        self._keyword_scan = None
+        if len(self._rules_by_keyword) > SUBSTRING_PREFILTER_MAX:
+            self._keyword_scan = re.compile("(?=(%s))" % trie_regex(self._rules_by_keyword))
+        self._combined = {}
+
+    @classmethod
+    def from_file(cls, path: str, base_rules=()):
+        """Load extra rules from a JSON list of {"name", "pattern", "keyword"?}"""
+        with open(path) as f:
+            extra = [InjectionRule(r["name"], r["pattern"], r.get("keyword")) for r in json.load(f)]
+        return cls(list(base_rules) + extra)
+
+    def _candidates(self, text: str) -> tuple:
+        if not self._rules_by_keyword:
+            return self._always
+        if not text.isascii():
+            return self._all
+        lowered = text.lower()
+        found = set(self._always)
+        if self._keyword_scan is None:
+            for keyword, ids in self._rules_by_keyword.items():
+                if keyword in lowered:
+                    found.update(ids)
+        else:
+            for hit in self._keyword_scan.finditer(lowered):
+                found.update(self._prefix_rules[hit.group(1)])
+        return tuple(sorted(found))
+
+    def _combined_regex(self, candidates: tuple):
+        regex = self._combined.get(candidates)
+        if regex is None:
+            if len(self._combined) >= CANDIDATE_CACHE_SIZE:
+                self._combined.pop(next(iter(self._combined)))
+            regex = self._combined[candidates] = re.compile(
+                "|".join("(?P<r%d>%s)" % (i, self.rules[i].pattern) for i in candidates), re.IGNORECASE
+            )
+        return regex
+
+    def search(self, text: str) -> Optional[InjectionMatch]:
+        """Leftmost rule match in text, or None"""
+        candidates = self._candidates(text)
+        if not candidates:
+            return None
+        match = self._combined_regex(candidates).search(text)
+        if match is None:
+            return None
+        rule = self.rules[int(match.lastgroup[1:])]
+        return InjectionMatch(rule.name, match.start(), match.end(), match.group())
@@ -0,0 +1,258 @@
+"""
+Linear-time guarantee for security rule patterns.
+
+Python's re backtracks, so a pattern like `[\\w.-]+@` tried at every start
+position of a long run rescans the run each time (quadratic), and nested
+quantifiers are exponential. check_linear admits only patterns whose match
+attempts do bounded work, or work amortized over the input:
+
+- no repeat that can iterate more than once contains another such repeat or
+  an alternation, so there is no ambiguity to backtrack through,
+- no backreferences or conditional groups,
+- the longest possible match (including lookarounds) is at most MAX_MATCH_WIDTH,
+  except for fenced runs: an unbounded repeat of a single character class
+  (`\\s+`, `[a-z0-9._%+-]+`) is allowed when the character before it (the
+  preceding item, or a negative lookbehind on the class) and every character
+  that can follow it (or the end of the pattern) fall outside the class. The
+  run is then entered only at its first character and never split by
+  backtracking, so each run is scanned a bounded number of times.
+
+A scan then costs at most (input length x a per-rule constant), whatever the
+input. Other unbounded `+` / `*` are rejected; write `{1,64}` style bounds.
+"""
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+    import re._constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+MAX_MATCH_WIDTH = 1024
+
+_REPEATS = tuple(
+    getattr(sre_constants, name) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+    if hasattr(sre_constants, name)
+)
+_ATOMIC_GROUP = getattr(sre_constants, "ATOMIC_GROUP", None)
+_CHAR_OPS = (sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.IN, sre_constants.ANY)
+_ZERO_WIDTH = (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT)
+
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: str.isdigit,
+    sre_constants.CATEGORY_NOT_DIGIT: lambda ch: not ch.isdigit(),
+    sre_constants.CATEGORY_SPACE: str.isspace,
+    sre_constants.CATEGORY_NOT_SPACE: lambda ch: not ch.isspace(),
+    sre_constants.CATEGORY_WORD: lambda ch: ch.isalnum() or ch == "_",
+    sre_constants.CATEGORY_NOT_WORD: lambda ch: not (ch.isalnum() or ch == "_"),
+}
+# Characters probed when two classes are compared (rules are matched case-insensitively)
+_PROBE = [chr(code) for code in range(0x3000)]
+
+
+class UnsafePatternError(ValueError):
+    """Pattern could backtrack super-linearly on adversarial input"""
+
+
+class CharSet:
+    """Characters one pattern position can match; `chars` is set when finite"""
+
+    def __init__(self, test, chars=None):
+        self.test = test
+        self.chars = chars
+
+    @classmethod
+    def of(cls, op, av):
+        if op is sre_constants.LITERAL:
+            return cls.literals([chr(av)])
+        if op is sre_constants.NOT_LITERAL:
+            return cls(lambda ch: ch.lower() != chr(av).lower())
+        if op is sre_constants.IN:
+            return cls.klass(av)
+        return cls(lambda ch: True)  # ANY, or anything not understood
+
+    @classmethod
+    def literals(cls, chars):
+        folded = frozenset(c for ch in chars for c in (ch, ch.lower(), ch.upper()))
+        return cls(folded.__contains__, folded)
+
+    @classmethod
+    def klass(cls, items):
+        negate = False
+        chars, tests = [], []
+        for op, av in items:
+            if op is sre_constants.NEGATE:
+                negate = True
+            elif op is sre_constants.LITERAL:
+                chars.append(chr(av))
+            elif op is sre_constants.RANGE and av[1] - av[0] < 256:
+                chars.extend(chr(code) for code in range(av[0], av[1] + 1))
+            elif op is sre_constants.RANGE:
+                low, high = av
+                tests.append(lambda ch, low=low, high=high: low <= ord(ch) <= high)
+            elif op is sre_constants.CATEGORY and av in _CATEGORIES:
+                tests.append(_CATEGORIES[av])
+            else:
+                tests.append(lambda ch: True)
+        finite = cls.literals(chars)
+        if not tests and not negate:
+            return finite
+
+        def test(ch):
+            hit = any(finite.test(c) or any(t(c) for t in tests) for c in (ch, ch.lower(), ch.upper()))
+            return hit != negate
+        return cls(test)
+
+    def union(self, other):
+        if self.chars is not None and other.chars is not None:
+            return CharSet((self.chars | other.chars).__contains__, self.chars | other.chars)
+        return CharSet(lambda ch: self.test(ch) or other.test(ch))
+
+    def disjoint(self, other) -> bool:
+        if self.chars is not None:
+            return not any(other.test(ch) for ch in self.chars)
+        if other.chars is not None:
+            return not any(self.test(ch) for ch in other.chars)
+        return not any(self.test(ch) and other.test(ch) for ch in _PROBE)
+
+
+EMPTY = CharSet.literals([])
+
+
+def _edge(items, last: bool):
+    """(CharSet of the first or last character items can match, whether items can match empty)"""
+    chars = EMPTY
+    for op, av in (reversed(items) if last else items):
+        if op in _CHAR_OPS:
+            return chars.union(CharSet.of(op, av)), False
+        if op in _ZERO_WIDTH:
+            continue
+        if op is sre_constants.SUBPATTERN:
+            edge, nullable = _edge(av[-1], last)
+        elif op is _ATOMIC_GROUP:
+            edge, nullable = _edge(av, last)
+        elif op is sre_constants.BRANCH:
+            edge, nullable = EMPTY, False
+            for branch in av[1]:
+                branch_edge, branch_nullable = _edge(branch, last)
+                edge, nullable = edge.union(branch_edge), nullable or branch_nullable
+        elif op in _REPEATS:
+            edge, nullable = _edge(av[2], last)
+            nullable = nullable or av[0] == 0
+        else:
+            return CharSet(lambda ch: True), False
+        chars = chars.union(edge)
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def _fenced_before(items, index: int, klass: CharSet, before) -> bool:
+    """Whether the character before items[index] is known to lie outside klass"""
+    for op, av in reversed(items[:index]):
+        if op is sre_constants.ASSERT_NOT and av[0] == -1 and len(av[1]) == 1 and av[1][0][0] in _CHAR_OPS:
+            # (?<![class]) directly before the run: the run starts at its first character
+            barred = CharSet.of(*av[1][0])
+            if not any(klass.test(ch) and not barred.test(ch) for ch in (klass.chars or _PROBE)):
+                return True
+            continue
+        if op in _ZERO_WIDTH:
+            continue
+        edge, nullable = _edge([(op, av)], last=True)
+        if not edge.disjoint(klass):
+            return False
+        if not nullable:
+            return True
+    return before is not None and before.disjoint(klass)
+
+
+def _follow(items, index: int, after):
+    """CharSet of characters that can follow items[index]; None when the pattern may end there"""
+    edge, nullable = _edge(items[index + 1:], last=False)
+    if not nullable:
+        return edge
+    return None if after is None else edge.union(after)
+
+
+def _walk(items, in_repeat: bool, max_width: int, before=None, after=None) -> bool:
+    """Check items; before/after are the CharSets that can precede/follow the
+    sequence (None at the pattern's edges). Returns True if a fenced run was used."""
+    fenced = False
+    for index, (op, av) in enumerate(items):
+        if op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+            raise UnsafePatternError("backreferences are not allowed")
+        if op in _REPEATS:
+            low, high, body = av
+            if high > max_width and len(body) == 1 and body[0][0] in _CHAR_OPS and not in_repeat:
+                klass = CharSet.of(*body[0])
+                follow = _follow(items, index, after)
+                if not _fenced_before(items, index, klass, before) or not (follow is None or follow.disjoint(klass)):
+                    raise UnsafePatternError(
+                        "unbounded repeat must sit between characters outside its class; "
+                        "bound it, e.g. {1,64} instead of +"
+                    )
+                fenced = True
+            elif high > max_width:
+                raise UnsafePatternError(
+                    f"matches may be longer than {max_width} characters; bound repeats, e.g. {{1,64}} instead of +"
+                )
+            elif high > 1:
+                if in_repeat:
+                    raise UnsafePatternError("nested repeats are not allowed")
+                _walk(body, True, max_width)
+            else:
+                fenced |= _walk(body, in_repeat, max_width, *_context(items, index, before, after))
+        elif op is sre_constants.BRANCH:
+            if in_repeat:
+                raise UnsafePatternError("alternation inside a repeat is not allowed")
+            for branch in av[1]:
+                fenced |= _walk(branch, in_repeat, max_width, *_context(items, index, before, after))
+        elif op is sre_constants.SUBPATTERN:
+            fenced |= _walk(av[-1], in_repeat, max_width, *_context(items, index, before, after))
+        elif op is _ATOMIC_GROUP:
+            fenced |= _walk(av, in_repeat, max_width, *_context(items, index, before, after))
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if av[1].getwidth()[1] > max_width:
+                raise UnsafePatternError("unbounded lookaround")
+            _walk(av[1], in_repeat, max_width)
+    return fenced
+
+
+def _context(items, index: int, before, after):
+    """(before, after) CharSets for the contents of items[index]"""
+    edge, nullable = _edge(items[:index], last=True)
+    if nullable:
+        edge = None if before is None else edge.union(before)
+    return edge, _follow(items, index, after)
+
+
+def _width(items, max_width: int) -> int:
+    """Longest match, counting a fenced run as one iteration (its scan is amortized)"""
+    width = 0
+    for op, av in items:
+        if op in _REPEATS and av[1] > max_width:
+            width += _width(av[2], max_width) * max(av[0], 1)
+        elif op in _REPEATS:
+            width += _width(av[2], max_width) * av[1]
+        elif op is sre_constants.SUBPATTERN:
+            width += _width(av[-1], max_width)
+        elif op is _ATOMIC_GROUP:
+            width += _width(av, max_width)
+        elif op is sre_constants.BRANCH:
+            width += max(_width(branch, max_width) for branch in av[1])
+        elif op in _CHAR_OPS:
+            width += 1
+    return width
+
+
+def check_linear(pattern: str, max_width: int = MAX_MATCH_WIDTH) -> int:
+    """Raise UnsafePatternError unless pattern matches in time linear in the
+    input; returns the pattern's maximum match width (a fenced run counted once)"""
+    parsed = sre_parse.parse(pattern)
+    fenced = _walk(parsed, False, max_width)
+    width = _width(parsed, max_width) if fenced else parsed.getwidth()[1]
+    if width > max_width:
+        raise UnsafePatternError(
+            f"matches may be longer than {max_width} characters; bound repeats, e.g. {{1,64}} instead of +"
+        )
+    return width
@@ -0,0 +1,61 @@
+"""
+Local first-tier safety classifier: logistic regression over hashed character
+trigrams (the semantic cache's HashedNgramEmbedder), scored with one NumPy dot
+product in tens of microseconds.
+
+The model is a .npz file with `weights` (one float per hashed feature) and
+`bias`, trained offline with scripts/train_safety_classifier.py and loaded
+once at startup from TOXICITY_LOCAL_MODEL. Only scores outside the uncertain
+band (TOXICITY_LOCAL_SAFE_BELOW .. TOXICITY_LOCAL_TOXIC_ABOVE) are answered
+locally; the rest go to Gemini/Lakera.
+"""
+
+import numpy as np
+
+from ..cache.semantic import HashedNgramEmbedder
+
+LOCAL_TOXIC_CATEGORY = "LOCAL_CLASSIFIER_TOXIC"
+
+
+def sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class LinearSafetyModel:
+    """Probability that a text is harmful, from a linear score over hashed features"""
+
+    def __init__(self, weights, bias: float = 0.0):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.embedder = HashedNgramEmbedder(dim=len(self.weights))
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            return cls(data["weights"], float(data["bias"]))
+
+    def save(self, path: str):
+        np.savez(path, weights=self.weights, bias=np.float32(self.bias))
+
+    def score(self, text: str) -> float:
+        return float(sigmoid(float(self.embedder.embed(text) @ self.weights) + self.bias))
+
+    @classmethod
+    def fit(cls, texts, labels, dim: int = 4096, epochs: int = 300, learning_rate: float = 4.0,
+            l2: float = 1e-4):
+        """Full-batch gradient descent on the logistic loss; labels are 1 for harmful, 0 for safe"""
+        embedder = HashedNgramEmbedder(dim=dim)
+        features = np.stack([embedder.embed(text) for text in texts])
+        targets = np.asarray(labels, dtype=np.float32)
+        # Weight classes equally so a skewed training set does not bias the threshold band
+        positives = max(targets.sum(), 1.0)
+        negatives = max(len(targets) - targets.sum(), 1.0)
+        sample_weight = np.where(targets == 1, 0.5 / positives, 0.5 / negatives).astype(np.float32)
+
+        weights = np.zeros(dim, dtype=np.float32)
+        bias = 0.0
+        for _ in range(epochs):
+            error = (sigmoid(features @ weights + bias) - targets) * sample_weight
+            weights -= learning_rate * (features.T @ error + l2 * weights)
+            bias -= learning_rate * float(error.sum())
+        return cls(weights, bias)
@@ -0,0 +1,172 @@
+"""
+Safety pipeline for /query and /query/stream: how the toxicity check is ordered
+against the provider call.
+
+"off" skips the check; "sequential" checks the prompt and only then calls the
+provider, so the check's full latency is added to every request; "speculative"
+starts the provider call at the same time as the check and releases the response
+only once the check passes. A blocked prompt cancels the in-flight call, and
+any answer that finished first is discarded; the spend on it is reported as
+wasted. Speculation saves min(check time, call time) per request.
+
+The mode is chosen per API key (SAFETY_PIPELINE_KEYS, keys given as SHA-256 hex
+so the configuration holds no secrets), then per route (SAFETY_PIPELINE_ROUTES),
+then SAFETY_PIPELINE_MODE. A check that errors lets the request through, as
+/check-toxicity reports errors rather than verdicts.
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import NamedTuple, Optional
+
+from ..config import SAFETY_PIPELINE_MODE, SAFETY_PIPELINE_ROUTES, SAFETY_PIPELINE_KEYS
+
+SAFETY_PIPELINE_MODES = ("off", "sequential", "speculative")
+PROMPT_BLOCKED_ERROR = "Security Alert: prompt blocked by content safety check."
+
+
+def parse_modes(value: str) -> dict:
+    """{"name": mode} from "name=mode,name=mode" """
+    modes = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, mode = item.rpartition("=")
+        mode = mode.strip().lower()
+        if not name or mode not in SAFETY_PIPELINE_MODES:
+            raise ValueError(f"Invalid safety pipeline setting: {item!r}")
+        modes[name.strip()] = mode
+    return modes
+
+
+def api_key_fingerprint(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class SafetyPipeline:
+    """Resolves the pipeline mode for a request"""
+
+    def __init__(self, default: str = SAFETY_PIPELINE_MODE, routes: dict = None, keys: dict = None):
+        if default not in SAFETY_PIPELINE_MODES:
+            raise ValueError(f"Unknown safety pipeline mode: {default}")
+        self.default = default
+        self.routes = routes or {}
+        self.keys = {fingerprint.lower(): mode for fingerprint, mode in (keys or {}).items()}
+
+    def mode(self, route: str, api_key: str = None) -> str:
+        if api_key and self.keys:
+            mode = self.keys.get(api_key_fingerprint(api_key))
+            if mode is not None:
+                return mode
+        return self.routes.get(route, self.default)
+
+
+class GuardedCall(NamedTuple):
+    verdict: Optional[dict]  # toxicity verdict; None when the mode is "off"
+    result: object = None  # the call's result; None when blocked
+    blocked: bool = False
+    wasted: object = None  # result of a call that finished before the block, never released
+    cancelled: bool = False  # the call was still in flight when the block cancelled it
+    saved_ms: int = 0  # latency speculation saved over checking first
+
+
+async def run_guarded(mode: str, check, call) -> GuardedCall:
+    """Run call() behind check() in the given mode. check() returns a toxicity
+    verdict; call() is a coroutine function whose result is released only when
+    the verdict is not toxic."""
+    if mode == "off":
+        return GuardedCall(None, await call())
+    if mode == "sequential":
+        verdict = await check()
+        if verdict["is_toxic"]:
+            return GuardedCall(verdict, blocked=True)
+        return GuardedCall(verdict, await call())
+
+    started = time.perf_counter()
+    task = asyncio.create_task(call())
+    finished = {}
+    task.add_done_callback(lambda _: finished.setdefault("at", time.perf_counter()))
+    try:
+        verdict = await check()
+        checked = time.perf_counter()
+        if verdict["is_toxic"]:
+            if task.done():
+                wasted = None if task.cancelled() or task.exception() else task.result()
+                return GuardedCall(verdict, blocked=True, wasted=wasted)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return GuardedCall(verdict, blocked=True, cancelled=True)
+        result = await task
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    call_ms = finished.get("at", time.perf_counter()) - started
+    return GuardedCall(verdict, result, saved_ms=int(min(checked - started, call_ms) * 1000))
+
+
+async def guard_stream(mode: str, check, events, on_blocked, on_released=None):
+    """Yield the events of the async generator `events` behind check().
+
+    In speculative mode events are buffered while the check runs and flushed once
+    it passes, after calling on_released(saved_ms). On a block the generator is
+    cancelled and the single event returned by on_blocked(verdict, held_events,
+    cancelled) is yielded instead; held_events are the events produced before the
+    block, never sent.
+    """
+    if mode == "off":
+        async for event in events:
+            yield event
+        return
+    if mode == "sequential":
+        verdict = await check()
+        if verdict["is_toxic"]:
+            await events.aclose()
+            yield on_blocked(verdict, [], False)
+            return
+        async for event in events:
+            yield event
+        return
+
+    queue = asyncio.Queue()
+    end = object()
+    first = {}
+
+    async def pump():
+        try:
+            async for event in events:
+                first.setdefault("at", time.perf_counter())
+                queue.put_nowait(event)
+        finally:
+            queue.put_nowait(end)
+
+    started = time.perf_counter()
+    task = asyncio.create_task(pump())
+    try:
+        verdict = await check()
+        checked = time.perf_counter()
+        if verdict["is_toxic"]:
+            cancelled = not task.done()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            held = []
+            while not queue.empty():
+                event = queue.get_nowait()
+                if event is not end:
+                    held.append(event)
+            yield on_blocked(verdict, held, cancelled)
+            return
+        if on_released is not None:
+            # Time to the first event overlapped with the check
+            first_event = first.get("at", checked)
+            on_released(int((min(checked, first_event) - started) * 1000))
+        while (event := await queue.get()) is not end:
+            yield event
+        await task  # surface a failure of the generator itself
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+# Singleton resolved from the environment at startup
+safety_pipeline = SafetyPipeline(routes=parse_modes(SAFETY_PIPELINE_ROUTES), keys=parse_modes(SAFETY_PIPELINE_KEYS))
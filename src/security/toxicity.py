@@ -0,0 +1,488 @@
+"""
+Async toxicity classification over pooled connections.
+
+Gemini classifies the text into a harm category; Lakera Guard is the second
+backend. In "fallback" mode Lakera is asked only when Gemini gives no verdict;
+in "race" mode both are asked at once, the first conclusive verdict wins and
+the other call is cancelled. Each backend call has its own deadline, so a
+check takes at most the sum of both deadlines (fallback) or the larger one
+(race). Verdicts are cached by a hash of the whitespace- and case-normalized
+text, with separate TTLs for toxic and safe verdicts; errors are never cached.
+
+With a local model configured (security/local_classifier.py), texts it scores
+confidently safe or harmful are answered without a remote call; only the
+uncertain band escalates. A sample of local answers is re-checked remotely in
+the background to measure how often the tiers agree.
+
+check_many() classifies many texts with few round-trips: texts not answered by
+the cache or local tier are packed into chunks (bounded by text count and
+characters), each chunk is one Gemini call whose reply carries one numbered
+category per text, and chunks run concurrently. Items missing from or garbled
+in the reply fall back to Lakera one by one.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+
+import httpx
+
+from ..config import (
+    GEMINI_BASE_URL,
+    LAKERA_API_URL,
+    TOXICITY_MODE,
+    TOXICITY_GEMINI_TIMEOUT_MS,
+    TOXICITY_LAKERA_TIMEOUT_MS,
+    TOXICITY_CACHE_ENABLED,
+    TOXICITY_CACHE_MAX_ENTRIES,
+    TOXICITY_CACHE_POSITIVE_TTL_S,
+    TOXICITY_CACHE_NEGATIVE_TTL_S,
+    TOXICITY_LOCAL_MODEL,
+    TOXICITY_LOCAL_SAFE_BELOW,
+    TOXICITY_LOCAL_TOXIC_ABOVE,
+    TOXICITY_LOCAL_AUDIT_RATE,
+    TOXICITY_BATCH_CHUNK_TEXTS,
+    TOXICITY_BATCH_CHUNK_CHARS,
+    TOXICITY_BATCH_CONCURRENCY,
+)
+from ..cache import ResponseCache, normalize_prompt
+from ..llm.transport import ProviderTransport
+from ..metrics import metrics
+from .local_classifier import LOCAL_TOXIC_CATEGORY, LinearSafetyModel
+
+TOXICITY_MODES = ("fallback", "race")
+SAFETY_UNAVAILABLE_ERROR = "Safety check unavailable"
+
+# Gemini harm categories (all available categories)
+HARM_CATEGORIES = [
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+    "HARM_CATEGORY_HATE_SPEECH",
+    "HARM_CATEGORY_HARASSMENT",
+    "HARM_CATEGORY_DANGEROUS_CONTENT",
+    "HARM_CATEGORY_CIVIC_INTEGRITY",
+]
+
+CATEGORY_GUIDE = """- SEXUALLY_EXPLICIT (nude, porn, explicit sexual content)
+- HATE_SPEECH (racism, discrimination, slurs)
+- HARASSMENT (threats, bullying, intimidation)
+- DANGEROUS_CONTENT (weapons, drugs, violence, self-harm)
+- CIVIC_INTEGRITY (election fraud, voter suppression)"""
+
+CLASSIFICATION_PROMPT = """Analyze this text and determine if it requests harmful content.
+Respond with ONLY one of these categories, or "SAFE" if harmless:
+""" + CATEGORY_GUIDE + """
+
+Text to analyze: "{text}"
+
+Category:"""
+
+# Texts are embedded as JSON strings so one cannot forge another item's line
+BATCH_CLASSIFICATION_PROMPT = """Analyze each numbered text below and determine if it requests harmful content.
+For EVERY text respond with one line "<number>: <CATEGORY>", using ONLY one of these categories, or "SAFE" if harmless:
+""" + CATEGORY_GUIDE + """
+
+Texts to analyze (JSON strings):
+{items}
+
+Answers:"""
+
+# "3: HATE_SPEECH", "3. SAFE", "[3] SAFE", "**3**: SAFE"
+BATCH_ANSWER_LINE = re.compile(r"^\W{0,4}(\d{1,5})\W{1,6}(\w[^\n]*)$", re.MULTILINE)
+SAFE_ANSWER = re.compile(r"\W{0,4}SAFE\b")
+
+
+def toxicity_result(is_toxic: bool = False, scores: dict = None, blocked_categories: list = None,
+                    error: str = None) -> dict:
+    return {
+        "is_toxic": is_toxic,
+        "scores": scores or {},
+        "blocked_categories": blocked_categories or [],
+        "error": error
+    }
+
+
+def get_gemini_safety_url():
+    # Uses GEMINI_MODEL env var or defaults to gemini-2.5-flash
+    model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+    return f"{GEMINI_BASE_URL}/models/{model}:generateContent"
+
+
+def parse_gemini_verdict(data: dict) -> dict:
+    """Verdict from a Gemini generateContent response to CLASSIFICATION_PROMPT"""
+    # Request blocked at prompt level
+    feedback = data.get("promptFeedback") or {}
+    if feedback.get("blockReason"):
+        return toxicity_result(True, {"BLOCKED": 1.0}, [feedback["blockReason"]])
+
+    if not data.get("candidates"):
+        return toxicity_result()
+    return category_verdict(gemini_response_text(data))
+
+
+def gemini_response_text(data: dict) -> str:
+    return "".join(
+        part.get("text", "") for part in data["candidates"][0].get("content", {}).get("parts", [])
+    ).strip().upper()
+
+
+def category_verdict(answer: str) -> dict:
+    """Verdict from one upper-cased category answer; SAFE when it names no harm category"""
+    blocked_categories = []
+    scores = {}
+    for category in HARM_CATEGORIES:
+        if category[len("HARM_CATEGORY_"):] in answer:
+            blocked_categories.append(category)
+            scores[category] = 0.9
+    # Gemini said SAFE or matched no category
+    if not blocked_categories:
+        scores["SAFE"] = 1.0
+    return toxicity_result(len(blocked_categories) > 0, scores, blocked_categories)
+
+
+def batch_classification_prompt(texts) -> str:
+    return BATCH_CLASSIFICATION_PROMPT.format(
+        items="\n".join(f"{n}. {json.dumps(text, ensure_ascii=False)}" for n, text in enumerate(texts, 1))
+    )
+
+
+def parse_gemini_batch_verdicts(data: dict, count: int) -> dict:
+    """Verdicts by 0-based item position from a reply to BATCH_CLASSIFICATION_PROMPT.
+
+    Items with no answer line, an answer naming neither SAFE nor a harm category,
+    or conflicting answers are left out so the caller can re-check them. A
+    prompt-level block cannot be attributed to an item, so it yields nothing.
+    """
+    if (data.get("promptFeedback") or {}).get("blockReason") or not data.get("candidates"):
+        return {}
+    answers = {}
+    for match in BATCH_ANSWER_LINE.finditer(gemini_response_text(data)):
+        position = int(match.group(1)) - 1
+        answer = match.group(2).strip()
+        if 0 <= position < count:
+            answers.setdefault(position, set()).add(answer)
+
+    verdicts = {}
+    for position, answer_set in answers.items():
+        if len(answer_set) != 1:
+            continue
+        answer = answer_set.pop()
+        verdict = category_verdict(answer)
+        if verdict["is_toxic"] or SAFE_ANSWER.match(answer):
+            verdicts[position] = verdict
+    return verdicts
+
+
+def chunk_texts(texts, max_texts: int, max_chars: int):
+    """Split texts into consecutive chunks of at most max_texts items and max_chars
+    characters; a single text longer than max_chars gets a chunk of its own"""
+    chunks, chunk, size = [], [], 0
+    for text in texts:
+        if chunk and (len(chunk) >= max_texts or size + len(text) > max_chars):
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(text)
+        size += len(text)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def parse_lakera_verdict(data: dict) -> dict:
+    """Verdict from a Lakera Guard v2 response"""
+    blocked_categories = []
+    scores = {}
+    for result in data.get("results", []):
+        for category, flagged in result.get("categories", {}).items():
+            name = f"LAKERA_{category.upper()}"
+            scores[name] = 1.0 if flagged else 0.0
+            if flagged:
+                blocked_categories.append(name)
+        # category_scores carry more detail than the flags
+        for category, score in result.get("category_scores", {}).items():
+            scores[f"LAKERA_{category.upper()}"] = score
+
+    is_flagged = data.get("flagged", False)
+    if is_flagged and not blocked_categories:
+        blocked_categories.append("LAKERA_FLAGGED")
+    return toxicity_result(is_flagged or len(blocked_categories) > 0, scores, blocked_categories)
+
+
+def local_verdict(score: float, is_toxic: bool) -> dict:
+    return toxicity_result(
+        is_toxic, {LOCAL_TOXIC_CATEGORY: round(score, 4)}, [LOCAL_TOXIC_CATEGORY] if is_toxic else []
+    )
+
+
+def verdict_cache_key(text: str) -> str:
+    """Fingerprint shared by texts differing only in whitespace or casing"""
+    return hashlib.sha256(normalize_prompt(text).casefold().encode("utf-8")).hexdigest()
+
+
+def error_detail(response: httpx.Response, field: str = "message") -> str:
+    try:
+        error = response.json().get("error", response.text)
+    except ValueError:
+        return response.text
+    return error.get(field, "") if isinstance(error, dict) else str(error)
+
+
+class ToxicityService:
+    """Gemini and Lakera safety classification with per-backend deadlines"""
+
+    def __init__(
+        self,
+        mode: str = TOXICITY_MODE,
+        gemini_timeout_ms: float = TOXICITY_GEMINI_TIMEOUT_MS,
+        lakera_timeout_ms: float = TOXICITY_LAKERA_TIMEOUT_MS,
+        cache: ResponseCache = None,
+        positive_ttl_s: float = TOXICITY_CACHE_POSITIVE_TTL_S,
+        negative_ttl_s: float = TOXICITY_CACHE_NEGATIVE_TTL_S,
+        local_model: LinearSafetyModel = None,
+        safe_below: float = TOXICITY_LOCAL_SAFE_BELOW,
+        toxic_above: float = TOXICITY_LOCAL_TOXIC_ABOVE,
+        audit_rate: float = TOXICITY_LOCAL_AUDIT_RATE,
+        batch_chunk_texts: int = TOXICITY_BATCH_CHUNK_TEXTS,
+        batch_chunk_chars: int = TOXICITY_BATCH_CHUNK_CHARS,
+        batch_concurrency: int = TOXICITY_BATCH_CONCURRENCY,
+        http_transport: httpx.AsyncBaseTransport = None,
+        rng=random.random
+    ):
+        if mode not in TOXICITY_MODES:
+            raise ValueError(f"Unknown toxicity mode: {mode}")
+        self.mode = mode
+        self.gemini_timeout_s = gemini_timeout_ms / 1000
+        self.lakera_timeout_s = lakera_timeout_ms / 1000
+        self.cache = cache
+        self.positive_ttl_s = positive_ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.local_model = local_model
+        self.safe_below = safe_below
+        self.toxic_above = toxic_above
+        self.audit_rate = audit_rate
+        self.batch_chunk_texts = batch_chunk_texts
+        self.batch_chunk_chars = batch_chunk_chars
+        self.batch_concurrency = batch_concurrency
+        self._rng = rng
+        self._audits = set()
+        # Deadlines are enforced per call; the pool timeout only has to outlast them
+        self.transport = ProviderTransport(
+            read_timeout=max(self.gemini_timeout_s, self.lakera_timeout_s), transport=http_transport
+        )
+
+    async def aclose(self):
+        for task in list(self._audits):
+            task.cancel()
+        await asyncio.gather(*self._audits, return_exceptions=True)
+        await self.transport.aclose()
+
+    async def gemini(self, text: str) -> dict:
+        data, error = await self._gemini_generate(CLASSIFICATION_PROMPT.format(text=text))
+        if error is not None:
+            return error
+        try:
+            return parse_gemini_verdict(data)
+        except (ValueError, AttributeError, IndexError, TypeError):
+            return toxicity_result(error="Gemini API returned an unreadable response")
+
+    async def gemini_batch(self, texts) -> dict:
+        """Verdicts by position for one chunk of texts classified in a single Gemini call;
+        positions Gemini did not answer clearly are missing"""
+        data, error = await self._gemini_generate(batch_classification_prompt(texts))
+        if error is not None:
+            return {}
+        try:
+            return parse_gemini_batch_verdicts(data, len(texts))
+        except (ValueError, AttributeError, IndexError, TypeError):
+            return {}
+
+    async def _gemini_generate(self, prompt: str):
+        """(response body, None) from Gemini, or (None, error result)"""
+        # Read API key at runtime to pick up HF Spaces secrets
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return None, toxicity_result(error="GEMINI_API_KEY not configured")
+        try:
+            response = await asyncio.wait_for(
+                self.transport.get_client("gemini").post(
+                    get_gemini_safety_url(),
+                    params={"key": api_key},
+                    json={"contents": [{"parts": [{"text": prompt}]}]},
+                ),
+                timeout=self.gemini_timeout_s
+            )
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            return None, toxicity_result(error="Gemini API timeout")
+        except httpx.HTTPError:
+            return None, toxicity_result(error="Gemini API request failed")
+        if response.status_code != 200:
+            return None, toxicity_result(
+                error=f"Gemini API error {response.status_code}: {error_detail(response)}"
+            )
+        try:
+            return response.json(), None
+        except ValueError:
+            return None, toxicity_result(error="Gemini API returned an unreadable response")
+
+    async def lakera(self, text: str) -> dict:
+        api_key = os.getenv("LAKERA_API_KEY")
+        if not api_key:
+            return toxicity_result(error="LAKERA_API_KEY not configured")
+        try:
+            response = await asyncio.wait_for(
+                self.transport.get_client("lakera").post(
+                    LAKERA_API_URL,
+                    json={"messages": [{"content": text, "role": "user"}]},
+                    headers={"Authorization": f"Bearer {api_key}"},
+                ),
+                timeout=self.lakera_timeout_s
+            )
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            return toxicity_result(error="Lakera API timeout")
+        except httpx.HTTPError:
+            return toxicity_result(error="Lakera API request failed")
+        if response.status_code != 200:
+            return toxicity_result(error=f"Lakera API error {response.status_code}: {error_detail(response)}")
+        try:
+            return parse_lakera_verdict(response.json())
+        except (ValueError, AttributeError, TypeError):
+            return toxicity_result(error="Lakera API returned an unreadable response")
+
+    async def check(self, text: str) -> dict:
+        """Verdict from the cache, the local tier when it is confident, or the first
+        remote backend that gives one; error set only when none did"""
+        key = verdict_cache_key(text)
+        verdict, score = self._answer_without_remote(text, key)
+        if verdict is not None:
+            return verdict
+        result = await self._remote(text, key)
+        self._record_band_agreement(score, result)
+        return result
+
+    async def check_many(self, texts) -> list:
+        """Verdicts for texts, in order. Duplicates (after normalization) are classified
+        once; the rest of the remote work goes out in concurrent multi-text chunks."""
+        results = [None] * len(texts)
+        answered = {}
+        pending = {}  # key -> (text, local score, positions) for texts needing a remote verdict
+        for position, text in enumerate(texts):
+            key = verdict_cache_key(text)
+            if key in answered:
+                results[position] = answered[key]
+            elif key in pending:
+                pending[key][2].append(position)
+            else:
+                verdict, score = self._answer_without_remote(text, key)
+                if verdict is not None:
+                    results[position] = answered[key] = verdict
+                else:
+                    pending[key] = (text, score, [position])
+
+        keys = list(pending)
+        limiter = asyncio.Semaphore(self.batch_concurrency)
+
+        async def classify(chunk):
+            async with limiter:
+                return await self._classify_chunk(chunk)
+
+        chunks = chunk_texts([pending[key][0] for key in keys], self.batch_chunk_texts, self.batch_chunk_chars)
+        verdicts = [result for chunk in await asyncio.gather(*map(classify, chunks)) for result in chunk]
+        for key, result in zip(keys, verdicts):
+            _, score, positions = pending[key]
+            self._store(key, result)
+            self._record_band_agreement(score, result)
+            for position in positions:
+                results[position] = result
+        return results
+
+    def _answer_without_remote(self, text: str, key: str):
+        """(verdict, None) from the cache or a confident local score, else (None, local score)"""
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached, None
+
+        score = None
+        if self.local_model is not None:
+            score = self.local_model.score(text)
+            if score <= self.safe_below or score >= self.toxic_above:
+                is_toxic = score >= self.toxic_above
+                metrics.record_toxicity_tier("local_toxic" if is_toxic else "local_safe")
+                if self.audit_rate and self._rng() < self.audit_rate:
+                    task = asyncio.create_task(self._audit(text, key, is_toxic))
+                    self._audits.add(task)
+                    task.add_done_callback(self._audits.discard)
+                return local_verdict(score, is_toxic), None
+            metrics.record_toxicity_tier("escalated")
+        return None, score
+
+    def _record_band_agreement(self, score: float, result: dict):
+        if score is not None and result["error"] is None:
+            metrics.record_toxicity_agreement((score >= 0.5) == result["is_toxic"], audit=False)
+
+    def _store(self, key: str, result: dict):
+        if self.cache is not None and result["error"] is None:
+            self.cache.set(key, result, self.positive_ttl_s if result["is_toxic"] else self.negative_ttl_s)
+
+    async def _remote(self, text: str, key: str) -> dict:
+        result = await self._classify(text)
+        self._store(key, result)
+        return result
+
+    async def _classify_chunk(self, texts) -> list:
+        """One Gemini call for the chunk; items it left unanswered are re-checked singly"""
+        if len(texts) == 1:
+            return [await self._classify(texts[0])]
+        verdicts = await self.gemini_batch(texts)
+        metrics.record_toxicity_batch(len(texts), len(texts) - len(verdicts))
+        missing = [position for position in range(len(texts)) if position not in verdicts]
+        fallback = self.lakera if os.getenv("LAKERA_API_KEY") else self.gemini
+        for position, result in zip(missing, await asyncio.gather(*(fallback(texts[p]) for p in missing))):
+            verdicts[position] = result
+        return [verdicts[position] for position in range(len(texts))]
+
+    async def _audit(self, text: str, key: str, local_is_toxic: bool):
+        """Re-check a local answer remotely to measure tier agreement"""
+        result = await self._remote(text, key)
+        if result["error"] is None:
+            metrics.record_toxicity_agreement(result["is_toxic"] == local_is_toxic, audit=True)
+
+    async def _classify(self, text: str) -> dict:
+        backends = [self.gemini]
+        if os.getenv("LAKERA_API_KEY"):
+            backends.append(self.lakera)
+        if self.mode == "race" and len(backends) > 1:
+            return await self._race(text, backends)
+
+        errors = []
+        for backend in backends:
+            result = await backend(text)
+            if result["error"] is None:
+                return result
+            errors.append(result)
+        return errors[0] if len(errors) == 1 else toxicity_result(error=SAFETY_UNAVAILABLE_ERROR)
+
+    async def _race(self, text: str, backends) -> dict:
+        pending = {asyncio.create_task(backend(text)) for backend in backends}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result["error"] is None:
+                        return result
+            return toxicity_result(error=SAFETY_UNAVAILABLE_ERROR)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+
+# Singleton instance (pools closed by the app lifespan); the local model is loaded once here
+toxicity_service = ToxicityService(
+    cache=ResponseCache(max_entries=TOXICITY_CACHE_MAX_ENTRIES) if TOXICITY_CACHE_ENABLED else None,
+    local_model=LinearSafetyModel.load(TOXICITY_LOCAL_MODEL) if TOXICITY_LOCAL_MODEL else None
+)
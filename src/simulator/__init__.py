@@ -0,0 +1,302 @@
+"""
+Local provider simulator for offline load and failover experiments.
+
+Serves the Gemini, Groq (OpenAI-compatible), OpenRouter and Lakera Guard wire
+formats on their native paths, so pointing the gateway at it only needs a host
+change:
+
+    GEMINI_BASE_URL=http://127.0.0.1:9000/v1beta
+    GROQ_BASE_URL=http://127.0.0.1:9000/openai/v1
+    OPENROUTER_BASE_URL=http://127.0.0.1:9000/api/v1
+    LAKERA_API_URL=http://127.0.0.1:9000/v2/guard
+
+Run with `python -m src.simulator`. Behaviour is set per provider or per
+provider/model through EndpointProfile, from a JSON file at startup or at
+runtime via PUT /_sim/profiles/{key}.
+"""
+
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, replace
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+OUTCOMES = ("ok", "error", "rate_limited", "hang", "malformed")
+
+
+@dataclass
+class EndpointProfile:
+    """Simulated behaviour of one provider (or provider/model)"""
+    latency_ms: float = 200.0        # median time to respond or to the first streamed chunk
+    latency_sigma: float = 0.25      # log-normal shape; 0 makes latency constant
+    error_rate: float = 0.0          # fraction answered with HTTP 500
+    rate_limit_rate: float = 0.0     # fraction answered with HTTP 429
+    burst_every_s: float = 0.0       # every N seconds...
+    burst_duration_s: float = 0.0    # ...answer everything with 429 for this long
+    hang_rate: float = 0.0           # fraction that stall for hang_s before failing
+    hang_s: float = 600.0
+    malformed_rate: float = 0.0      # fraction with a truncated or wrong-shape payload
+    output_tokens: int = 32          # words generated, capped by max_tokens
+    chunk_interval_ms: float = 15.0  # delay between streamed chunks
+    response_text: Optional[str] = None
+
+
+class ProviderSimulator:
+    """Profiles, seeded randomness and per-provider outcome counters"""
+
+    def __init__(self, profiles: dict = None, seed: int = None, clock=time.monotonic):
+        self.default = EndpointProfile()
+        self.profiles = {}
+        for key, values in (profiles or {}).items():
+            self.configure(key, values)
+        self.random = random.Random(seed)
+        self.clock = clock
+        self.reset()
+
+    @classmethod
+    def from_file(cls, path: str):
+        """Load {"seed": int, "profiles": {"groq": {...}, "groq/llama-3.1-8b-instant": {...}}}"""
+        with open(path) as f:
+            config = json.load(f)
+        return cls(profiles=config.get("profiles"), seed=config.get("seed"))
+
+    def reset(self):
+        self.started = self.clock()
+        self.stats = defaultdict(Counter)
+
+    def configure(self, key: str, values: dict) -> EndpointProfile:
+        """Create or update the profile for "provider" or "provider/model".
+        A model profile starts from its provider's profile."""
+        base = self.profiles.get(key) or self.profiles.get(key.split("/")[0]) or self.default
+        self.profiles[key] = replace(base, **values)
+        return self.profiles[key]
+
+    def profile(self, provider: str, model: str = None) -> EndpointProfile:
+        return self.profiles.get(f"{provider}/{model}") or self.profiles.get(provider) or self.default
+
+    def outcome(self, profile: EndpointProfile) -> str:
+        if profile.burst_every_s > 0:
+            if (self.clock() - self.started) % profile.burst_every_s < profile.burst_duration_s:
+                return "rate_limited"
+        roll = self.random.random()
+        for outcome, rate in (
+            ("rate_limited", profile.rate_limit_rate),
+            ("error", profile.error_rate),
+            ("hang", profile.hang_rate),
+            ("malformed", profile.malformed_rate),
+        ):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return "ok"
+
+    def latency_s(self, profile: EndpointProfile) -> float:
+        if profile.latency_ms <= 0:
+            return 0.0
+        if profile.latency_sigma <= 0:
+            return profile.latency_ms / 1000
+        return self.random.lognormvariate(math.log(profile.latency_ms), profile.latency_sigma) / 1000
+
+    @staticmethod
+    def words(profile: EndpointProfile, provider: str, model: str, max_tokens: int) -> list:
+        source = (profile.response_text or f"Simulated response from {provider} {model}.").split()
+        count = max(1, min(profile.output_tokens, max_tokens or profile.output_tokens))
+        return [source[i % len(source)] for i in range(count)]
+
+    async def respond(self, fmt, model: str, prompt: str, max_tokens: int, stream: bool = False):
+        """Produce the HTTP response for one simulated call in wire format `fmt`"""
+        profile = self.profile(fmt.provider, model)
+        outcome = self.outcome(profile)
+        stats = self.stats[fmt.provider]
+        stats["requests"] += 1
+        stats[outcome] += 1
+        if stream:
+            stats["streams"] += 1
+
+        if outcome == "hang":
+            await asyncio.sleep(profile.hang_s)
+            return JSONResponse({"error": {"message": "Simulated upstream hang", "code": 504}}, status_code=504)
+        await asyncio.sleep(self.latency_s(profile))
+        if outcome == "rate_limited":
+            return JSONResponse(
+                {"error": {"message": "Rate limit exceeded (simulated)", "code": 429}},
+                status_code=429,
+                headers={"Retry-After": "1"}
+            )
+        if outcome == "error":
+            return JSONResponse({"error": {"message": "Internal error (simulated)", "code": 500}}, status_code=500)
+
+        words = self.words(profile, fmt.provider, model, max_tokens)
+        usage = (len(prompt) // 4 + 1, len(words))
+        malformed = outcome == "malformed"
+        if stream:
+            return StreamingResponse(
+                self._stream(fmt, model, words, usage, profile, malformed),
+                media_type="text/event-stream"
+            )
+        if malformed:
+            body = self.random.choice(['{"candidates": [{"content": ', '{"unexpected": true}'])
+            return Response(content=body, media_type="application/json")
+        return JSONResponse(fmt.full(model, " ".join(words), usage))
+
+    async def _stream(self, fmt, model, words, usage, profile, malformed):
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(profile.chunk_interval_ms / 1000)
+            if malformed and i == len(words) // 2:
+                yield "data: {\"choices\": [\n\n"
+                return
+            text = word if i == 0 else " " + word
+            yield "data: %s\n\n" % json.dumps(fmt.chunk(model, text, usage if i == len(words) - 1 else None))
+        if fmt.done_marker:
+            yield "data: [DONE]\n\n"
+
+
+class GeminiFormat:
+    provider = "gemini"
+    done_marker = False
+
+    @staticmethod
+    def usage(usage):
+        return {"promptTokenCount": usage[0], "candidatesTokenCount": usage[1], "totalTokenCount": sum(usage)}
+
+    @classmethod
+    def full(cls, model, text, usage):
+        return {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}],
+            "usageMetadata": cls.usage(usage),
+            "modelVersion": model
+        }
+
+    @classmethod
+    def chunk(cls, model, text, usage):
+        data = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+        if usage:
+            data["usageMetadata"] = cls.usage(usage)
+        return data
+
+
+class ChatFormat:
+    """OpenAI chat-completions format used by Groq and OpenRouter"""
+    done_marker = True
+
+    def __init__(self, provider: str):
+        self.provider = provider
+
+    @staticmethod
+    def usage(usage):
+        return {"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": sum(usage)}
+
+    def full(self, model, text, usage):
+        return {
+            "id": "chatcmpl-sim",
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": self.usage(usage)
+        }
+
+    def chunk(self, model, text, usage):
+        data = {
+            "id": "chatcmpl-sim",
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": text}}]
+        }
+        if usage:
+            data["usage"] = self.usage(usage)
+        return data
+
+
+class LakeraFormat:
+    provider = "lakera"
+    done_marker = False
+
+    @staticmethod
+    def full(model, text, usage):
+        return {"flagged": False, "results": [{"categories": {"prompt_injection": False, "jailbreak": False}}]}
+
+
+async def read_json(request: Request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+    return body
+
+
+def create_app(simulator: ProviderSimulator = None) -> FastAPI:
+    """Build the simulator ASGI app (also usable in-process via httpx.ASGITransport)"""
+    sim = simulator or ProviderSimulator()
+    app = FastAPI(title="LLM Provider Simulator", docs_url=None, redoc_url=None)
+    app.state.simulator = sim
+    gemini = GeminiFormat()
+    chat_formats = {"groq": ChatFormat("groq"), "openrouter": ChatFormat("openrouter")}
+
+    async def gemini_call(model: str, request: Request, stream: bool):
+        body = await read_json(request)
+        prompt = "".join(
+            part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])
+        )
+        max_tokens = body.get("generationConfig", {}).get("maxOutputTokens")
+        return await sim.respond(gemini, model, prompt, max_tokens, stream=stream)
+
+    async def chat_call(provider: str, request: Request):
+        body = await read_json(request)
+        prompt = "".join(str(message.get("content", "")) for message in body.get("messages", []))
+        return await sim.respond(
+            chat_formats[provider], body.get("model", "unknown"), prompt, body.get("max_tokens"),
+            stream=bool(body.get("stream"))
+        )
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def gemini_generate(model: str, request: Request):
+        return await gemini_call(model, request, stream=False)
+
+    @app.post("/v1beta/models/{model}:streamGenerateContent")
+    async def gemini_stream(model: str, request: Request):
+        return await gemini_call(model, request, stream=True)
+
+    @app.post("/openai/v1/chat/completions")
+    async def groq_chat(request: Request):
+        return await chat_call("groq", request)
+
+    @app.post("/api/v1/chat/completions")
+    async def openrouter_chat(request: Request):
+        return await chat_call("openrouter", request)
+
+    @app.post("/v2/guard")
+    async def lakera_guard(request: Request):
+        body = await read_json(request)
+        text = "".join(str(message.get("content", "")) for message in body.get("messages", []))
+        return await sim.respond(LakeraFormat(), "guard", text, 1)
+
+    @app.get("/_sim/profiles")
+    async def get_profiles():
+        return {"default": asdict(sim.default), **{key: asdict(p) for key, p in sim.profiles.items()}}
+
+    @app.put("/_sim/profiles/{key:path}")
+    async def put_profile(key: str, request: Request):
+        try:
+            return asdict(sim.configure(key, await read_json(request)))
+        except TypeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.get("/_sim/stats")
+    async def get_stats():
+        return {provider: dict(counts) for provider, counts in sim.stats.items()}
+
+    @app.post("/_sim/reset")
+    async def reset():
+        sim.reset()
+        return {"status": "reset"}
+
+    return app
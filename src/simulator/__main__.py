@@ -0,0 +1,29 @@
+"""
+Run the provider simulator: python -m src.simulator [--port 9000] [--config profiles.json]
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+from . import ProviderSimulator, create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini/Groq/OpenRouter/Lakera simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--config", default=os.getenv("SIMULATOR_CONFIG"),
+                        help="JSON file with {\"seed\": ..., \"profiles\": {...}}")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    simulator = ProviderSimulator.from_file(args.config) if args.config else ProviderSimulator()
+    if args.seed is not None:
+        simulator.random.seed(args.seed)
+    uvicorn.run(create_app(simulator), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Unit tests for the gateway response caches
+"""
+
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted first"""
+        from src.cache import ResponseCache
+        cache = ResponseCache(max_entries=2, ttl_s=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.to_dict()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        """Entries expire after their TTL"""
+        from src.cache import ResponseCache
+        now = [0.0]
+        cache = ResponseCache(max_entries=10, ttl_s=5, clock=lambda: now[0])
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        now[0] = 6.0
+        self.assertIsNone(cache.get("a"))
+        stats = cache.to_dict()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (1, 1, 1))
+
+    def test_key_normalizes_whitespace_only(self):
+        """Whitespace differences share a key; parameters and model do not"""
+        from src.cache import make_cache_key
+        base = make_cache_key("What is  AI?", 256, 0.0, "gemini", "m1")
+        self.assertEqual(base, make_cache_key(" What is AI? ", 256, 0.0, "gemini", "m1"))
+        self.assertNotEqual(base, make_cache_key("What is AI?", 128, 0.0, "gemini", "m1"))
+        self.assertNotEqual(base, make_cache_key("What is AI?", 256, 0.0, "groq", "m2"))
+
+
+class TestSemanticCache(unittest.TestCase):
+
+    def test_paraphrase_hits_and_unrelated_misses(self):
+        """Near-duplicate prompts match; unrelated prompts do not"""
+        from src.cache.semantic import SemanticCache
+        cache = SemanticCache(capacity=16, dim=64, threshold=0.9)
+        partition = cache.partition_key(256, 0.7, "gemini", "m1")
+        cache.add("How does machine learning work?", partition, "ml answer")
+
+        value, similarity = cache.lookup("how does machine learning work", partition)
+        self.assertEqual(value, "ml answer")
+        self.assertGreaterEqual(similarity, 0.9)
+
+        value, _ = cache.lookup("Write a poem about cats", partition)
+        self.assertIsNone(value)
+
+    def test_partitions_are_isolated(self):
+        """Entries only match requests with the same parameters and model"""
+        from src.cache.semantic import SemanticCache
+        cache = SemanticCache(capacity=16, dim=64, threshold=0.9)
+        cache.add("Explain photosynthesis", cache.partition_key(256, 0.7, "gemini", "m1"), "a")
+        value, _ = cache.lookup("Explain photosynthesis", cache.partition_key(128, 0.7, "gemini", "m1"))
+        self.assertIsNone(value)
+
+    def test_capacity_evicts_least_recently_used(self):
+        """A full cache overwrites its least recently used slot"""
+        from src.cache.semantic import SemanticCache
+        now = [0.0]
+        cache = SemanticCache(capacity=2, dim=64, threshold=0.9, ttl_s=60, clock=lambda: now[0])
+        cache.add("first prompt about databases", 1, "first")
+        now[0] = 1.0
+        cache.add("second prompt about networking", 1, "second")
+        now[0] = 2.0
+        cache.lookup("first prompt about databases", 1)
+        now[0] = 3.0
+        cache.add("third prompt about compilers", 1, "third")
+
+        self.assertEqual(cache.lookup("first prompt about databases", 1)[0], "first")
+        self.assertIsNone(cache.lookup("second prompt about networking", 1)[0])
+        self.assertEqual(cache.to_dict()["evictions"], 1)
+
+    def test_expired_best_match_does_not_hide_a_live_one(self):
+        """Expired rows are skipped before the best match is taken"""
+        from src.cache.semantic import SemanticCache
+        now = [0.0]
+        cache = SemanticCache(capacity=16, dim=64, threshold=0.9, ttl_s=10, clock=lambda: now[0])
+        cache.add("Explain photosynthesis", 1, "expired")
+        now[0] = 8.0
+        cache.add("Explain photosynthesis to me", 1, "live")
+        now[0] = 12.0
+
+        value, similarity = cache.lookup("Explain photosynthesis", 1)
+        self.assertEqual(value, "live")
+        self.assertLess(similarity, 1.0)
+
+    def test_lookup_scans_only_its_partition(self):
+        """A closer entry in another partition never shadows a match in ours"""
+        from src.cache.semantic import SemanticCache
+        cache = SemanticCache(capacity=16, dim=64, threshold=0.9)
+        cache.add("Explain photosynthesis", 2, "other partition")
+        cache.add("Explain photosynthesis to me", 1, "ours")
+
+        self.assertEqual(cache.lookup("Explain photosynthesis", 1)[0], "ours")
+        self.assertEqual(cache.to_dict()["partitions"], 2)
+
+    def test_sketch_bound_matches_a_full_scan(self):
+        """Pruning rows by their sketch bound never changes the best match"""
+        import random
+        import numpy as np
+        from src.cache.semantic import SemanticCache
+        rng = random.Random(3)
+        words = "explain compare the cache latency network model error policy budget story".split()
+
+        def prompt():
+            return " ".join(rng.choice(words) for _ in range(rng.randint(2, 6)))
+
+        stored = [prompt() for _ in range(300)]
+        cache = SemanticCache(capacity=300, dim=32, threshold=0.6)
+        for index, text in enumerate(stored):
+            cache.add(text, 1, index)
+        matrix = np.stack([cache.embedder.embed(text) for text in stored])
+
+        for text in [prompt() for _ in range(50)]:
+            scores = matrix @ cache.embedder.embed(text)
+            value, similarity = cache.lookup(text, 1)
+            if scores.max() >= 0.6:
+                self.assertAlmostEqual(similarity, float(scores.max()), places=5)
+                self.assertAlmostEqual(float(scores[value]), float(scores.max()), places=5)
+            else:
+                self.assertIsNone(value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,672 @@
+"""
+Unit tests for the LLM client cascade
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+import httpx
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+TEST_ENV = {
+    "GEMINI_API_KEY": "test-gemini",
+    "GROQ_API_KEY": "test-groq",
+    "OPENROUTER_API_KEY": "test-openrouter",
+}
+
+
+def gemini_body(text):
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+def chat_body(text):
+    return {"choices": [{"message": {"content": text}}]}
+
+
+def make_client(handler):
+    """Build an LLMClient whose provider calls are served by handler"""
+    from src.llm.client import LLMClient
+    with patch.dict(os.environ, TEST_ENV):
+        return LLMClient(http_transport=httpx.MockTransport(handler))
+
+
+class TestProviderAdapters(unittest.TestCase):
+
+    def test_prebuilt_bodies_are_valid_json(self):
+        """Templated payloads match each provider's wire format"""
+        import json
+        from src.llm.adapters import create_adapter
+
+        url, headers, body = create_adapter("groq", "key", "llama").build_request('Say "hi"\n', 64, 0.5)
+        self.assertEqual(json.loads(body), {
+            "model": "llama",
+            "messages": [{"role": "user", "content": 'Say "hi"\n'}],
+            "max_tokens": 64,
+            "temperature": 0.5,
+        })
+        self.assertEqual(headers["Authorization"], "Bearer key")
+
+        url, _, body = create_adapter("gemini", "key", "flash").build_request("Hi", 64, 0, stream=True)
+        self.assertIn("flash:streamGenerateContent?alt=sse&key=key", url)
+        self.assertEqual(json.loads(body)["generationConfig"], {"maxOutputTokens": 64, "temperature": 0.0})
+
+    def test_registered_adapter_is_used(self):
+        """Adding a provider only requires registering an adapter"""
+        from src.llm.adapters import ADAPTERS, OpenAICompatibleAdapter, register_adapter
+
+        @register_adapter("local-test")
+        class LocalAdapter(OpenAICompatibleAdapter):
+            label = "Local"
+            base_url = "http://local.test/v1/chat/completions"
+
+        self.addCleanup(ADAPTERS.pop, "local-test")
+        client = make_client(lambda request: httpx.Response(200, json=chat_body("local ok")))
+
+        async def call():
+            try:
+                return await client.call_llm_provider("local-test", "k", "m", "Hi", 8, 0.0)
+            finally:
+                await client.aclose()
+
+        self.assertEqual(asyncio.run(call()), ("local ok", None))
+
+    def test_incomplete_adapter_cannot_be_instantiated(self):
+        """A subclass missing a parse method fails at construction, not mid-request"""
+        from src.llm.adapters import ProviderAdapter
+
+        class PartialAdapter(ProviderAdapter):
+            def build_request(self, prompt, max_tokens, temperature, stream=False):
+                return self.url, self.headers, b""
+
+        with self.assertRaises(TypeError):
+            PartialAdapter("key", "model")
+
+
+class TestLLMClientTransport(unittest.IsolatedAsyncioTestCase):
+
+    async def test_cascade_falls_back_to_next_provider(self):
+        """A failing primary hands over to the next provider"""
+        def handler(request):
+            if "googleapis" in request.url.host:
+                return httpx.Response(503)
+            return httpx.Response(200, json=chat_body("hello from groq"))
+
+        client = make_client(handler)
+        try:
+            response, provider, latency, error, path = await client.query_llm_cascade("Hi", 32, 0.0)
+        finally:
+            await client.aclose()
+
+        self.assertEqual(response, "hello from groq")
+        self.assertEqual(provider, "groq")
+        self.assertIsNone(error)
+        self.assertEqual([step["status"] for step in path], ["failed", "success"])
+
+    async def test_timeout_is_reported_as_error(self):
+        """Transport timeouts surface as provider errors, not exceptions"""
+        def handler(request):
+            raise httpx.ReadTimeout("slow", request=request)
+
+        client = make_client(handler)
+        try:
+            response, error = await client.call_llm_provider("groq", "k", "m", "Hi", 32, 0.0)
+        finally:
+            await client.aclose()
+
+        self.assertIsNone(response)
+        self.assertIn("timed out", error)
+
+    async def test_provider_pools_are_reused(self):
+        """Each provider keeps one shared client until shutdown"""
+        client = make_client(lambda request: httpx.Response(200, json=gemini_body("ok")))
+        first = client.transport.get_client("gemini")
+        self.assertIs(first, client.transport.get_client("gemini"))
+        self.assertIsNot(first, client.transport.get_client("groq"))
+        await client.aclose()
+        self.assertTrue(first.is_closed)
+
+
+class TestContextWindowRouting(unittest.IsolatedAsyncioTestCase):
+
+    def test_token_estimates_by_family(self):
+        from src.llm.tokens import model_family, estimate_tokens
+        self.assertEqual(model_family("google/gemini-2.0-flash-exp:free"), "gemini")
+        self.assertEqual(model_family("llama3-70b"), "llama")
+        self.assertEqual(model_family("unknown-model"), "default")
+        short, long = estimate_tokens("Hi there", "gpt"), estimate_tokens("Hi there " * 100, "gpt")
+        self.assertLess(short, 10)
+        self.assertAlmostEqual(long, 200, delta=20)
+
+    async def test_small_context_provider_is_skipped_and_usage_reported(self):
+        """Providers that cannot fit prompt + max_tokens are never called"""
+        hosts = []
+
+        def handler(request):
+            hosts.append(request.url.host)
+            if "googleapis" in request.url.host:
+                return httpx.Response(500)
+            body = chat_body("ok")
+            body["usage"] = {"prompt_tokens": 4000, "completion_tokens": 12}
+            return httpx.Response(200, json=body)
+
+        with patch.dict(os.environ, {"GROQ_MODEL": "llama3-70b"}):  # 8192-token window
+            client = make_client(handler)
+        try:
+            response, provider, _, error, path = await client.query_llm_cascade(
+                "word " * 4000, 6000, 0.0, coalesce=False
+            )
+        finally:
+            await client.aclose()
+
+        self.assertEqual(provider, "openrouter")
+        self.assertNotIn("api.groq.com", hosts)
+        self.assertEqual([(s["provider"], s["status"]) for s in path],
+                         [("groq", "skipped"), ("gemini", "failed"), ("openrouter", "success")])
+        self.assertIn("Context window exceeded", path[0]["reason"])
+        self.assertEqual(path[-1]["usage"], {"input_tokens": 4000, "output_tokens": 12})
+
+    async def test_request_too_large_for_every_provider(self):
+        from src.llm.client import CONTEXT_WINDOW_ERROR
+        client = make_client(lambda request: httpx.Response(200, json=chat_body("unused")))
+        try:
+            response, provider, _, error, path = await client.query_llm_cascade(
+                "word " * 10, 10_000_000, 0.0, coalesce=False
+            )
+        finally:
+            await client.aclose()
+        self.assertEqual(error, CONTEXT_WINDOW_ERROR)
+        self.assertEqual({step["status"] for step in path}, {"skipped"})
+
+
+class TestPolicyRouting(unittest.IsolatedAsyncioTestCase):
+
+    def engine(self):
+        from src.llm.policy import RoutingPolicyEngine
+        return RoutingPolicyEngine.from_catalog({"gemini": "g", "groq": "q", "openrouter": "o"})
+
+    def test_latency_target_then_fallbacks(self):
+        chain = self.engine().select(100, 100, max_latency_ms=100, prefer="cost")
+        models = [c.model for c in chain]
+        # Models meeting 100 ms, cheapest first; then the rest, fastest first
+        self.assertEqual(models[:3], ["mixtral-8x7b", "llama-3.3-70b-versatile", "llama3-70b"])
+        self.assertEqual(models[3], "gemini-2.0-flash-exp")
+        self.assertEqual(len(chain), 10)
+
+        fastest = self.engine().select(100, 100, max_latency_ms=100, prefer="latency")
+        self.assertEqual(fastest[0].model, "llama-3.3-70b-versatile")
+
+    def test_cost_ceiling_is_hard(self):
+        engine = self.engine()
+        chain = engine.select(1000, 1000, max_cost_usd=0.002)
+        self.assertTrue(chain)
+        self.assertTrue(all(c.cost_usd(1000, 1000) <= 0.002 for c in chain))
+        self.assertNotIn("gpt-4", [c.model for c in chain])
+        self.assertNotIn("claude-3-opus", [c.model for c in chain])
+
+        free = engine.select(1000, 1000, max_cost_usd=0.0)
+        self.assertEqual([c.model for c in free], ["google/gemini-2.0-flash-exp:free"])
+
+    def test_cost_ceiling_prices_each_tokenizer_family(self):
+        from src.llm.tokens import estimate_family_tokens, estimate_tokens
+        engine = self.engine()
+        self.assertIn("claude", engine.families)
+        tokens = dict.fromkeys(engine.families, 1000)
+        self.assertEqual(engine.select(tokens, 1000, max_cost_usd=0.002), engine.select(1000, 1000, max_cost_usd=0.002))
+
+        tokens["llama"] = 100_000
+        chain = engine.select(tokens, 1000, max_cost_usd=0.002)
+        self.assertTrue(chain)
+        self.assertNotIn("llama", {c.family for c in chain})
+
+        prompt = "Internationalization considerations " * 20
+        self.assertEqual(estimate_family_tokens(prompt, ("gpt", "claude")),
+                         {"gpt": estimate_tokens(prompt, "gpt"), "claude": estimate_tokens(prompt, "claude")})
+        self.assertGreater(estimate_tokens(prompt, "claude"), estimate_tokens(prompt, "gpt"))
+
+    def test_policy_ranks_by_live_latency(self):
+        """A catalog-fast model that has been slow in practice drops out of the latency target"""
+        client = make_client(lambda request: httpx.Response(200, json=chat_body("unused")))
+        slow = {"name": "groq", "model": "llama-3.3-70b-versatile"}
+        for _ in range(30):
+            client.stats(slow).record_success(400)
+
+        from src.llm.policy import RoutingPolicy
+        chain = client.route_providers("Hi", 64, policy=RoutingPolicy(max_latency_ms=100, prefer="latency"))
+        models = [p["model"] for p in chain]
+        self.assertEqual(models[:2], ["llama3-70b", "mixtral-8x7b"])
+        self.assertGreater(models.index("llama-3.3-70b-versatile"), models.index("gemini-2.0-flash-exp"))
+
+    def test_policy_models_are_reported(self):
+        """Breaker, bulkhead and live stats cover catalog models the policy can route to"""
+        client = make_client(lambda request: httpx.Response(200, json=chat_body("unused")))
+        for states in (client.breaker_states(), client.bulkhead_states(), client.provider_stats()):
+            self.assertIn("claude-3-opus", states["openrouter"])
+            self.assertIn(client.providers[0]["model"], states["gemini"])
+
+    async def test_cascade_uses_policy_chain(self):
+        import json
+        from src.llm.client import POLICY_UNSATISFIABLE_ERROR
+        from src.llm.policy import RoutingPolicy
+
+        models = []
+
+        def handler(request):
+            models.append(json.loads(request.content).get("model"))
+            return httpx.Response(200, json=chat_body("ok"))
+
+        client = make_client(handler)
+        try:
+            _, provider, _, error, path = await client.query_llm_cascade(
+                "Hi", 64, 0.0, coalesce=False, policy=RoutingPolicy(max_latency_ms=100)
+            )
+            self.assertEqual((provider, path[-1]["model"]), ("groq", "mixtral-8x7b"))
+            self.assertEqual(models, ["mixtral-8x7b"])
+
+            client.policy = type(client.policy)([])  # empty catalog
+            result = await client.query_llm_cascade("Hi", 64, 0.0, policy=RoutingPolicy(max_cost_usd=1.0))
+            self.assertEqual(result[3], POLICY_UNSATISFIABLE_ERROR)
+        finally:
+            await client.aclose()
+
+
+class TestRequestDeadline(unittest.IsolatedAsyncioTestCase):
+
+    async def test_hung_provider_only_spends_its_share(self):
+        """A hung primary times out at its share of the budget and the fallback answers"""
+        async def handler(request):
+            if "googleapis" in request.url.host:
+                await asyncio.sleep(5)
+            return httpx.Response(200, json=chat_body("fallback"))
+
+        client = make_client(handler)
+        try:
+            response, provider, _, error, path = await client.query_llm_cascade(
+                "Hi", 32, 0.0, timeout_ms=1500, coalesce=False
+            )
+        finally:
+            await client.aclose()
+
+        self.assertEqual((response, provider, error), ("fallback", "groq", None))
+        self.assertEqual([s["status"] for s in path], ["timeout", "success"])
+        self.assertLess(path[0]["latency_ms"], 700)  # a third of the budget, not all of it
+        # Overrunning its own share counts against the provider, so its breaker can trip
+        self.assertEqual(client.breaker(client.providers[0]).to_dict()["recent_failures"], 1)
+        self.assertEqual(client.stats(client.providers[0]).failures, 1)
+
+    async def test_deadline_cuts_slow_provider_and_skips_rest(self):
+        """An exhausted budget fails fast instead of walking the cascade"""
+        async def handler(request):
+            await asyncio.sleep(5)
+            return httpx.Response(200, json=gemini_body("late"))
+
+        client = make_client(handler)
+        try:
+            response, _, _, error, path = await client.query_llm_cascade("Hi", 32, 0.0, timeout_ms=300)
+        finally:
+            await client.aclose()
+
+        from src.llm.client import DEADLINE_EXCEEDED_ERROR
+        self.assertIsNone(response)
+        self.assertEqual(error, DEADLINE_EXCEEDED_ERROR)
+        self.assertEqual([s["status"] for s in path], ["timeout", "skipped", "skipped"])
+
+    async def test_running_out_of_budget_is_not_held_against_the_provider(self):
+        """The last provider gets the whole remainder; the request budget ending is not its failure"""
+        async def handler(request):
+            await asyncio.sleep(5)
+            return httpx.Response(200, json=gemini_body("late"))
+
+        client = make_client(handler)
+        client.providers = client.providers[:1]
+        try:
+            _, _, _, error, path = await client.query_llm_cascade("Hi", 32, 0.0, timeout_ms=300)
+        finally:
+            await client.aclose()
+
+        from src.llm.client import DEADLINE_EXCEEDED_ERROR
+        self.assertEqual(error, DEADLINE_EXCEEDED_ERROR)
+        self.assertEqual([s["status"] for s in path], ["timeout"])
+        self.assertEqual(client.breaker(client.providers[0]).to_dict()["recent_failures"], 0)
+
+
+class TestRequestCoalescing(unittest.IsolatedAsyncioTestCase):
+
+    async def test_identical_requests_share_one_call(self):
+        """Concurrent identical prompts trigger a single provider call"""
+        calls = []
+
+        async def handler(request):
+            calls.append(request.url.host)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=gemini_body("shared"))
+
+        client = make_client(handler)
+        try:
+            results = await asyncio.gather(*[
+                client.query_llm_cascade("Same prompt", 32, 0.0, coalesce=True) for _ in range(5)
+            ])
+            different = await client.query_llm_cascade("Other prompt", 32, 0.0, coalesce=True)
+        finally:
+            await client.aclose()
+
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all(r[0] == "shared" for r in results))
+        self.assertEqual(different[0], "shared")
+        self.assertEqual(client._inflight, {})
+
+    async def test_request_does_not_join_a_call_with_a_shorter_deadline(self):
+        """A joiner would inherit the leader's deadline, so a longer budget starts its own call"""
+        calls = []
+
+        async def handler(request):
+            calls.append(request.url.host)
+            await asyncio.sleep(0.4)
+            return httpx.Response(200, json=gemini_body("answer"))
+
+        client = make_client(handler)
+        client.providers = client.providers[:1]
+        try:
+            short, long, shorter = await asyncio.gather(
+                client.query_llm_cascade("Same prompt", 32, 0.0, coalesce=True, timeout_ms=300),
+                client.query_llm_cascade("Same prompt", 32, 0.0, coalesce=True, timeout_ms=5000),
+                client.query_llm_cascade("Same prompt", 32, 0.0, coalesce=True, timeout_ms=1000),
+            )
+        finally:
+            await client.aclose()
+
+        from src.llm.client import DEADLINE_EXCEEDED_ERROR
+        self.assertEqual(short[3], DEADLINE_EXCEEDED_ERROR)
+        self.assertEqual((long[0], shorter[0]), ("answer", "answer"))
+        self.assertEqual(len(calls), 2)  # the 1000 ms request joined the 5000 ms call
+
+
+class TestProviderBulkheads(unittest.IsolatedAsyncioTestCase):
+
+    async def test_saturated_provider_overflows_then_rejects(self):
+        """Full providers overflow to the next; when all are full the cascade reports capacity"""
+        from src.llm.bulkhead import Bulkhead
+        from src.llm.client import PROVIDERS_SATURATED_ERROR
+
+        async def handler(request):
+            await asyncio.sleep(0.1)
+            if "googleapis" in request.url.host:
+                return httpx.Response(200, json=gemini_body("gemini"))
+            return httpx.Response(200, json=chat_body("other"))
+
+        client = make_client(handler)
+        client.providers = client.providers[:2]
+        for provider in client.providers:
+            client._bulkheads[(provider["name"], provider["model"])] = Bulkhead(1, 0, 50)
+
+        try:
+            results = await asyncio.gather(*[
+                client.query_llm_cascade(f"prompt {i}", 32, 0.0, coalesce=False) for i in range(3)
+            ])
+        finally:
+            await client.aclose()
+
+        providers = sorted(r[1] for r in results if r[0])
+        self.assertEqual(providers, ["gemini", "groq"])
+        rejected = next(r for r in results if r[0] is None)
+        self.assertEqual(rejected[3], PROVIDERS_SATURATED_ERROR)
+        self.assertEqual([s["status"] for s in rejected[4]], ["saturated", "saturated"])
+        self.assertEqual(client.bulkhead_states()["gemini"][client.providers[0]["model"]]["rejected"], 2)
+
+    async def test_wait_cut_by_the_deadline_reports_deadline(self):
+        """A queue wait that runs into the request deadline is a timeout, not saturation"""
+        from src.llm.bulkhead import Bulkhead
+        from src.llm.client import DEADLINE_EXCEEDED_ERROR
+
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, json=gemini_body("slow"))
+
+        client = make_client(handler)
+        client.providers = client.providers[:1]
+        client._bulkheads[(client.providers[0]["name"], client.providers[0]["model"])] = Bulkhead(1, 4, 5000)
+
+        async def stream():
+            return [event async for event in client.stream_llm_cascade("Streamed", 32, 0.0, timeout_ms=400)]
+
+        try:
+            holder = asyncio.ensure_future(client.query_llm_cascade("Busy", 32, 0.0, coalesce=False))
+            await asyncio.sleep(0.05)
+            queued, events = await asyncio.gather(
+                client.query_llm_cascade("Queued", 32, 0.0, coalesce=False, timeout_ms=400), stream()
+            )
+            await holder
+        finally:
+            await client.aclose()
+
+        self.assertEqual(queued[3], DEADLINE_EXCEEDED_ERROR)
+        self.assertEqual([s["status"] for s in queued[4]], ["timeout"])
+        self.assertEqual(events[-1]["error"], DEADLINE_EXCEEDED_ERROR)
+        self.assertEqual([s["status"] for s in events[-1]["cascade_path"]], ["timeout"])
+
+
+    async def test_abandoned_wait_never_keeps_a_slot(self):
+        """A slot granted just as the waiter times out or is cancelled goes back to the bulkhead"""
+        from src.llm.bulkhead import Bulkhead
+        bulkhead = Bulkhead(1, 4, 5000)
+        self.assertTrue(await bulkhead.acquire())
+
+        waiter = asyncio.create_task(bulkhead.acquire())
+        await asyncio.sleep(0)
+        bulkhead.release()
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+
+        self.assertTrue(await bulkhead.acquire(timeout_s=0.01))
+        self.assertFalse(await bulkhead.acquire(timeout_s=0.01))
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.01, bulkhead.release)
+        await bulkhead.acquire(timeout_s=0.01)
+        await asyncio.sleep(0.02)
+        self.assertEqual(bulkhead._semaphore._value + bulkhead.in_flight, 1)
+
+
+class TestHedgedCascade(unittest.IsolatedAsyncioTestCase):
+
+    @patch("src.llm.client.LLM_HEDGE_DELAY_MS", 20)
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        """A hanging primary is raced by the next provider and cancelled"""
+        async def handler(request):
+            if "googleapis" in request.url.host:
+                await asyncio.sleep(5)
+            return httpx.Response(200, json=chat_body("fast answer"))
+
+        client = make_client(handler)
+        try:
+            response, provider, _, error, path = await client.query_llm_cascade("Hi", 32, 0.0, hedge=True)
+        finally:
+            await client.aclose()
+
+        self.assertEqual(response, "fast answer")
+        self.assertEqual(provider, "groq")
+        statuses = {step["provider"]: step["status"] for step in path}
+        self.assertEqual(statuses, {"groq": "won", "gemini": "cancelled"})
+        self.assertTrue(next(s for s in path if s["provider"] == "groq")["hedged"])
+
+    @patch("src.llm.client.LLM_HEDGE_DELAY_MS", 1000)
+    async def test_fast_primary_does_not_hedge(self):
+        """No speculative call is made when the primary answers in time"""
+        calls = []
+
+        def handler(request):
+            calls.append(request.url.host)
+            return httpx.Response(200, json=gemini_body("primary"))
+
+        client = make_client(handler)
+        try:
+            response, provider, _, _, path = await client.query_llm_cascade("Hi", 32, 0.0, hedge=True)
+        finally:
+            await client.aclose()
+
+        self.assertEqual(provider, "gemini")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(path[0]["status"], "success")
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_then_probes_then_closes(self):
+        """Breaker opens on repeated failures and recovers through a probe"""
+        from src.llm.circuit import CircuitBreaker
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, window_s=10, cooldown_s=5,
+                                 half_open_probes=1, clock=lambda: now[0])
+
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow_request())
+
+        now[0] = 6.0
+        self.assertTrue(breaker.allow_request())   # probe admitted
+        self.assertFalse(breaker.allow_request())  # only one probe at a time
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_failed_probe_reopens(self):
+        """A failed half-open probe re-opens the circuit"""
+        from src.llm.circuit import CircuitBreaker
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, window_s=10, cooldown_s=5, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 6.0
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertEqual(breaker.times_opened, 2)
+
+
+class TestCascadeCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+
+    async def test_open_provider_is_skipped(self):
+        """Providers with an open circuit are skipped without a network call"""
+        hosts = []
+
+        def handler(request):
+            hosts.append(request.url.host)
+            return httpx.Response(200, json=chat_body("ok"))
+
+        client = make_client(handler)
+        gemini = client.providers[0]
+        for _ in range(client.breaker(gemini).failure_threshold):
+            client.breaker(gemini).record_failure()
+        try:
+            _, provider, _, _, path = await client.query_llm_cascade("Hi", 32, 0.0)
+        finally:
+            await client.aclose()
+
+        self.assertEqual(provider, "groq")
+        self.assertEqual(path[0]["status"], "circuit_open")
+        self.assertNotIn("generativelanguage.googleapis.com", hosts)
+        self.assertEqual(client.breaker_states()["gemini"][gemini["model"]]["state"], "open")
+
+
+class TestAdaptiveRouting(unittest.TestCase):
+
+    def test_strategies_reorder_providers(self):
+        """fastest follows live latency, cheapest follows catalog price"""
+        client = make_client(lambda request: httpx.Response(200))
+        gemini, groq, openrouter = client.providers
+
+        self.assertEqual(client.order_providers("static"), [gemini, groq, openrouter])
+
+        for _ in range(30):
+            client.stats(gemini).record_success(2000)
+            client.stats(groq).record_success(50)
+        self.assertIs(client.order_providers("fastest")[0], groq)
+
+        # OpenRouter's default model is free in PROVIDER_CONFIG
+        self.assertIs(client.order_providers("cheapest")[0], openrouter)
+
+    def test_error_rate_demotes_provider(self):
+        """A fast but failing provider ranks behind a reliable one"""
+        client = make_client(lambda request: httpx.Response(200))
+        gemini, groq, _ = client.providers
+        client.stats(gemini).record_success(50)
+        client.stats(groq).record_success(200)
+        for _ in range(20):
+            client.stats(gemini).record_failure()
+        self.assertIs(client.order_providers("fastest")[0], groq)
+
+    def test_unknown_strategy_rejected(self):
+        client = make_client(lambda request: httpx.Response(200))
+        with self.assertRaises(ValueError):
+            client.order_providers("random")
+
+
+class TestStreamingCascade(unittest.IsolatedAsyncioTestCase):
+
+    async def collect(self, client):
+        events = []
+        try:
+            async for event in client.stream_llm_cascade("Hi", 32, 0.0):
+                events.append(event)
+        finally:
+            await client.aclose()
+        return events
+
+    async def test_fails_over_before_first_token(self):
+        """A provider that errors before streaming is replaced by the next one"""
+        def handler(request):
+            if "googleapis" in request.url.host:
+                return httpx.Response(500)
+            body = (
+                'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+                'data: {"choices": [{"delta": {"content": "lo"}}]}\n\n'
+                'data: [DONE]\n\n'
+            )
+            return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+        events = await self.collect(make_client(handler))
+
+        text = "".join(e["text"] for e in events if e["type"] == "token")
+        self.assertEqual(text, "Hello")
+        done = events[-1]
+        self.assertEqual(done["type"], "done")
+        self.assertEqual(done["provider"], "groq")
+        self.assertIsNotNone(done["ttft_ms"])
+        self.assertEqual([s["status"] for s in done["cascade_path"]], ["failed", "success"])
+
+    async def test_hung_provider_fails_over_at_its_share(self):
+        """A provider that sends nothing within its share of the budget is replaced"""
+        async def handler(request):
+            if "googleapis" in request.url.host:
+                await asyncio.sleep(5)
+            body = 'data: {"choices": [{"delta": {"content": "ok"}}]}\n\ndata: [DONE]\n\n'
+            return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+        client = make_client(handler)
+        try:
+            events = [event async for event in client.stream_llm_cascade("Hi", 32, 0.0, timeout_ms=1500)]
+        finally:
+            await client.aclose()
+
+        self.assertEqual(events[-1]["provider"], "groq")
+        self.assertEqual([s["status"] for s in events[-1]["cascade_path"]], ["timeout", "success"])
+        self.assertEqual(client.breaker(client.providers[0]).to_dict()["recent_failures"], 1)
+
+    async def test_gemini_stream_format(self):
+        """Gemini streamGenerateContent chunks are parsed from SSE"""
+        def handler(request):
+            self.assertIn(":streamGenerateContent", request.url.path)
+            body = 'data: {"candidates": [{"content": {"parts": [{"text": "Hi there"}]}}]}\r\n\r\n'
+            return httpx.Response(200, text=body)
+
+        events = await self.collect(make_client(handler))
+        self.assertEqual(events[0], {"type": "token", "text": "Hi there"})
+        self.assertEqual(events[-1]["provider"], "gemini")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+"""
+Unit tests for runtime monitoring
+"""
+
+import asyncio
+import time
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+
+class TestEventLoopMonitor(unittest.IsolatedAsyncioTestCase):
+
+    async def test_blocking_call_shows_up_as_lag(self):
+        from src.metrics.runtime import EventLoopMonitor
+        monitor = EventLoopMonitor(interval_ms=10)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.1)  # block the loop
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        data = monitor.to_dict()
+        self.assertGreaterEqual(data["event_loop_lag_ms"]["max"], 80)
+        self.assertGreater(data["event_loop_lag_ms"]["samples"], 2)
+        self.assertGreater(data["rss_bytes"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+"""
+Unit tests for the query safety pipeline (sequential and speculative checks)
+"""
+
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from src.security.pipeline import (  # noqa: E402
+    SafetyPipeline, api_key_fingerprint, guard_stream, parse_modes, run_guarded,
+)
+
+SAFE = {"is_toxic": False, "scores": {"SAFE": 1.0}, "blocked_categories": [], "error": None}
+TOXIC = {"is_toxic": True, "scores": {}, "blocked_categories": ["HARM_CATEGORY_HARASSMENT"], "error": None}
+
+
+def slow(value, delay, log=None, name=None):
+    """Coroutine function returning value after delay, logging start/finish/cancel"""
+    async def run():
+        if log is not None:
+            log.append(f"{name} started")
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"{name} cancelled")
+            raise
+        if log is not None:
+            log.append(f"{name} finished")
+        return value
+    return run
+
+
+class TestPipelineMode(unittest.TestCase):
+
+    def test_key_overrides_route_overrides_default(self):
+        pipeline = SafetyPipeline(
+            default="off",
+            routes=parse_modes("/query=speculative, /query/stream=sequential"),
+            keys={api_key_fingerprint("premium-key"): "sequential"}
+        )
+        self.assertEqual(pipeline.mode("/query"), "speculative")
+        self.assertEqual(pipeline.mode("/query", "other-key"), "speculative")
+        self.assertEqual(pipeline.mode("/query", "premium-key"), "sequential")
+        self.assertEqual(pipeline.mode("/batch/jobs"), "off")
+
+    def test_invalid_settings_are_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_modes("/query=eager")
+        with self.assertRaises(ValueError):
+            SafetyPipeline(default="maybe")
+
+
+class TestRunGuarded(unittest.IsolatedAsyncioTestCase):
+
+    async def test_speculative_overlaps_check_and_call(self):
+        started = time.perf_counter()
+        guarded = await run_guarded("speculative", slow(SAFE, 0.2), slow("answer", 0.2))
+        self.assertLess(time.perf_counter() - started, 0.35)
+        self.assertEqual(guarded.result, "answer")
+        self.assertFalse(guarded.blocked)
+        self.assertGreaterEqual(guarded.saved_ms, 150)
+
+    async def test_block_cancels_the_in_flight_call(self):
+        log = []
+        started = time.perf_counter()
+        guarded = await run_guarded("speculative", slow(TOXIC, 0.05), slow("answer", 5, log, "call"))
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertTrue(guarded.blocked and guarded.cancelled)
+        self.assertIsNone(guarded.result)
+        self.assertEqual(log, ["call started", "call cancelled"])
+
+    async def test_answer_finished_before_block_is_withheld(self):
+        guarded = await run_guarded("speculative", slow(TOXIC, 0.1), slow("answer", 0))
+        self.assertTrue(guarded.blocked)
+        self.assertFalse(guarded.cancelled)
+        self.assertIsNone(guarded.result)
+        self.assertEqual(guarded.wasted, "answer")
+
+    async def test_sequential_block_never_calls(self):
+        log = []
+        guarded = await run_guarded("sequential", slow(TOXIC, 0), slow("answer", 0, log, "call"))
+        self.assertTrue(guarded.blocked)
+        self.assertEqual(log, [])
+
+        guarded = await run_guarded("off", slow(TOXIC, 0), slow("answer", 0))
+        self.assertIsNone(guarded.verdict)
+        self.assertEqual(guarded.result, "answer")
+
+
+class TestGuardStream(unittest.IsolatedAsyncioTestCase):
+
+    @staticmethod
+    async def events(log, count=3, delay=0.01):
+        try:
+            for n in range(count):
+                await asyncio.sleep(delay)
+                log.append(f"produced {n}")
+                yield {"type": "token", "text": str(n)}
+            yield {"type": "done"}
+        except asyncio.CancelledError:
+            log.append("stream cancelled")
+            raise
+
+    async def test_events_are_held_until_the_check_passes(self):
+        log = []
+
+        async def check():
+            await asyncio.sleep(0.1)
+            log.append("checked")
+            return SAFE
+
+        received = []
+        async for event in guard_stream("speculative", check, self.events(log), on_blocked=None,
+                                        on_released=lambda saved_ms: received.append(saved_ms)):
+            log.append(f"sent {event['type']}")
+        self.assertLess(log.index("produced 2"), log.index("checked"))  # generated during the check
+        self.assertLess(log.index("checked"), log.index("sent token"))  # released only after it
+        self.assertGreaterEqual(received[0], 5)
+
+    async def test_block_cancels_the_stream(self):
+        log = []
+        blocked = []
+
+        def on_blocked(verdict, held, cancelled):
+            blocked.append((held, cancelled))
+            return {"type": "error", "error": "blocked"}
+
+        sent = [event async for event in guard_stream(
+            "speculative", slow(TOXIC, 0.05), self.events(log, count=100), on_blocked
+        )]
+        self.assertEqual(sent, [{"type": "error", "error": "blocked"}])
+        held, cancelled = blocked[0]
+        self.assertTrue(cancelled)
+        self.assertTrue(all(event["type"] == "token" for event in held))
+        self.assertEqual(log[-1], "stream cancelled")
+
+
+class StubSemanticCache:
+    """Semantic tier that answers every lookup with one stored entry"""
+
+    def __init__(self, entry):
+        self.entry = entry
+
+    def partition_key(self, *parts):
+        return parts
+
+    def lookup(self, prompt, partition):
+        return self.entry, 0.99
+
+    def add(self, prompt, partition, entry):
+        pass
+
+
+class TestQueryCacheIsGated(unittest.TestCase):
+    """The response cache is shared across keys, so hits are checked for keys whose pipeline is on"""
+
+    def setUp(self):
+        from fastapi import Depends
+        from fastapi.testclient import TestClient
+        from src.api import routes
+        from src.cache import ResponseCache
+        from src.main import app
+        from src.security import api_key_header, validate_api_key
+
+        self.checked, self.calls = [], []
+
+        async def detect(text):
+            self.checked.append(text)
+            return TOXIC if "bad" in text else SAFE
+
+        async def cascade(**kwargs):
+            self.calls.append(kwargs["prompt"])
+            return "answer", "groq", 10, None, [
+                {"provider": "groq", "model": "m", "status": "success", "reason": None, "latency_ms": 10}
+            ]
+
+        async def any_key(api_key: str = Depends(api_key_header)):
+            return api_key
+
+        pipeline = SafetyPipeline(default="off", keys={api_key_fingerprint("guarded-key"): "speculative"})
+        for patcher in (
+            patch.dict(app.dependency_overrides, {validate_api_key: any_key}),
+            patch.object(routes, "detect_toxicity", detect),
+            patch.object(routes, "safety_pipeline", pipeline),
+            patch.object(routes, "RESPONSE_CACHE_ENABLED", True),
+            patch.object(routes, "response_cache", ResponseCache(max_entries=10)),
+            patch.object(routes.llm_client, "query_llm_cascade", cascade),
+            patch.object(routes.llm_client, "route_providers", lambda *args: [{"name": "groq", "model": "m"}]),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.routes = routes
+        self.client = TestClient(app)
+
+    def query(self, prompt, key, temperature=0, **headers):
+        return self.client.post(
+            "/query", json={"prompt": prompt, "temperature": temperature}, headers={"X-API-Key": key, **headers}
+        )
+
+    def test_exact_hit_cached_by_an_unchecked_key_is_checked(self):
+        with patch.object(self.routes, "semantic_cache", None):
+            self.assertEqual(self.query("a bad prompt", "open-key").status_code, 200)
+            self.assertEqual(self.checked, [])  # pipeline off for this key; response cached
+
+            response = self.query("a bad prompt", "guarded-key")
+            self.assertEqual(response.status_code, 422)
+            self.assertEqual(self.checked, ["a bad prompt"])
+            self.assertEqual(self.calls, ["a bad prompt"])
+
+            self.assertEqual(self.query("a bad prompt", "open-key").headers["X-Cache"], "HIT")
+
+    def test_semantic_hit_for_a_new_prompt_is_checked(self):
+        entry = {"response": "answer", "provider": "groq", "model": "m"}
+        with patch.object(self.routes, "semantic_cache", StubSemanticCache(entry)):
+            response = self.query("a bad twist on a cached prompt", "guarded-key")
+            self.assertEqual(response.status_code, 422)
+
+            response = self.query("a fine twist on a cached prompt", "guarded-key")
+            self.assertEqual(response.headers["X-Cache"], "HIT-SEMANTIC")
+            self.assertEqual(len(self.checked), 2)
+            self.assertEqual(self.calls, [])
+
+    def test_sampled_answers_are_cached_only_on_opt_in(self):
+        with patch.object(self.routes, "semantic_cache", None):
+            self.assertEqual(self.query("a sampled prompt", "open-key", 0.7).headers["X-Cache"], "BYPASS")
+            self.assertEqual(self.query("a sampled prompt", "open-key", 0.7, **{"X-Cache-Mode": "use"})
+                             .headers["X-Cache"], "MISS")
+            self.assertEqual(self.query("a sampled prompt", "open-key", 0.7, **{"X-Cache-Mode": "use"})
+                             .headers["X-Cache"], "HIT")
+            self.assertEqual(len(self.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Unit tests for the local provider simulator
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+import httpx
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+TEST_ENV = {
+    "GEMINI_API_KEY": "test-gemini",
+    "GROQ_API_KEY": "test-groq",
+    "OPENROUTER_API_KEY": "test-openrouter",
+}
+
+FAST = {"latency_ms": 0, "chunk_interval_ms": 0}
+
+
+def make_client(simulator):
+    """LLMClient whose provider calls are served in-process by the simulator"""
+    from src.llm.client import LLMClient
+    from src.simulator import create_app
+    with patch.dict(os.environ, TEST_ENV):
+        return LLMClient(http_transport=httpx.ASGITransport(app=create_app(simulator)))
+
+
+class TestProviderSimulator(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from src.simulator import ProviderSimulator
+        self.sim = ProviderSimulator(
+            profiles={name: FAST for name in ("gemini", "groq", "openrouter")}, seed=7
+        )
+        self.client = make_client(self.sim)
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_responses_parse_with_real_adapters(self):
+        """Every simulated wire format round-trips through its adapter, usage included"""
+        self.sim.configure("groq", {"output_tokens": 5})
+        for provider in self.client.providers:
+            text, error = await self.client.call_llm_provider(
+                provider["name"], provider["key"], provider["model"], "Hello", 3, 0.0
+            )
+            self.assertIsNone(error, provider["name"])
+            self.assertEqual(len(text.split()), 3)
+
+        adapter = self.client.adapter("groq", "test-groq", self.client.groq_model)
+        url, headers, body = adapter.build_request("Hello", 64, 0.0)
+        response = await self.client.transport.get_client("groq").post(url, headers=headers, content=body)
+        self.assertEqual(adapter.parse_usage(response.json()), (2, 5))
+
+    async def test_errors_fail_over_and_are_counted(self):
+        self.sim.configure("gemini", {"error_rate": 1.0})
+        self.sim.configure("groq", {"malformed_rate": 1.0})
+        response, provider, _, error, path = await self.client.query_llm_cascade("Hi", 16, 0.0, coalesce=False)
+
+        self.assertEqual(provider, "openrouter")
+        self.assertEqual([step["status"] for step in path], ["failed", "failed", "success"])
+        self.assertEqual(self.sim.stats["gemini"]["error"], 1)
+        self.assertEqual(self.sim.stats["groq"]["malformed"], 1)
+
+    async def test_rate_limit_burst_window(self):
+        from src.simulator import EndpointProfile, ProviderSimulator
+        now = [0.0]
+        sim = ProviderSimulator(clock=lambda: now[0])
+        profile = EndpointProfile(burst_every_s=10, burst_duration_s=2)
+        self.assertEqual(sim.outcome(profile), "rate_limited")
+        now[0] = 5.0
+        self.assertEqual(sim.outcome(profile), "ok")
+        now[0] = 11.0
+        self.assertEqual(sim.outcome(profile), "rate_limited")
+
+    async def test_streaming_and_hang(self):
+        events = [e async for e in self.client.stream_llm_cascade("Hi", 4, 0.0)]
+        self.assertEqual(events[-1]["type"], "done")
+        self.assertEqual("".join(e["text"] for e in events if e["type"] == "token").split(),
+                         ["Simulated", "response", "from", "gemini"])
+
+        self.sim.configure("gemini", {"hang_rate": 1.0, "hang_s": 5})
+        response, provider, _, error, path = await self.client.query_llm_cascade(
+            "Hi", 16, 0.0, timeout_ms=300, coalesce=False
+        )
+        from src.llm.client import DEADLINE_EXCEEDED_ERROR
+        self.assertEqual(path[0]["status"], "timeout")
+        self.assertEqual(error, DEADLINE_EXCEEDED_ERROR)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,303 @@
+"""
+Unit tests for toxicity classification
+"""
+
+import asyncio
+import json
+import re
+import time
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+import httpx
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+TEST_ENV = {"GEMINI_API_KEY": "test-gemini", "LAKERA_API_KEY": "test-lakera"}
+
+
+def gemini_says(category: str) -> dict:
+    return {"candidates": [{"content": {"parts": [{"text": category}]}}]}
+
+
+LAKERA_FLAGGED = {"flagged": True, "results": [{"categories": {"hate": True, "violence": False}}]}
+
+
+def make_service(mode="fallback", gemini=None, lakera=None, gemini_delay=0.0, lakera_delay=0.0, **kwargs):
+    """ToxicityService whose backends answer (status, body), or reply(request) -> (status, body),
+    after a delay"""
+    from src.security.toxicity import ToxicityService
+    calls = []
+
+    async def handler(request):
+        backend = "lakera" if "guard" in request.url.path else "gemini"
+        calls.append(backend)
+        await asyncio.sleep(gemini_delay if backend == "gemini" else lakera_delay)
+        reply = gemini if backend == "gemini" else lakera
+        if callable(reply):
+            reply = reply(request)
+        status, body = reply or (500, {"error": {"message": "boom"}})
+        return httpx.Response(status, json=body)
+
+    service = ToxicityService(mode=mode, http_transport=httpx.MockTransport(handler), **kwargs)
+    return service, calls
+
+
+class TestToxicityService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        patcher = patch.dict(os.environ, TEST_ENV)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_gemini_verdicts_are_parsed(self):
+        service, calls = make_service(gemini=(200, gemini_says("HATE_SPEECH")))
+        result = await service.check("some text")
+        self.assertTrue(result["is_toxic"])
+        self.assertEqual(result["blocked_categories"], ["HARM_CATEGORY_HATE_SPEECH"])
+        self.assertEqual(calls, ["gemini"])
+
+        service, _ = make_service(gemini=(200, gemini_says("SAFE")))
+        result = await service.check("what's the weather")
+        self.assertFalse(result["is_toxic"])
+        self.assertEqual(result["scores"], {"SAFE": 1.0})
+        self.assertIsNone(result["error"])
+
+    async def test_fallback_asks_lakera_only_after_gemini_fails(self):
+        service, calls = make_service(gemini=(503, {"error": {"message": "overloaded"}}), lakera=(200, LAKERA_FLAGGED))
+        result = await service.check("some text")
+        self.assertEqual(calls, ["gemini", "lakera"])
+        self.assertTrue(result["is_toxic"])
+        self.assertEqual(result["blocked_categories"], ["LAKERA_HATE"])
+
+    async def test_per_backend_deadline_bounds_latency(self):
+        service, calls = make_service(
+            gemini=(200, gemini_says("SAFE")), gemini_delay=5.0, lakera=(200, LAKERA_FLAGGED),
+            gemini_timeout_ms=100, lakera_timeout_ms=100
+        )
+        started = time.perf_counter()
+        result = await service.check("some text")
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertTrue(result["is_toxic"])  # Lakera answered after the Gemini deadline
+
+    async def test_race_returns_first_conclusive_verdict_and_cancels_the_other(self):
+        service, calls = make_service(
+            mode="race", gemini=(200, gemini_says("SAFE")), gemini_delay=2.0, lakera=(200, LAKERA_FLAGGED)
+        )
+        started = time.perf_counter()
+        result = await service.check("some text")
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(sorted(calls), ["gemini", "lakera"])
+        self.assertEqual(result["blocked_categories"], ["LAKERA_HATE"])
+
+        # A fast error does not win the race
+        service, _ = make_service(
+            mode="race", gemini=(200, gemini_says("SAFE")), gemini_delay=0.05, lakera=(500, {"error": "down"})
+        )
+        result = await service.check("some text")
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["scores"], {"SAFE": 1.0})
+
+    async def test_no_verdict_reports_unavailable(self):
+        from src.security.toxicity import SAFETY_UNAVAILABLE_ERROR
+        for mode in ("fallback", "race"):
+            with self.subTest(mode=mode):
+                service, _ = make_service(mode=mode)
+                result = await service.check("some text")
+                self.assertFalse(result["is_toxic"])
+                self.assertEqual(result["error"], SAFETY_UNAVAILABLE_ERROR)
+
+
+class TestToxicityVerdictCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        patcher = patch.dict(os.environ, TEST_ENV)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = 0.0
+
+    def make_cache(self):
+        from src.cache import ResponseCache
+        return ResponseCache(max_entries=100, clock=lambda: self.now)
+
+    async def test_normalized_text_hits_the_cache(self):
+        service, calls = make_service(gemini=(200, gemini_says("SAFE")), cache=self.make_cache())
+        await service.check("What's the   weather?")
+        result = await service.check("  what's the WEATHER? ")
+        self.assertEqual(calls, ["gemini"])
+        self.assertEqual(result["scores"], {"SAFE": 1.0})
+        self.assertEqual(service.cache.to_dict()["hit_rate"], 0.5)
+
+    async def test_toxic_and_safe_verdicts_have_separate_ttls(self):
+        service, calls = make_service(
+            gemini=(200, gemini_says("SAFE")), cache=self.make_cache(), positive_ttl_s=100, negative_ttl_s=10
+        )
+        await service.check("safe text")
+        self.now = 11
+        await service.check("safe text")
+        self.assertEqual(calls, ["gemini", "gemini"])  # safe verdict expired after 10 s
+
+        service, calls = make_service(
+            gemini=(200, gemini_says("HARASSMENT")), cache=self.make_cache(), positive_ttl_s=100, negative_ttl_s=10
+        )
+        await service.check("toxic text")
+        self.now += 50
+        result = await service.check("toxic text")
+        self.assertEqual(calls, ["gemini"])  # toxic verdict still cached
+        self.assertTrue(result["is_toxic"])
+
+    async def test_errors_are_never_cached(self):
+        service, calls = make_service(cache=self.make_cache())
+        await service.check("some text")
+        await service.check("some text")
+        self.assertEqual(calls, ["gemini", "lakera", "gemini", "lakera"])
+        self.assertEqual(service.cache.to_dict()["entries"], 0)
+
+
+def gemini_batch_reply(answer_for):
+    """Gemini stand-in answering each numbered text with answer_for(text) (None to skip it)"""
+    def reply(request):
+        prompt = json.loads(request.content)["contents"][0]["parts"][0]["text"]
+        items = re.findall(r'^(\d+)\. (".*")$', prompt, re.MULTILINE)
+        if not items:  # single-text prompt
+            return 200, gemini_says(answer_for(re.search(r'Text to analyze: "(.*)"', prompt).group(1)))
+        lines = [f"{n}: {answer_for(json.loads(text))}" for n, text in items if answer_for(json.loads(text))]
+        return 200, gemini_says("\n".join(lines))
+    return reply
+
+
+def hate_if_flagged(text):
+    return "HATE_SPEECH" if "slur" in text else "SAFE"
+
+
+class TestBatchToxicity(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        from src.metrics import MetricsStore
+        self.metrics = MetricsStore()
+        for patcher in (patch.dict(os.environ, TEST_ENV), patch("src.security.toxicity.metrics", self.metrics)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_parse_batch_reply(self):
+        from src.security.toxicity import parse_gemini_batch_verdicts
+        reply = gemini_says("1: SAFE\n**2**: HATE_SPEECH\n[3] unsafe\n4: SAFE\n4: HARASSMENT\n9: SAFE\n6. safe")
+        verdicts = parse_gemini_batch_verdicts(reply, 6)
+        self.assertEqual(sorted(verdicts), [0, 1, 5])  # 3 unreadable, 4 conflicting, 5 missing, 9 out of range
+        self.assertFalse(verdicts[0]["is_toxic"])
+        self.assertEqual(verdicts[1]["blocked_categories"], ["HARM_CATEGORY_HATE_SPEECH"])
+        self.assertEqual(parse_gemini_batch_verdicts({"promptFeedback": {"blockReason": "SAFETY"}}, 6), {})
+
+    def test_chunks_respect_text_and_character_limits(self):
+        from src.security.toxicity import chunk_texts
+        self.assertEqual(chunk_texts(["a", "b", "c"], max_texts=2, max_chars=100), [["a", "b"], ["c"]])
+        self.assertEqual(chunk_texts(["aaa", "bb", "c" * 10, "d"], max_texts=10, max_chars=5),
+                         [["aaa", "bb"], ["c" * 10], ["d"]])
+
+    async def test_texts_share_gemini_calls_and_keep_their_order(self):
+        texts = ["hello", "a slur here", "weather?", "nice day", "another slur"]
+        service, calls = make_service(gemini=gemini_batch_reply(hate_if_flagged), batch_chunk_texts=2)
+        results = await service.check_many(texts)
+        self.assertEqual([r["is_toxic"] for r in results], [False, True, False, False, True])
+        self.assertEqual(calls, ["gemini"] * 3)
+        batch = self.metrics.to_dict()["toxicity_batch"]
+        self.assertEqual((batch["calls"], batch["items"], batch["item_fallbacks"]), (2, 4, 0))
+
+    async def test_unanswered_items_fall_back_to_lakera(self):
+        answer = lambda text: None if text == "skipped" else "SAFE"  # noqa: E731
+        service, calls = make_service(gemini=gemini_batch_reply(answer), lakera=(200, LAKERA_FLAGGED))
+        results = await service.check_many(["fine", "skipped", "also fine"])
+        self.assertEqual(calls, ["gemini", "lakera"])
+        self.assertEqual(results[1]["blocked_categories"], ["LAKERA_HATE"])
+        self.assertFalse(results[0]["is_toxic"] or results[2]["is_toxic"])
+
+        # A failed batch call re-checks every item
+        service, calls = make_service(gemini=(503, {"error": "overloaded"}), lakera=(200, LAKERA_FLAGGED))
+        results = await service.check_many(["one", "two"])
+        self.assertEqual(calls, ["gemini", "lakera", "lakera"])
+        self.assertTrue(all(r["is_toxic"] for r in results))
+
+    async def test_duplicates_and_cached_texts_skip_the_remote_call(self):
+        from src.cache import ResponseCache
+        service, calls = make_service(gemini=gemini_batch_reply(hate_if_flagged), cache=ResponseCache(max_entries=10))
+        await service.check("cached text")
+        results = await service.check_many(["cached text", "a slur", "A  SLUR", "new text"])
+        self.assertEqual(calls, ["gemini", "gemini"])
+        self.assertEqual([r["is_toxic"] for r in results], [False, True, True, False])
+        self.assertEqual(self.metrics.to_dict()["toxicity_batch"]["items"], 2)
+
+
+class FixedScoreModel:
+    """Stands in for LinearSafetyModel with preset scores"""
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def score(self, text):
+        return self.scores[text]
+
+
+class TestLocalSafetyTier(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        from src.metrics import MetricsStore
+        self.metrics = MetricsStore()
+        for patcher in (patch.dict(os.environ, TEST_ENV), patch("src.security.toxicity.metrics", self.metrics)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_linear_model_fit_save_load(self):
+        import tempfile
+        from src.security.local_classifier import LinearSafetyModel
+
+        safe = [f"what is the weather in {city} today" for city in ("paris", "oslo", "lima", "rome", "kyiv")]
+        toxic = [f"I will hurt you and burn your house {n}" for n in ("now", "tonight", "soon", "today", "later")]
+        model = LinearSafetyModel.fit(safe + toxic, [0] * 5 + [1] * 5, dim=1024)
+        self.assertLess(model.score("what is the weather in berlin today"), 0.5)
+        self.assertGreater(model.score("I will hurt you and burn your house"), 0.5)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.npz")
+            model.save(path)
+            loaded = LinearSafetyModel.load(path)
+        self.assertAlmostEqual(loaded.score("burn your house"), model.score("burn your house"), places=5)
+
+    async def test_confident_scores_skip_remote_and_uncertain_band_escalates(self):
+        model = FixedScoreModel({"weather": 0.01, "threat": 0.99, "ambiguous": 0.6})
+        service, calls = make_service(gemini=(200, gemini_says("HARASSMENT")), local_model=model, audit_rate=0)
+
+        result = await service.check("weather")
+        self.assertFalse(result["is_toxic"])
+        result = await service.check("threat")
+        self.assertEqual(result["blocked_categories"], ["LOCAL_CLASSIFIER_TOXIC"])
+        self.assertEqual(calls, [])
+
+        result = await service.check("ambiguous")
+        self.assertEqual(calls, ["gemini"])
+        self.assertEqual(result["blocked_categories"], ["HARM_CATEGORY_HARASSMENT"])
+
+        tiers = self.metrics.to_dict()["toxicity_tiers"]
+        self.assertEqual((tiers["local_safe"], tiers["local_toxic"], tiers["escalated"]), (1, 1, 1))
+        self.assertAlmostEqual(tiers["escalation_rate"], 0.3333)
+        self.assertEqual(tiers["band_agreement_rate"], 1.0)  # leaned toxic (0.6), remote agreed
+
+    async def test_sampled_local_answers_are_audited_remotely(self):
+        model = FixedScoreModel({"weather": 0.01})
+        service, calls = make_service(
+            gemini=(200, gemini_says("HATE_SPEECH")), local_model=model, audit_rate=1.0, rng=lambda: 0.0
+        )
+        result = await service.check("weather")
+        self.assertFalse(result["is_toxic"])  # answered locally without waiting for the audit
+        await asyncio.gather(*service._audits)
+
+        self.assertEqual(calls, ["gemini"])
+        tiers = self.metrics.to_dict()["toxicity_tiers"]
+        self.assertEqual(tiers["audited"], 1)
+        self.assertEqual(tiers["audit_agreement_rate"], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()